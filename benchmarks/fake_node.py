@@ -0,0 +1,235 @@
+"""An in-process fake Atto node for benchmarks.
+
+FakeNode answers the node API endpoints with synthetic records through an
+httpx transport, so benchmarks measure Atto.py itself rather than the network
+or a real node.
+"""
+"""
+This file is part of Atto.py.
+
+Atto.py is free software: you can redistribute it and/or modify it under the
+terms of the GNU General Public License as published by the Free Software
+Foundation, either version 3 of the License, or (at your option) any later
+version.
+
+This program is distributed in the hope that it will be useful, but WITHOUT ANY
+WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+PARTICULAR PURPOSE. See the GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License along with
+this program. If not, see <https://www.gnu.org/licenses/>.
+"""
+import asyncio
+import json
+import re
+import time
+import zlib
+import httpx
+
+_TIMESTAMP = 1_700_000_000_000
+_RAW_PER_ATTO = 1_000_000_000
+
+def key(number):
+    """Return a deterministic 64-character hexadecimal key."""
+    return format(number, '064X')
+
+class FakeNode:
+    """Synthetic responses for the node API.
+
+    Account streams contain `height` records. Global streams and receivable
+    streams contain `height` records as well, spread over 16 accounts.
+
+    Args:
+        height: the height of every account
+        rate: the maximum number of streamed records per second, or None
+        padding: the number of extra characters per record, to simulate
+            larger records
+        chunk_size: the number of lines per response body chunk
+        compress: whether to compress streams with the encoding that the
+            request prefers among gzip, br and zstd, flushing every chunk
+    """
+    def __init__(self, height=100_000, rate=None, padding=0, chunk_size=64,
+                 compress=False):
+        self.height = height
+        self.rate = rate
+        self.padding = 'x' * padding
+        self.chunk_size = chunk_size
+        self.compress = compress
+
+    def entry(self, account, height):
+        return {'hash': key(account << 32 | height), 'algorithm': 'V1',
+                'publicKey': key(account), 'height': height,
+                'blockType': 'OPEN' if height == 1 else 'RECEIVE',
+                'subjectAlgorithm': 'V1', 'subjectPublicKey': key(1 << 64),
+                'previousBalance': (height - 1) * _RAW_PER_ATTO,
+                'balance': height * _RAW_PER_ATTO,
+                'timestamp': _TIMESTAMP + height * 1000,
+                'padding': self.padding}
+
+    def transaction(self, account, height):
+        block = {'publicKey': key(account), 'version': 0, 'algorithm': 'V1',
+                 'timestamp': _TIMESTAMP + height * 1000, 'network': 'LIVE',
+                 'balance': height * _RAW_PER_ATTO, 'type': 'RECEIVE',
+                 'height': height,
+                 'previous': key(account << 32 | height - 1),
+                 'sendHashAlgorithm': 'V1', 'sendHash': key(height)}
+        return {'block': block, 'signature': 'AB' * 64, 'work': 'CD' * 8,
+                'padding': self.padding}
+
+    def receivable(self, account, number):
+        return {'hash': key(number), 'version': 0, 'algorithm': 'V1',
+                'publicKey': key(1 << 64), 'timestamp': _TIMESTAMP,
+                'receiverAlgorithm': 'V1', 'receiverPublicKey': key(account),
+                'amount': number * _RAW_PER_ATTO, 'padding': self.padding}
+
+    def account(self, account, height=None):
+        height = self.height if height is None else height
+        return {'publicKey': key(account), 'network': 'LIVE', 'version': 0,
+                'algorithm': 'V1', 'height': height,
+                'balance': height * _RAW_PER_ATTO,
+                'lastTransactionHash': key(account << 32 | height),
+                'lastTransactionTimestamp': _TIMESTAMP,
+                'representativeAlgorithm': 'V1',
+                'representativePublicKey': key(2 << 64)}
+
+    def records(self, request):
+        """Return the records for a streaming request, or None."""
+        path = request.url.path
+        params = request.url.params
+        first = int(params.get('fromHeight') or 1)
+        last = min(int(params.get('toHeight') or self.height), self.height)
+
+        if match := re.search(r'accounts/(\w{64})/entries/stream$', path):
+            account = int(match[1], 16)
+            return (self.entry(account, h) for h in range(first, last + 1))
+        if match := re.search(r'accounts/(\w{64})/transactions/stream$',
+                              path):
+            account = int(match[1], 16)
+            return (self.transaction(account, h)
+                    for h in range(first, last + 1))
+        if match := re.search(r'accounts/(\w{64})/receivables/stream$', path):
+            account = int(match[1], 16)
+            return (self.receivable(account, n)
+                    for n in range(1, self.height + 1))
+        if match := re.search(r'accounts/(\w{64})/stream$', path):
+            account = int(match[1], 16)
+            return (self.account(account, h)
+                    for h in range(1, self.height + 1))
+        if path.endswith('accounts/entries/stream'):
+            return (self.entry(h % 16, h // 16 + 1)
+                    for h in range(self.height))
+        if path.endswith('transactions/stream'):
+            return (self.transaction(h % 16, h // 16 + 1)
+                    for h in range(self.height))
+        return None
+
+    def chunks(self, records):
+        """Yield the records as NDJSON, chunk_size lines at a time."""
+        batch = []
+        for record in records:
+            batch.append(json.dumps(record).encode())
+            if len(batch) == self.chunk_size:
+                yield b'\n'.join(batch) + b'\n'
+                batch.clear()
+        if batch:
+            yield b'\n'.join(batch) + b'\n'
+
+    def encoding(self, request):
+        """Return the encoding to compress a response to request with."""
+        if not self.compress:
+            return None
+        accepted = []
+        for value in request.headers.get('accept-encoding', '').split(','):
+            name, _, quality = value.strip().partition(';q=')
+            accepted.append((-float(quality or 1), name))
+        for _, name in sorted(accepted, key=lambda value: value[0]):
+            if name in ('gzip', 'br', 'zstd'):
+                return name
+        return None
+
+    def _compressor(self, encoding):
+        """Return functions that compress and flush a chunk, and finish."""
+        if encoding == 'gzip':
+            compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+            return (lambda chunk: compressor.compress(chunk)
+                                  + compressor.flush(zlib.Z_SYNC_FLUSH),
+                    compressor.flush)
+        if encoding == 'br':
+            import brotli
+            # A quality that a node could afford for live streams
+            compressor = brotli.Compressor(quality=5)
+            return (lambda chunk: compressor.process(chunk)
+                                  + compressor.flush(),
+                    compressor.finish)
+        import zstandard
+        compressor = zstandard.ZstdCompressor().compressobj()
+        return (lambda chunk: compressor.compress(chunk) + compressor.flush(
+                        zstandard.COMPRESSOBJ_FLUSH_BLOCK),
+                compressor.flush)
+
+    def response(self, request, chunks):
+        """Return a streamed response of chunks, compressed if accepted."""
+        encoding = self.encoding(request)
+        if encoding is None:
+            return httpx.Response(200, content=chunks)
+        compress, finish = self._compressor(encoding)
+
+        if hasattr(chunks, '__aiter__'):
+            async def compressed():
+                async for chunk in chunks:
+                    yield compress(chunk)
+                yield finish()
+        else:
+            def compressed():
+                for chunk in chunks:
+                    yield compress(chunk)
+                yield finish()
+        return httpx.Response(200, content=compressed(),
+                              headers={'Content-Encoding': encoding})
+
+    def _delay(self):
+        return self.chunk_size / self.rate if self.rate else 0
+
+    def _lookup(self, request):
+        path = request.url.path
+        if match := re.search(r'accounts/(\w{64})$', path):
+            return httpx.Response(200, json=self.account(int(match[1], 16)))
+        if '/instants/' in path:
+            return httpx.Response(200, json={
+                    'clientInstant': '2024-01-01T00:00:00Z',
+                    'serverInstant': '2024-01-01T00:00:00.100Z',
+                    'differenceMillis': 100})
+        return httpx.Response(404)
+
+    def transport(self):
+        """Return a transport for AttoClient(transport=...)."""
+        def throttled(records):
+            delay = self._delay()
+            for chunk in self.chunks(records):
+                if delay:
+                    time.sleep(delay)
+                yield chunk
+
+        def handle(request):
+            records = self.records(request)
+            if records is None:
+                return self._lookup(request)
+            return self.response(request, throttled(records))
+
+        return httpx.MockTransport(handle)
+
+    def async_transport(self):
+        """Return a transport for AsyncAttoClient(transport=...)."""
+        async def throttled(records):
+            delay = self._delay()
+            for chunk in self.chunks(records):
+                await asyncio.sleep(delay)
+                yield chunk
+
+        async def handle(request):
+            records = self.records(request)
+            if records is None:
+                return self._lookup(request)
+            return self.response(request, throttled(records))
+
+        return httpx.MockTransport(handle)
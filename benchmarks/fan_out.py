@@ -0,0 +1,168 @@
+"""Connections and memory of many concurrent streams, with and without HTTP/2.
+
+Usage::
+
+    python benchmarks/fan_out.py --streams 25 50 100 200 400 --output out.json
+
+A local fake node (http2_node.py) is started, and for every number of
+streams and every client configuration, that many threads stream the entries
+of an account each at the same time, in a fresh interpreter. The number of
+connections opened, the peak resident memory, the records per second and
+the number of streams that failed are written as JSON. Requires the h2
+package.
+
+Configurations:
+    default: httpx's default pool of HTTP/1.1 connections
+    http1: FanOutTransport(http2=False), a large HTTP/1.1 pool
+    http2: FanOutTransport(http1=False), streams multiplexed over HTTP/2
+"""
+"""
+This file is part of Atto.py.
+
+Atto.py is free software: you can redistribute it and/or modify it under the
+terms of the GNU General Public License as published by the Free Software
+Foundation, either version 3 of the License, or (at your option) any later
+version.
+
+This program is distributed in the hope that it will be useful, but WITHOUT ANY
+WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+PARTICULAR PURPOSE. See the GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License along with
+this program. If not, see <https://www.gnu.org/licenses/>.
+"""
+import argparse
+import concurrent.futures
+import json
+import pathlib
+import platform
+import resource
+import subprocess
+import sys
+import time
+import httpx
+import attopy
+from fake_node import key
+
+_HERE = pathlib.Path(__file__).parent
+
+def _fan_out_timeout():
+    return httpx.Timeout(10.0, read=300.0, pool=None)
+
+CONFIGS = {
+    'default': lambda connections: {},
+    'http1': lambda connections: {
+            'transport': attopy.FanOutTransport(connections, http2=False),
+            'timeout': _fan_out_timeout()},
+    'http2': lambda connections: {
+            'transport': attopy.FanOutTransport(connections, http1=False),
+            'timeout': _fan_out_timeout()},
+}
+
+def _peak_rss():
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+def measure(config, streams, url, records, connections):
+    """Stream records entries of streams accounts at once, in this process."""
+    metrics = attopy.Metrics()
+    baseline = _peak_rss()
+    with attopy.AttoClient(url, raw_numbers=True, metrics=metrics,
+                           **CONFIGS[config](connections)) as client:
+        def consume(account):
+            return sum(1 for _ in client.entries(key(account), from_=1,
+                                                 to=records))
+
+        start = time.perf_counter()
+        with concurrent.futures.ThreadPoolExecutor(streams) as executor:
+            futures = [executor.submit(consume, account)
+                       for account in range(streams)]
+        elapsed = time.perf_counter() - start
+
+    received = sum(f.result() for f in futures if not f.exception())
+    errors = [f.exception() for f in futures if f.exception()]
+    return {'streams': streams,
+            'connections': sum(stats.connects
+                               for stats in metrics.endpoints.values()),
+            'records': received,
+            'seconds': elapsed,
+            'records_per_second': received / elapsed,
+            'failed_streams': len(errors),
+            'errors': sorted({type(e).__name__ for e in errors}),
+            'peak_rss_bytes': _peak_rss(),
+            'rss_growth_bytes': _peak_rss() - baseline}
+
+def _start_node(args):
+    node = subprocess.Popen(
+            [sys.executable, str(_HERE / 'http2_node.py'),
+             '--height', str(args.records), '--rate', str(args.rate),
+             '--chunk-size', str(args.chunk_size),
+             '--max-streams', str(args.max_streams)],
+            stdout=subprocess.PIPE, text=True)
+    port = int(node.stdout.readline())
+    return node, f'http://127.0.0.1:{port}'
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--streams', type=int, nargs='+',
+                        default=[25, 50, 100, 200, 400],
+                        help='the numbers of concurrent streams')
+    parser.add_argument('--configs', nargs='+', choices=CONFIGS,
+                        default=list(CONFIGS),
+                        help='the client configurations to run')
+    parser.add_argument('--records', type=int, default=200,
+                        help='the number of entries per stream')
+    parser.add_argument('--rate', type=float, default=100,
+                        help='the records per second of each stream')
+    parser.add_argument('--chunk-size', type=int, default=10,
+                        help='lines per response body chunk')
+    parser.add_argument('--connections', type=int, default=4,
+                        help='the connections of FanOutTransport')
+    parser.add_argument('--max-streams', type=int, default=100,
+                        help="the node's concurrent streams per connection")
+    parser.add_argument('--output', default=None,
+                        help='write the JSON results to a file')
+    # Internal: measure one configuration against a running node
+    parser.add_argument('--measure', nargs=3, metavar=('CONFIG', 'STREAMS',
+                                                       'URL'),
+                        help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.measure:
+        config, streams, url = args.measure
+        print(json.dumps(measure(config, int(streams), url, args.records,
+                                 args.connections)))
+        return
+
+    results = {'python': platform.python_version(),
+               'attopy': attopy.__version__,
+               'node': {'records': args.records, 'rate': args.rate,
+                        'chunk_size': args.chunk_size,
+                        'max_streams': args.max_streams},
+               'connections': args.connections,
+               'configs': {config: [] for config in args.configs}}
+    node, url = _start_node(args)
+    try:
+        for streams in args.streams:
+            for config in args.configs:
+                output = subprocess.run(
+                        [sys.executable, __file__, '--measure', config,
+                         str(streams), url, '--records', str(args.records),
+                         '--connections', str(args.connections)],
+                        capture_output=True, text=True, check=True).stdout
+                result = json.loads(output)
+                results['configs'][config].append(result)
+                print(config, json.dumps(result), file=sys.stderr)
+    finally:
+        node.terminate()
+        node.wait()
+
+    output = json.dumps(results, indent=2)
+    if args.output is None:
+        print(output)
+    else:
+        with open(args.output, 'w') as file:
+            file.write(output + '\n')
+
+if __name__ == '__main__':
+    main()
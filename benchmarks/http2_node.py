@@ -0,0 +1,184 @@
+"""A FakeNode served over a local socket, with HTTP/2 and HTTP/1.1.
+
+Usage::
+
+    python benchmarks/http2_node.py --port 0 --rate 100
+
+The port is printed on the first line of stdout once the server listens.
+HTTP/2 is spoken without TLS to clients that start with the HTTP/2 preface
+(httpx with http1=False, http2=True), and HTTP/1.1 with chunked responses to
+every other client. Requires the h2 package.
+"""
+"""
+This file is part of Atto.py.
+
+Atto.py is free software: you can redistribute it and/or modify it under the
+terms of the GNU General Public License as published by the Free Software
+Foundation, either version 3 of the License, or (at your option) any later
+version.
+
+This program is distributed in the hope that it will be useful, but WITHOUT ANY
+WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+PARTICULAR PURPOSE. See the GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License along with
+this program. If not, see <https://www.gnu.org/licenses/>.
+"""
+import argparse
+import asyncio
+import h2.config
+import h2.connection
+import h2.events
+import h2.exceptions
+import h2.settings
+import httpx
+from fake_node import FakeNode
+
+_PREFACE = b'PRI * HTTP/2.0\r\n\r\nSM\r\n\r\n'
+
+def _response(node, path):
+    """Return the status, body chunks and delay between chunks of a GET."""
+    request = httpx.Request('GET', f'http://node{path}')
+    records = node.records(request)
+    if records is None:
+        response = node._lookup(request)
+        return response.status_code, [response.content], 0
+    return 200, node.chunks(records), node._delay()
+
+async def _serve_http1(node, reader, writer, buffer):
+    while True:
+        while b'\r\n\r\n' not in buffer:
+            data = await reader.read(65536)
+            if not data:
+                return
+            buffer += data
+        head, buffer = buffer.split(b'\r\n\r\n', 1)
+        path = head.split(b'\r\n', 1)[0].split()[1].decode()
+
+        status, chunks, delay = _response(node, path)
+        writer.write(b'HTTP/1.1 %d \r\nContent-Type: application/x-ndjson\r\n'
+                     b'Transfer-Encoding: chunked\r\n\r\n' % status)
+        for chunk in chunks:
+            if delay:
+                await asyncio.sleep(delay)
+            writer.write(b'%x\r\n%s\r\n' % (len(chunk), chunk))
+            await writer.drain()
+        writer.write(b'0\r\n\r\n')
+        await writer.drain()
+
+async def _serve_http2(node, reader, writer, buffer, max_streams):
+    connection = h2.connection.H2Connection(h2.config.H2Configuration(
+            client_side=False, header_encoding='utf-8'))
+    connection.initiate_connection()
+    connection.update_settings(
+            {h2.settings.SettingCodes.MAX_CONCURRENT_STREAMS: max_streams})
+    # Notified when the client opens a flow control window
+    window = asyncio.Condition()
+    tasks = {}
+
+    async def flush():
+        writer.write(connection.data_to_send())
+        await writer.drain()
+
+    async def send(stream_id, data):
+        while data:
+            async with window:
+                await window.wait_for(
+                        lambda: connection.local_flow_control_window(
+                                stream_id) > 0)
+            size = min(connection.local_flow_control_window(stream_id),
+                       connection.max_outbound_frame_size, len(data))
+            connection.send_data(stream_id, data[:size])
+            data = data[size:]
+            await flush()
+
+    async def respond(stream_id, path):
+        status, chunks, delay = _response(node, path)
+        try:
+            connection.send_headers(stream_id, [
+                    (':status', str(status)),
+                    ('content-type', 'application/x-ndjson')])
+            await flush()
+            for chunk in chunks:
+                if delay:
+                    await asyncio.sleep(delay)
+                await send(stream_id, chunk)
+            connection.end_stream(stream_id)
+            await flush()
+        except (h2.exceptions.StreamClosedError, ConnectionError):
+            pass
+        finally:
+            tasks.pop(stream_id, None)
+
+    try:
+        events = connection.receive_data(buffer)
+        while True:
+            for event in events:
+                if isinstance(event, h2.events.RequestReceived):
+                    path = dict(event.headers)[':path']
+                    tasks[event.stream_id] = asyncio.create_task(
+                            respond(event.stream_id, path))
+                elif isinstance(event, h2.events.StreamReset):
+                    task = tasks.pop(event.stream_id, None)
+                    if task is not None:
+                        task.cancel()
+                elif isinstance(event, (h2.events.WindowUpdated,
+                                        h2.events.RemoteSettingsChanged)):
+                    async with window:
+                        window.notify_all()
+                elif isinstance(event, h2.events.ConnectionTerminated):
+                    return
+            await flush()
+
+            data = await reader.read(65536)
+            if not data:
+                return
+            events = connection.receive_data(data)
+    finally:
+        for task in tasks.values():
+            task.cancel()
+
+async def serve(node, port, max_streams):
+    """Serve node on port until cancelled, printing the port when ready."""
+    async def handle(reader, writer):
+        try:
+            buffer = await reader.readexactly(len(_PREFACE))
+            if buffer == _PREFACE:
+                await _serve_http2(node, reader, writer, buffer, max_streams)
+            else:
+                await _serve_http1(node, reader, writer, buffer)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    server = await asyncio.start_server(handle, '127.0.0.1', port,
+                                        backlog=1024)
+    print(server.sockets[0].getsockname()[1], flush=True)
+    async with server:
+        await server.serve_forever()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--port', type=int, default=0,
+                        help='the port to listen on (default: any free one)')
+    parser.add_argument('--height', type=int, default=100_000,
+                        help='the number of records per stream')
+    parser.add_argument('--rate', type=float, default=None,
+                        help='the maximum records per second of each stream')
+    parser.add_argument('--padding', type=int, default=0,
+                        help='extra characters per record')
+    parser.add_argument('--chunk-size', type=int, default=64,
+                        help='lines per response body chunk')
+    parser.add_argument('--max-streams', type=int, default=100,
+                        help='the concurrent HTTP/2 streams per connection')
+    args = parser.parse_args(argv)
+
+    node = FakeNode(args.height, args.rate, args.padding, args.chunk_size)
+    try:
+        asyncio.run(serve(node, args.port, args.max_streams))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == '__main__':
+    main()
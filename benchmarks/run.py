@@ -0,0 +1,189 @@
+"""Benchmarks of Atto.py's client paths against an in-process fake node.
+
+Usage::
+
+    python benchmarks/run.py --height 100000 --padding 200 --output out.json
+
+For every client path, the throughput in records per second, the median and
+99th percentile time between two records reaching the caller, and the peak
+memory allocated while streaming are measured. The time to import each
+module is measured in a fresh interpreter. The results are written as JSON,
+so that runs can be compared by scripts.
+"""
+"""
+This file is part of Atto.py.
+
+Atto.py is free software: you can redistribute it and/or modify it under the
+terms of the GNU General Public License as published by the Free Software
+Foundation, either version 3 of the License, or (at your option) any later
+version.
+
+This program is distributed in the hope that it will be useful, but WITHOUT ANY
+WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+PARTICULAR PURPOSE. See the GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License along with
+this program. If not, see <https://www.gnu.org/licenses/>.
+"""
+import argparse
+import asyncio
+import json
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+import attopy
+from fake_node import FakeNode, key
+
+_ACCOUNT = key(7)
+
+def _sync(method, *args, options={}, **kwargs):
+    def run(node):
+        with attopy.AttoClient(transport=node.transport(),
+                               **options) as client:
+            yield from getattr(client, method)(*args, **kwargs)
+    return run
+
+def _async(method, *args, **kwargs):
+    def run(node):
+        async def consume(times):
+            async with attopy.AsyncAttoClient(
+                    transport=node.async_transport()) as client:
+                async for _ in getattr(client, method)(*args, **kwargs):
+                    times.append(time.perf_counter())
+
+        times = []
+        asyncio.run(consume(times))
+        # Replay the timestamps so that async paths are measured like the
+        # others
+        for timestamp in times:
+            yield timestamp
+    run.timestamps = True
+    return run
+
+def _lookups(node):
+    accounts = [key(i) for i in range(node.height // 100)]
+    with attopy.AttoClient(transport=node.transport()) as client:
+        yield from client.accounts_many(accounts)
+
+def _columns(node):
+    with attopy.AttoClient(transport=node.transport()) as client:
+        for batch in client.entries(_ACCOUNT, as_columns=True,
+                                    batch_size=4096):
+            # Count every row of a batch as a record
+            yield from range(len(batch['height']))
+
+PATHS = {
+    'entries': _sync('entries', _ACCOUNT),
+    'entries_lazy': _sync('entries', _ACCOUNT, options={'lazy': True}),
+    'entries_raw_numbers': _sync('entries', _ACCOUNT,
+                                 options={'raw_numbers': True}),
+    'entries_columns': _columns,
+    'entries_global': _sync('entries'),
+    'transactions': _sync('transactions', _ACCOUNT),
+    'transactions_global': _sync('transactions'),
+    'receivables': _sync('receivables', _ACCOUNT),
+    'account_stream': _sync('account', _ACCOUNT, stream=True),
+    'accounts_many': _lookups,
+    'async_entries': _async('entries', _ACCOUNT),
+    'async_transactions': _async('transactions', _ACCOUNT),
+}
+
+IMPORTS = ['attopy', 'attopy.columns', 'attopy.Ledger']
+
+def _percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(len(sorted_values) * fraction))
+    return sorted_values[index]
+
+def measure(path, node):
+    """Stream a path and return its throughput and latencies."""
+    run = PATHS[path]
+    timestamps = getattr(run, 'timestamps', False)
+    times = []
+    start = time.perf_counter()
+    for record in run(node):
+        times.append(record if timestamps else time.perf_counter())
+    elapsed = time.perf_counter() - start
+
+    gaps = sorted(b - a for a, b in zip([start] + times, times))
+    return {'records': len(times),
+            'seconds': elapsed,
+            'records_per_second': len(times) / elapsed if elapsed else None,
+            'p50_latency_us': _percentile(gaps, 0.50) * 1e6 if gaps else None,
+            'p99_latency_us': _percentile(gaps, 0.99) * 1e6 if gaps else None}
+
+def peak_memory(path, node):
+    """Stream a path and return the peak traced allocation in bytes."""
+    tracemalloc.start()
+    try:
+        for _ in PATHS[path](node):
+            pass
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+def import_time(module, repeat=5):
+    """Return the fastest time to import a module in a new interpreter."""
+    code = ('import time; start = time.perf_counter(); '
+            f'import {module}; print(time.perf_counter() - start)')
+    times = []
+    for _ in range(repeat):
+        result = subprocess.run([sys.executable, '-c', code],
+                                capture_output=True, text=True)
+        if result.returncode:
+            return None
+        times.append(float(result.stdout))
+    return min(times)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--height', type=int, default=100_000,
+                        help='the number of records per stream')
+    parser.add_argument('--rate', type=float, default=None,
+                        help='the maximum records per second of the node')
+    parser.add_argument('--padding', type=int, default=0,
+                        help='extra characters per record')
+    parser.add_argument('--chunk-size', type=int, default=64,
+                        help='lines per response body chunk')
+    parser.add_argument('--paths', nargs='+', choices=PATHS, default=None,
+                        help='the client paths to run (default: all)')
+    parser.add_argument('--no-memory', action='store_true',
+                        help="don't measure peak memory")
+    parser.add_argument('--output', default=None,
+                        help='write the JSON results to a file')
+    args = parser.parse_args(argv)
+
+    node = FakeNode(args.height, args.rate, args.padding, args.chunk_size)
+    results = {'python': platform.python_version(),
+               'attopy': attopy.__version__,
+               'node': {'height': args.height, 'rate': args.rate,
+                        'padding': args.padding,
+                        'chunk_size': args.chunk_size},
+               'paths': {},
+               'import_seconds': {}}
+
+    for path in args.paths or PATHS:
+        try:
+            result = measure(path, node)
+            if not args.no_memory:
+                result['peak_memory_bytes'] = peak_memory(path, node)
+        except ImportError as e:
+            result = {'skipped': str(e)}
+        results['paths'][path] = result
+        print(path, json.dumps(result), file=sys.stderr)
+
+    for module in IMPORTS:
+        results['import_seconds'][module] = import_time(module)
+
+    output = json.dumps(results, indent=2)
+    if args.output is None:
+        print(output)
+    else:
+        with open(args.output, 'w') as file:
+            file.write(output + '\n')
+
+if __name__ == '__main__':
+    main()
@@ -15,34 +15,46 @@ You should have received a copy of the GNU General Public License along with
 this program. If not, see <https://www.gnu.org/licenses/>. 
 """
 from .convert import (_str_to_network, _str_to_algorithm, _raw_to_atto,
-                      _timestamp_to_datetime)
+                      _timestamp_to_datetime, _hex_to_bytes, _bytes_to_hex)
+from ._fields import Field, Record
 from . import _format
 
-class Account:
+class Account(Record):
     # TODO: docstring
-    def __init__(self, dict_, client):
-        self._client = client
+    __slots__ = ('_client', '_public_key', '_network', '_version',
+                 '_algorithm', '_height', '_balance', '_last_transaction_hash',
+                 '_last_transaction_timestamp', '_representative_algorithm',
+                 '_representative_public_key')
+
+    public_key = Field('publicKey', _hex_to_bytes, _bytes_to_hex)
+    network = Field('network', _str_to_network)
+    version = Field('version')
+    algorithm = Field('algorithm', _str_to_algorithm)
+    height = Field('height')
+    balance = Field('balance', export=_raw_to_atto, numeric=True)
+    last_transaction_hash = Field('lastTransactionHash', _hex_to_bytes,
+                                  _bytes_to_hex)
+    last_transaction_timestamp = Field('lastTransactionTimestamp',
+                                       export=_timestamp_to_datetime,
+                                       numeric=True)
+    representative_algorithm = Field('representativeAlgorithm',
+                                     _str_to_algorithm)
+    representative_public_key = Field('representativePublicKey',
+                                      _hex_to_bytes, _bytes_to_hex)
 
-        self.public_key = dict_['publicKey']
-        self.network = _str_to_network(dict_['network'])
-        self.version = dict_['version']
-        self.algorithm = _str_to_algorithm(dict_['algorithm'])
-        self.height = dict_['height']
-        self.balance = _raw_to_atto(dict_['balance'])
-        self.last_transaction_hash = dict_['lastTransactionHash']
-        self.last_transaction_timestamp = _timestamp_to_datetime(
-                dict_['lastTransactionTimestamp'])
-        self.representative_algorithm = _str_to_algorithm(
-                dict_['representativeAlgorithm'])
-        self.representative_public_key = dict_['representativePublicKey']
+    def __init__(self, dict_, client, lazy=False, raw_numbers=False):
+        self._client = client
+        self._load(dict_, lazy, raw_numbers)
 
+    # These return whatever the client returns, so with an AsyncAttoClient
+    # get() is awaitable and the others are async generators.
     def get(self, *args, **kwargs):
-        return client.account(account=self.public_key, *args, stream=False,
-                              **kwargs)
+        return self._client.account(account=self.public_key, *args,
+                                    stream=False, **kwargs)
 
     def stream(self, *args, **kwargs):
-        yield from self._client.account(account=self.public_key, *args,
-                                        stream=True, **kwargs)
+        return self._client.account(account=self.public_key, *args,
+                                    stream=True, **kwargs)
 
     def entries(self, *args, **kwargs):
         return self._client.entries(account=self, *args, **kwargs)
@@ -0,0 +1,230 @@
+"""The AsyncAttoClient class definition."""
+"""This file is part of Atto.py.
+
+Atto.py is free software: you can redistribute it and/or modify it under the
+terms of the GNU General Public License as published by the Free Software
+Foundation, either version 3 of the License, or (at your option) any later
+version.
+
+This program is distributed in the hope that it will be useful, but WITHOUT ANY
+WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+PARTICULAR PURPOSE. See the GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License along with
+this program. If not, see <https://www.gnu.org/licenses/>.
+"""
+from .Account import Account
+from .Transaction import Transaction
+from .Receivable import Receivable
+from .Entry import Entry
+from .AttoClient import (_DEFAULT_BASE_URL, _MAX_HEIGHT, _account_to_key,
+                         _instants_url, _parse_instants, _entries_endpoint,
+                         _transactions_endpoint)
+from .boilerplate import _repr
+from . import _json
+import asyncio
+import httpx
+
+__all__ = ['AsyncAttoClient']
+
+class AsyncAttoClient:
+    """An asynchronous connection to an Atto Node.
+
+    This is the asyncio counterpart of AttoClient. The methods have the same
+    names and arguments, but lookups are coroutines and streams are async
+    generators, so a single event loop can follow many streams at once.
+
+    Typical usage example::
+
+        async with AsyncAttoClient() as atto_client:
+            account = await atto_client.account(PUBLIC_KEY)
+
+            # print first 100 transactions
+            print('Hash\\tAmount')
+            async for entry in account.entries(from_=1, to=100, timeout=None):
+                print(f'{entry.hash_[0:3]}...\\t{entry.amount}')
+
+    Attributes:
+        base_url: the node API's base URL
+        lazy: whether records convert their fields on first access
+        raw_numbers: whether records keep amounts in raw and timestamps in
+            milliseconds
+    """
+    def __init__(self, base_url=_DEFAULT_BASE_URL, lazy=False,
+                 raw_numbers=False, json_loads=None, **kwargs):
+        """Create an asynchronous client with a connection to a node.
+
+        Args:
+            base_url: the node API's base URL
+            lazy: if True, records keep the parsed JSON and convert each
+                field the first time it's read. This makes records that are
+                skipped or only partly read much cheaper, but records that
+                are kept around use more memory.
+            raw_numbers: if True, amounts are raw integers and timestamps
+                are milliseconds since the epoch, so no Decimal or datetime
+                is created per record. Use attopy.raw_to_atto() and
+                attopy.timestamp_to_datetime() to convert them when needed.
+            json_loads: the JSON decoder: 'msgspec', 'orjson', 'json' or a
+                function that decodes bytes. Defaults to the fastest one that
+                is installed.
+            **kwargs: arguments to pass to httpx.AsyncClient()
+        """
+        self.base_url = base_url
+        self.lazy = lazy
+        self.raw_numbers = raw_numbers
+        self._loads = _json.get_loads(json_loads)
+        self._client = httpx.AsyncClient(base_url=base_url, **kwargs)
+
+    async def instants(self, instant=None):
+        """Return time information about the client and the server.
+
+        See AttoClient.instants().
+        """
+        instants = await self._get_json(_instants_url(instant))
+        return _parse_instants(instants)
+
+    def account(self, account, *args, stream=False, **kwargs):
+        """Return an up-to-date Account object
+
+        If stream is False, a coroutine is returned that must be awaited.
+        Otherwise, an async generator is returned.
+
+        Args:
+            account: an Account object, an address (with or without the
+            atto:// protocol prefix) or a bytestring derived from the account
+            name, with the version and checksum omitted (using
+            address_to_key())
+        """
+        public_key = _account_to_key(account)
+
+        if not stream:
+            return self._get_account(public_key, *args, **kwargs)
+
+        return self._stream(f'accounts/{public_key}/stream',
+                            Account,
+                            *args,
+                            **kwargs)
+
+    async def accounts_many(self, accounts, max_in_flight=20, errors=None):
+        """Yield up-to-date Account objects for many accounts.
+
+        See AttoClient.accounts_many().
+        """
+        failures = {} if errors is None else errors
+        accounts = iter(accounts)
+
+        async def lookup(account):
+            return await self.account(_account_to_key(account))
+
+        pending = {}
+        try:
+            while True:
+                for account in accounts:
+                    pending[asyncio.ensure_future(lookup(account))] = account
+                    if len(pending) >= max_in_flight:
+                        break
+                if not pending:
+                    break
+
+                done, _ = await asyncio.wait(
+                        pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    account = pending.pop(task)
+                    try:
+                        result = task.result()
+                    except Exception as e:
+                        failures[account] = e
+                        continue
+                    # Outside the try, so that exceptions thrown into the
+                    # generator aren't taken for lookup failures
+                    yield result
+        finally:
+            for task in pending:
+                task.cancel()
+
+        if errors is None and failures:
+            raise ExceptionGroup(f'{len(failures)} account lookups failed',
+                                 list(failures.values()))
+
+    def entry(self, hash_, *args, stream=False, **kwargs):
+        # TODO: docstring
+        if not stream:
+            raise ValueError(f'{stream=}')
+
+        return self._stream(f'accounts/entries/{hash_}/stream',
+                            Entry,
+                            *args,
+                            **kwargs)
+
+    def transaction(self, hash_, *args, stream=False, **kwargs):
+        # TODO: docstring
+        if not stream:
+            raise ValueError(f'{stream=}')
+
+        return self._stream(f'transactions/{hash_}/stream',
+                            Transaction,
+                            *args,
+                            **kwargs)
+
+    def receivables(self, account, *args, min_amount=1, stream=True, **kwargs):
+        # TODO: docstring
+        if not stream:
+            raise ValueError(f'{stream=}')
+
+        public_key = _account_to_key(account)
+        return self._stream(f'accounts/{public_key}/receivables/stream',
+                            Receivable, *args, **kwargs)
+
+    def entries(self, account=None, *args, from_=None, to=_MAX_HEIGHT,
+                stream=True, **kwargs):
+        # TODO: docstring
+        if not stream:
+            raise ValueError(f'{stream=}')
+
+        endpoint, params = _entries_endpoint(account, from_, to)
+        return self._stream(endpoint, Entry, params=params, *args, **kwargs)
+
+    def transactions(self, account=None, *args, from_=None, to=None,
+                     stream=True, **kwargs):
+        # TODO: docstring
+        if not stream:
+            raise ValueError(f'{stream=}')
+
+        endpoint, params = _transactions_endpoint(account, from_, to)
+        return self._stream(endpoint, Transaction, params=params, *args,
+                            **kwargs)
+
+    async def close(self):
+        """Close the client connection.
+
+        When used as an async context manager, this is called automatically
+        upon exiting the context.
+        """
+        await self._client.aclose()
+
+    def __repr__(self):
+        return _repr(self)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        await self.close()
+
+    async def _get_account(self, public_key, *args, **kwargs):
+        return Account(await self._get_json(f'/accounts/{public_key}', *args,
+                                            **kwargs),
+                       self, self.lazy, self.raw_numbers)
+
+    async def _get_json(self, *args, **kwargs):
+        response = await self._client.get(*args, **kwargs)
+        response.raise_for_status()
+        return self._loads(response.content)
+
+    async def _stream(self, url, type_, *args, **kwargs):
+        """Yield a type_ constructed from the next line at url"""
+        async with self._client.stream('get', url, *args, **kwargs) as stream:
+            stream.raise_for_status()
+            async for line in _json.asplit_lines(stream.aiter_bytes()):
+                yield type_(self._loads(line), self, self.lazy,
+                            self.raw_numbers)
@@ -18,11 +18,22 @@ from .Transaction import Transaction
 from .Receivable import Receivable
 from .Entry import Entry
 from .convert import address_to_key
+from .Metrics import Sample
+from .NodePool import NodePool, _interrupt
 from .boilerplate import _repr
+from . import (_concurrency, _decoding, _encodings, _export, _json,
+               columns)
+import collections
+import concurrent.futures
+import contextlib
+import functools
 import httpx
+import random
+import re
+import threading
+import time
 import datetime
 import dataclasses
-import json
 
 __all__ = ['AttoClient']
 
@@ -38,6 +49,88 @@ def _account_to_key(account):
 
     return address_to_key(account)
 
+def _instants_url(instant):
+    if not instant:
+        instant = datetime.datetime.now()
+    instant = instant.astimezone(datetime.UTC).isoformat()
+    return f'instants/{instant}'
+
+@dataclasses.dataclass
+class Instants:
+    client_instant: any
+    server_instant: any
+    difference: any
+
+    def __repr__(self):
+        return f'<Instants {self.server_instant.isoformat()}>'
+
+    def __str__(self):
+        return f'{self.difference.microseconds/1000000:6>,.3f} seconds {"ahead " if self.difference.total_seconds() < 0 else "behind"}'
+
+def _parse_instants(instants):
+    client_instant = datetime.datetime.fromisoformat(instants['clientInstant'])
+    server_instant = datetime.datetime.fromisoformat(instants['serverInstant'])
+    difference = datetime.timedelta(milliseconds=instants['differenceMillis'])
+    return Instants(client_instant=client_instant,
+                    server_instant=server_instant,
+                    difference=difference)
+
+_MAX_HEIGHT = 4294967295
+
+def _entries_endpoint(account, from_, to):
+    if account is None:
+        if from_ is not None:
+            raise ValueError(f'{account=}, {from_=}')
+        if to is not None and to != _MAX_HEIGHT:
+            raise ValueError(f'{account=}, {to=}')
+        return 'accounts/entries/stream', {}
+
+    return (f'accounts/{_account_to_key(account)}/entries/stream',
+            {'fromHeight': from_, 'toHeight': to})
+
+def _transactions_endpoint(account, from_, to):
+    if account is None:
+        return 'transactions/stream', {}
+
+    return (f'accounts/{_account_to_key(account)}/transactions/stream',
+            {'fromHeight': from_, 'toHeight': to})
+
+# Functions that identify a record by its API dict when resuming streams
+def _height(dict_):
+    return dict_['height']
+
+def _block_height(dict_):
+    return dict_['block']['height']
+
+def _hash(dict_):
+    return dict_['hash']
+
+def _block_id(dict_):
+    return dict_['block']['publicKey'], dict_['block']['height']
+
+@dataclasses.dataclass
+class _Resume:
+    """How to resume a stream. See AttoClient._resume()."""
+    key: any
+    ordered: bool
+    to: int = None
+    retries: int = None
+
+# The number of keys remembered to drop repeats in unordered streams
+_SEEN_SIZE = 65536
+
+def _retryable(error):
+    if isinstance(error, httpx.TransportError):
+        return True
+    return (isinstance(error, httpx.HTTPStatusError)
+            and (error.response.status_code >= 500
+                 or error.response.status_code == 429))
+
+def _endpoint(url):
+    """Return url with keys and instants replaced, for Metrics"""
+    url = re.sub('[0-9A-Fa-f]{64}', '{key}', str(url).lstrip('/'))
+    return re.sub('instants/.*', 'instants/{instant}', url)
+
 _DEFAULT_BASE_URL = 'https://h.tail006b6.ts.net/api'
 class AttoClient:
     """A synchronous connection to an Atto Node.
@@ -61,17 +154,86 @@ class AttoClient:
                 print(f'{entry.hash_[0:3]}...\\t{entry.amount}')
 
     Attributes:
-        base_url: the node API's base URL
+        base_url: the node API's base URL, or the base URLs of several nodes
+        nodes: the NodePool that requests are routed through, or None
+        lazy: whether records convert their fields on first access
+        raw_numbers: whether records keep amounts in raw and timestamps in
+            milliseconds
+        ledger: the Ledger that streamed entries and transactions are stored
+            in, or None
+        cache: the ResponseCache for account() and instants(), or None
+        recorder: the Recorder that responses are recorded by, or None
+        metrics: the Metrics that requests are measured by, or None
+        compression: the accepted content encodings, or None
     """
-    def __init__(self, base_url=_DEFAULT_BASE_URL, **kwargs):
+    def __init__(self, base_url=_DEFAULT_BASE_URL, lazy=False,
+                 raw_numbers=False, json_loads=None, ledger=None, cache=None,
+                 recorder=None, metrics=None, compression=None, **kwargs):
         """Create a synchronous client with a connection to a node.
 
         Args:
-            base_url: the node API's base URL
-            **kwargs: arguments to pass to httpx.Client()
+            base_url: the node API's base URL. If a list of base URLs or a
+                NodePool, requests are spread over several nodes of the same
+                network, with failover. See NodePool.
+            lazy: if True, records keep the parsed JSON and convert each
+                field the first time it's read. This makes records that are
+                skipped or only partly read much cheaper, but records that
+                are kept around use more memory.
+            raw_numbers: if True, amounts are raw integers and timestamps
+                are milliseconds since the epoch, so no Decimal or datetime
+                is created per record. Use attopy.raw_to_atto() and
+                attopy.timestamp_to_datetime() to convert them when needed.
+            json_loads: the JSON decoder: 'msgspec', 'orjson', 'json' or a
+                function that decodes bytes. Defaults to the fastest one that
+                is installed. Streams with processes require a function that
+                can be pickled.
+            ledger: a Ledger to store every streamed Entry and Transaction
+                in. See sync().
+            cache: a ResponseCache to reuse recent account() and instants()
+                results from
+            recorder: a Recorder to record the body of every successful
+                response with, for replaying with ReplayTransport
+            metrics: a Metrics to measure the latency, size and decoding
+                time of every request with
+            compression: the content encodings to accept, in order of
+                preference: 'zstd', 'br', 'gzip', 'deflate' or 'identity',
+                or a list of them. Compressed streams are decoded as they
+                arrive. With metrics, Sample.wire_bytes and
+                Sample.decompress_seconds show what each encoding costs and
+                saves. zstd requires `pip install atto.py[zstd]` and br
+                `pip install atto.py[brotli]`. Defaults to httpx's
+                Accept-Encoding, which includes gzip.
+            **kwargs: arguments to pass to httpx.Client(), or to NodePool()
+                if base_url is a list
         """
         self.base_url = base_url
-        self._client = httpx.Client(base_url=base_url, **kwargs)
+        self.lazy = lazy
+        self.raw_numbers = raw_numbers
+        self.ledger = ledger
+        self.cache = cache
+        self.recorder = recorder
+        self.metrics = metrics
+        self._loads = _json.get_loads(json_loads)
+        self._json_loads = json_loads
+        self._pools = {}
+        self._pools_lock = threading.Lock()
+        self.compression = compression
+        accept_encoding = (compression
+                           and _encodings.accept_encoding(compression))
+        if isinstance(base_url, NodePool):
+            if kwargs:
+                raise ValueError(f'{base_url=}, {kwargs=}')
+            self.nodes = self._client = base_url
+        elif isinstance(base_url, str):
+            self.nodes = None
+            self._client = httpx.Client(base_url=base_url, **kwargs)
+        else:
+            self.nodes = self._client = NodePool(base_url, **kwargs)
+
+        if accept_encoding:
+            for client in (self._client._clients if self.nodes is not None
+                           else (self._client,)):
+                client.headers['Accept-Encoding'] = accept_encoding
 
     def instants(self, instant=None):
         """Return time information about the client and the server.
@@ -83,33 +245,16 @@ class AttoClient:
             A dataclass containing the date and time of the client
             (client_instant), the date and time of the server (server_instant)
             and the time delta between the client and the server (difference).
+            If the client has a cache and instant is None, the result may be
+            up to cache.ttl seconds old.
         """
-        if not instant:
-            instant = datetime.datetime.now()
-        instant = instant.astimezone(datetime.UTC).isoformat()
-
-        @dataclasses.dataclass
-        class Instants:
-            client_instant: any
-            server_instant: any
-            difference: any
-
-            def __repr__(self):
-                return f'<Instants {server_instant.isoformat()}>'
-
-            def __str__(self):
-                return f'{self.difference.microseconds/1000000:6>,.3f} seconds {"ahead " if self.difference.total_seconds() < 0 else "behind"}'
-
-        instants = self._get_json(f'instants/{instant}')
-        client_instant = datetime.datetime.fromisoformat(instants['clientInstant'])
-        server_instant = datetime.datetime.fromisoformat(instants['serverInstant'])
-        difference = datetime.timedelta(
-                milliseconds=instants['differenceMillis'])
-        return Instants(client_instant=client_instant,
-                        server_instant=server_instant,
-                        difference=difference)
-    
-    def account(self, account, *args, stream=False, **kwargs):
+        if instant is None and self.cache is not None:
+            return self.cache.get(('instants',), self._get_instants)
+
+        return self._get_instants(instant)
+
+    def account(self, account, *args, stream=False, resume=False, retries=None,
+                **kwargs):
         """Return an up-to-date Account object
 
         Args:
@@ -117,16 +262,84 @@ class AttoClient:
             atto:// protocol prefix) or a bytestring derived from the account
             name, with the version and checksum omitted (using
             address_to_key())
+            stream: if True, yield an Account every time the account changes
+            resume: if True, reconnect when the stream is interrupted. See
+                entries().
+            retries: see entries()
         """
         public_key = _account_to_key(account)
 
         if not stream:
-            return Account(self._get_json(f'/accounts/{public_key}'), self)
+            if self.cache is not None:
+                return self.cache.get(('account', public_key),
+                                      lambda: self._get_account(public_key))
+            return self._get_account(public_key)
 
-        return self._stream(f'accounts/{public_key}/stream',
+        stream = self._open(f'accounts/{public_key}/stream',
                             Account,
+                            resume and _Resume(_height, True, None, retries),
                             *args,
                             **kwargs)
+        if self.cache is not None:
+            return self._cache_stream(('account', public_key), stream)
+        return stream
+
+    def accounts_many(self, accounts, max_in_flight=20, errors=None):
+        """Yield up-to-date Account objects for many accounts.
+
+        Up to max_in_flight lookups run at the same time, and accounts are
+        yielded in the order in which their lookups complete. Lookups beyond
+        the client's connection pool limits wait for a free connection, so
+        the pool (httpx.Limits) should allow max_in_flight keep-alive
+        connections.
+
+        A failed lookup doesn't stop the others.
+
+        Args:
+            accounts: an iterable of Account objects, addresses or public keys
+            max_in_flight: the maximum number of concurrent lookups
+            errors: a dict that failed lookups are added to, mapping the
+                account as given to the exception. If None, the failures are
+                raised together as an ExceptionGroup after every other
+                account has been yielded.
+        """
+        failures = {} if errors is None else errors
+        accounts = iter(accounts)
+
+        def lookup(account):
+            return self.account(_account_to_key(account))
+
+        with concurrent.futures.ThreadPoolExecutor(max_in_flight) as executor:
+            pending = {}
+            try:
+                while True:
+                    for account in accounts:
+                        pending[executor.submit(lookup, account)] = account
+                        if len(pending) >= max_in_flight:
+                            break
+                    if not pending:
+                        break
+
+                    done, _ = concurrent.futures.wait(
+                            pending,
+                            return_when=concurrent.futures.FIRST_COMPLETED)
+                    for future in done:
+                        account = pending.pop(future)
+                        try:
+                            result = future.result()
+                        except Exception as e:
+                            failures[account] = e
+                            continue
+                        # Outside the try, so that exceptions thrown into
+                        # the generator aren't taken for lookup failures
+                        yield result
+            finally:
+                for future in pending:
+                    future.cancel()
+
+        if errors is None and failures:
+            raise ExceptionGroup(f'{len(failures)} account lookups failed',
+                                 list(failures.values()))
 
     # stream=False because "entry" is singular, and singular methods aren't
     # streamed by default
@@ -166,50 +379,250 @@ class AttoClient:
 #            for line in stream.iter_lines():
 #                yield Account(json.loads(line), self)
 
-    def receivables(self, account, *args, min_amount=1, stream=True, **kwargs):
+    def receivables(self, account, *args, min_amount=1, stream=True,
+                    resume=False, retries=None, **kwargs):
         # TODO: docstring
         if not stream:
             raise ValueError(f'{stream=}')
 
         public_key = _account_to_key(account)
-        return self._stream(f'accounts/{public_key}/receivables/stream',
-                            Receivable, *args, **kwargs)
+        return self._open(f'accounts/{public_key}/receivables/stream',
+                          Receivable,
+                          resume and _Resume(_hash, False, None, retries),
+                          *args, **kwargs)
 
-    def entries(self, account=None, *args, from_=None, to=4294967295, stream=True,
-                **kwargs):
-        # TODO: docstring
+    def entries(self, account=None, *args, from_=None, to=_MAX_HEIGHT, stream=True,
+                parallel=None, chunk_size=1000, as_columns=False,
+                batch_size=65536, batch_delay=None, resume=False,
+                retries=None, processes=None, **kwargs):
+        """Yield the entries of an account, or new entries of all accounts.
+
+        Args:
+            account: an Account object, an address or a public key. If None,
+                new entries of all accounts are streamed.
+            from_: the first height to stream
+            to: the last height to stream
+            parallel: if given, the height range is split into chunks of
+                chunk_size heights, and up to this many chunks are fetched at
+                the same time. The entries are still yielded in height order.
+                A to beyond the account's height is lowered to the account's
+                height, so the stream ends instead of waiting for new entries.
+            chunk_size: the number of heights per chunk when parallel is given
+            as_columns: if True, yield dicts of NumPy arrays with up to
+                batch_size entries each instead of Entry objects. See
+                attopy.columns.entry_columns() for the columns. Requires
+                NumPy.
+            batch_size: the number of entries per batch when as_columns is
+                True
+            batch_delay: with as_columns, a batch is also yielded when a
+                record arrives this many seconds or more after the batch's
+                first one, so that live streams yield partial batches.
+                Defaults to 1.0 for the stream of all accounts and to None
+                otherwise. Not used with processes.
+            resume: if True, reconnect with jittered exponential backoff when
+                the connection drops or the node returns a server error.
+                Account streams continue from the height after the last
+                delivered one, and records that were already delivered are
+                dropped.
+            retries: the number of times in a row to reconnect without
+                receiving a record before giving up. Defaults to no limit.
+                Read timeouts of streams that delivered records aren't
+                counted, see FanOutTransport.
+            processes: if given, lines are decoded by a pool of this many
+                processes, which is kept until the client is closed. Lines
+                are sent to the pool in lists of 1024, or of batch_size
+                with as_columns, and records are still yielded in order.
+                With as_columns, the processes build the column batches.
+                This is meant for backfills: records of live streams are
+                held back until enough lines have arrived. Can't be
+                combined with prefetch, and a json_loads function must be
+                picklable, i.e. defined at module level.
+            prefetch: if given, a background thread reads and decodes the
+                stream while the caller handles records, up to this many
+                received chunks ahead. Errors are raised once the records
+                received before them have been yielded. Closing the
+                generator early wakes the thread by shutting down an
+                HTTP/1.1 connection. An HTTP/2 connection is shared with
+                other streams, so closing waits for the next chunk instead.
+                This keyword is accepted by every streaming method.
+            prefetch_bytes: the maximum number of bytes of lines to read
+                ahead when prefetch is given. Defaults to 8 MiB.
+            **kwargs: arguments to pass to httpx.Client.stream()
+        """
         if not stream:
             raise ValueError(f'{stream=}')
 
+        type_ = columns._as_dict if as_columns else Entry
+        if processes:
+            kwargs['processes'] = processes
+            if as_columns:
+                kwargs.update(to_columns=columns.entry_columns,
+                              batch_lines=batch_size)
         if account is None:
-            endpoint = 'accounts/entries/stream'
-            params = {}
-            if from_ is not None:
-                raise ValueError(f'{account=}, {from_=}')
-            if to is not None:
-                raise ValueError(f'{account=}, {to=}')
+            resume = resume and _Resume(_hash, False, None, retries)
+        else:
+            resume = resume and _Resume(_height, True, to, retries)
+
+        if parallel:
+            records = self._backfill(_entries_endpoint, type_, account, from_,
+                                     to, parallel, chunk_size, resume, *args,
+                                     **kwargs)
         else:
-            endpoint = f'accounts/{_account_to_key(account)}/entries/stream'
-            params = {'fromHeight': from_, 'toHeight': to}
+            endpoint, params = _entries_endpoint(account, from_, to)
+            records = self._open(endpoint, type_, resume, params=params,
+                                 *args, **kwargs)
 
-        return self._stream(endpoint, Entry, params=params, *args, **kwargs)
+        if as_columns and not processes:
+            if batch_delay is None and account is None:
+                batch_delay = 1.0
+            return columns._column_batches(records, columns.entry_columns,
+                                           batch_size, batch_delay)
+        return records
 
     def transactions(self, account=None, *args, from_=None, to=None,
-                     stream=True, **kwargs):
-        # TODO: docstring
+                     stream=True, parallel=None, chunk_size=1000,
+                     as_columns=False, batch_size=65536, batch_delay=None,
+                     resume=False, retries=None, processes=None, **kwargs):
+        """Yield the transactions of an account, or new transactions.
+
+        Args:
+            account: an Account object, an address or a public key. If None,
+                new transactions of all accounts are streamed.
+            from_: the first height to stream
+            to: the last height to stream
+            parallel: see entries()
+            chunk_size: see entries()
+            as_columns: like entries(), but see
+                attopy.columns.transaction_columns() for the columns
+            batch_size: see entries()
+            batch_delay: see entries()
+            resume: see entries()
+            retries: see entries()
+            processes: see entries()
+            **kwargs: arguments to pass to httpx.Client.stream()
+        """
         if not stream:
             raise ValueError(f'{stream=}')
-        
+
+        type_ = columns._as_dict if as_columns else Transaction
+        if processes:
+            kwargs['processes'] = processes
+            if as_columns:
+                kwargs.update(to_columns=columns.transaction_columns,
+                              batch_lines=batch_size)
         if account is None:
-            endpoint = 'transactions/stream'
-            params = {}
+            resume = resume and _Resume(_block_id, False, None, retries)
         else:
-            public_key = _account_to_key(account)
-            endpoint = f'accounts/{public_key}/transactions/stream'
-            params = {'fromHeight': from_, 'toHeight': to}
+            resume = resume and _Resume(_block_height, True, to, retries)
 
-        return self._stream(endpoint, Transaction, params=params, *args,
-                            **kwargs)
+        if parallel:
+            records = self._backfill(_transactions_endpoint, type_, account,
+                                     from_, to, parallel, chunk_size, resume,
+                                     *args, **kwargs)
+        else:
+            endpoint, params = _transactions_endpoint(account, from_, to)
+            records = self._open(endpoint, type_, resume, params=params,
+                                 *args, **kwargs)
+
+        if as_columns and not processes:
+            if batch_delay is None and account is None:
+                batch_delay = 1.0
+            return columns._column_batches(records,
+                                           columns.transaction_columns,
+                                           batch_size, batch_delay)
+        return records
+
+    def sync(self, account, entries=True, transactions=False, **kwargs):
+        """Fetch the heights of an account that are missing from the ledger.
+
+        Only heights above the highest stored height are fetched, so calling
+        this again after a restart only fetches what's new.
+
+        Args:
+            account: an Account object, an address or a public key
+            entries: whether to sync the account's entries
+            transactions: whether to sync the account's transactions
+            **kwargs: arguments to pass to entries() and transactions(), such
+                as parallel
+        """
+        if self.ledger is None:
+            raise ValueError(f'{self.ledger=}')
+
+        height = self.account(account).height
+        for table, method, wanted in (('entries', self.entries, entries),
+                                      ('transactions', self.transactions,
+                                       transactions)):
+            stored = self.ledger.height(account, table)
+            if wanted and stored < height:
+                for _ in method(account, from_=stored + 1, to=height,
+                                **kwargs):
+                    pass
+
+    def export_entries(self, account, path, format='ndjson', compression=None,
+                       from_=None, to=None, batch_size=65536, resume=True,
+                       retries=None, parallel=None, chunk_size=1000,
+                       **kwargs):
+        """Write the entries of an account, or new entries, to a file.
+
+        Entries are written straight from the decoded JSON, without creating
+        Entry objects, in chunks of batch_size rows, so memory use doesn't
+        grow with the account's history. After every chunk, the progress is
+        saved next to path, in path + '.progress'.
+
+        NDJSON files contain one compact JSON object per line, as sent by the
+        node. CSV files and Parquet datasets have the columns in
+        attopy._export.ENTRY_COLUMNS, with keys and hashes as hexadecimal
+        strings, amounts in raw and timestamps in milliseconds since the
+        epoch. A Parquet dataset is a directory with one file per chunk.
+
+        Args:
+            account: an Account object, an address or a public key. If None,
+                new entries of all accounts are written until the stream ends
+                or is interrupted.
+            path: the file, or the directory for Parquet
+            format: 'ndjson', 'csv' or 'parquet'. Parquet requires PyArrow.
+            compression: 'gzip', 'bz2' or 'xz' for NDJSON and CSV, a Parquet
+                codec such as 'zstd' or 'snappy' for Parquet, or None
+            from_: the first height to write
+            to: the last height to write. Defaults to the account's height.
+            batch_size: the number of rows per chunk
+            resume: if True and path has saved progress, continue after the
+                last written height, discarding anything written after the
+                progress was saved. If path was deleted or is shorter than
+                the saved progress, the export starts over. If False, path
+                is overwritten.
+            retries: the number of times in a row to reconnect a dropped
+                connection, as with entries(resume=True), without receiving
+                a record before giving up. Defaults to no limit. Use 0 to
+                not reconnect. Applies whether or not resume is True.
+            parallel: see entries(). Only for an account.
+            chunk_size: see entries()
+            **kwargs: arguments to pass to httpx.Client.stream()
+
+        Returns:
+            The number of entries written by this call.
+        """
+        return self._export(_entries_endpoint, _height, _hash,
+                            _export.ENTRY_COLUMNS, _export.entry_height,
+                            account, path, format, compression, from_, to,
+                            batch_size, resume, retries, parallel,
+                            chunk_size, **kwargs)
+
+    def export_transactions(self, account, path, format='ndjson',
+                            compression=None, from_=None, to=None,
+                            batch_size=65536, resume=True, retries=None,
+                            parallel=None, chunk_size=1000, **kwargs):
+        """Write the transactions of an account, or new ones, to a file.
+
+        Like export_entries(), but with the columns in
+        attopy._export.TRANSACTION_COLUMNS. Block fields that a block type
+        doesn't have are empty.
+        """
+        return self._export(_transactions_endpoint, _block_height, _block_id,
+                            _export.TRANSACTION_COLUMNS,
+                            _export.transaction_height, account, path, format,
+                            compression, from_, to, batch_size, resume,
+                            retries, parallel, chunk_size, **kwargs)
 
     def close(self):
         """Close the client connection.
@@ -218,6 +631,8 @@ class AttoClient:
         exiting the context.
         """
         self._client.close()
+        for pool in self._pools.values():
+            pool.shutdown(cancel_futures=True)
 
     def __repr__(self):
         return _repr(self)
@@ -228,13 +643,360 @@ class AttoClient:
     def __exit__(self, *args):
         self.close()
 
-    def _get_json(self, *args, **kwargs):
-        response = self._client.get(*args, **kwargs)
-        response.raise_for_status()
-        return response.json()
+    def _get_instants(self, instant=None):
+        return _parse_instants(self._get_json(_instants_url(instant)))
+
+    def _get_account(self, public_key):
+        return Account(self._get_json(f'/accounts/{public_key}'), self,
+                       self.lazy, self.raw_numbers)
+
+    def _cache_stream(self, key, stream):
+        """Yield from stream, caching each record under key"""
+        self.cache.pin(key)
+        try:
+            for record in stream:
+                self.cache.put(key, record)
+                yield record
+        finally:
+            self.cache.unpin(key)
+
+    def _get_json(self, url, *args, **kwargs):
+        if self.metrics is None:
+            response = self._client.get(url, *args, **kwargs)
+            response.raise_for_status()
+            if self.recorder is not None:
+                self.recorder.record(response, response.content)
+            return self._loads(response.content)
+
+        with self._measure(url, 'lookup', None, kwargs) as (sample, kwargs):
+            start = time.perf_counter()
+            with self._client.stream('get', url, *args, **kwargs) as response:
+                sample.ttfb_seconds = time.perf_counter() - start
+                content = b''.join(_encodings.decode(response, sample))
+            response.raise_for_status()
+            if self.recorder is not None:
+                self.recorder.record(response, content)
+            return sample._time_loads(self._loads)(content)
+
+    @contextlib.contextmanager
+    def _measure(self, url, kind, type_, kwargs):
+        """Yield a Sample of a request, which is observed when it ends, and
+        a copy of kwargs to make the request with
+
+        kwargs are the request's arguments. A trace extension is added to the
+        copy to time new connections.
+        """
+        sample = Sample(_endpoint(url), kind,
+                        type_ and type_.__name__)
+        kwargs = {**kwargs,
+                  'extensions': {**(kwargs.get('extensions') or {}),
+                                 'trace': sample._trace}}
+        start = time.perf_counter()
+        try:
+            yield sample, kwargs
+        except Exception as e:
+            sample.error = e
+            raise
+        finally:
+            sample.seconds = time.perf_counter() - start
+            self.metrics.observe(sample)
+
+    def _export(self, endpoint_for, key, global_key, export_columns, height,
+                account, path, format, compression, from_, to, batch_size,
+                resume, retries, parallel, chunk_size, **kwargs):
+        """See export_entries(). key and global_key identify records when
+        resuming account and global streams.
+
+        resume only decides whether saved progress is read. Dropped streams
+        are always reconnected, up to retries times in a row.
+        """
+        progress = _export.read_progress(path) if resume else None
+        if progress is not None and ((progress['format'],
+                                      progress['compression'])
+                                     != (format, compression)):
+            raise ValueError(f'{path} was exported with '
+                             f'format={progress["format"]!r} and '
+                             f'compression={progress["compression"]!r}')
+
+        if account is None:
+            stream_resume = _Resume(global_key, False, None, retries)
+        else:
+            if to is None:
+                to = self.account(account).height
+            if progress is not None and progress['height'] is not None:
+                from_ = progress['height'] + 1
+            if (from_ or 1) > to:
+                return 0
+            stream_resume = _Resume(key, True, to, retries)
+
+        if parallel:
+            dicts = self._backfill(endpoint_for, columns._as_dict, account,
+                                   from_, to, parallel, chunk_size,
+                                   stream_resume, **kwargs)
+        else:
+            endpoint, params = endpoint_for(account, from_, to)
+            dicts = self._open(endpoint, columns._as_dict, stream_resume,
+                               params=params, **kwargs)
+        with contextlib.closing(dicts):
+            return _export.export(dicts, path, format, compression,
+                                  export_columns, height, batch_size,
+                                  progress, _json.get_dumps())
+
+    def _backfill(self, endpoint_for, type_, account, from_, to, parallel,
+                  chunk_size, resume, *args, **kwargs):
+        """Return a generator of the type_s in from_..to, which fetches
+        chunks concurrently"""
+        if account is None:
+            raise ValueError(f'{account=}, {parallel=}')
+        return self._backfill_chunks(endpoint_for, type_, account, from_, to,
+                                     parallel, chunk_size, resume, *args,
+                                     **kwargs)
+
+    def _backfill_chunks(self, endpoint_for, type_, account, from_, to,
+                         parallel, chunk_size, resume, *args, **kwargs):
+        """See _backfill()"""
+        from_ = 1 if from_ is None else from_
+        height = self.account(account).height
+        to = height if to is None else min(to, height)
+
+        def fetch(chunk):
+            endpoint, params = endpoint_for(account, *chunk)
+            chunk_resume = resume and dataclasses.replace(resume, to=chunk[1])
+            return list(self._open(endpoint, type_, chunk_resume,
+                                   params=params, *args, **kwargs))
+
+        with concurrent.futures.ThreadPoolExecutor(parallel) as executor:
+            chunks = _concurrency.height_chunks(from_, to, chunk_size)
+            results = _concurrency.ordered_map(executor, fetch, chunks,
+                                               window=2 * parallel)
+            with contextlib.closing(results):
+                for records in results:
+                    yield from records
+
+    def _open(self, url, type_, resume, *args, **kwargs):
+        """Return _stream(), or _resume() if resume is a _Resume"""
+        if resume:
+            return self._resume(url, type_, resume, *args, **kwargs)
+        return self._stream(url, type_, *args, **kwargs)
+
+    def _resume(self, url, type_, resume, *args, params=None, backoff=0.5,
+                max_backoff=30.0, **kwargs):
+        """Yield from _stream(url), reconnecting when it's interrupted.
+
+        resume.key(dict_) identifies a record. If resume.ordered, keys are
+        heights: the stream is reopened from the height after the last
+        delivered one, and lower heights are dropped. Otherwise, the last
+        _SEEN_SIZE keys are remembered and repeats are dropped.
+
+        Ordered streams end when resume.to is reached or when the node ends a
+        stream with a resume.to. Other streams are reopened when they end,
+        since the node only ends them when the connection is cut.
+
+        A read timeout after at least one record means that a live stream was
+        idle. It's reopened at once and doesn't count as a failure, so a read
+        timeout can be used to replace idle connections that were silently
+        dropped.
+        """
+        params = dict(params or {})
+        last = None
+        seen = collections.OrderedDict()
+
+        def accept(key):
+            nonlocal last
+            if resume.ordered:
+                if last is not None and key <= last:
+                    return False
+                last = key
+                return True
+
+            if key in seen:
+                return False
+            seen[key] = None
+            if len(seen) > _SEEN_SIZE:
+                seen.popitem(last=False)
+            return True
+
+        failures = 0
+        while True:
+            if resume.ordered and last is not None:
+                if resume.to is not None and last >= resume.to:
+                    return
+                params['fromHeight'] = last + 1
+
+            error = None
+            received = False
+            try:
+                for record in self._stream(url, type_, *args, params=params,
+                                           accept=accept, key=resume.key,
+                                           **kwargs):
+                    failures = 0
+                    received = True
+                    yield record
+            except httpx.HTTPError as e:
+                if not _retryable(e):
+                    raise
+                error = e
+            else:
+                if resume.ordered and resume.to is not None:
+                    return
+
+            if self.metrics is not None:
+                self.metrics.observe(Sample(_endpoint(url), 'reconnect',
+                                            type_.__name__, error=error))
+            if received and isinstance(error, httpx.ReadTimeout):
+                continue
+
+            failures += 1
+            if resume.retries is not None and failures > resume.retries:
+                if error is not None:
+                    raise error
+                return
+            time.sleep(random.uniform(0, min(max_backoff,
+                                             backoff * 2 ** failures)))
 
     def _stream(self, url, type_, *args, **kwargs):
-        """Yield a type_ constructed from the next line at url"""
+        """Yield a type_ constructed from the next line at url
+
+        See _stream_records() for the keyword arguments.
+        """
+        if self.metrics is not None:
+            with self._measure(url, 'stream', type_,
+                               kwargs) as (sample, kwargs):
+                yield from self._stream_records(url, type_, *args,
+                                                sample=sample, **kwargs)
+            return
+
+        yield from self._stream_records(url, type_, *args, **kwargs)
+
+    def _stream_records(self, url, type_, *args, accept=None, key=None,
+                        sample=None, prefetch=None, prefetch_bytes=2**23,
+                        processes=None, to_columns=None, batch_lines=1024,
+                        **kwargs):
+        """The body of _stream(). If sample is a Sample, it's filled in.
+
+        Lines for which accept(key(dict_)) is false are skipped.
+
+        With prefetch, lines are read and decoded by a background thread, up
+        to prefetch chunks and prefetch_bytes ahead of the caller.
+
+        With processes, lines are decoded by a pool of that many processes in
+        lists of batch_lines. With to_columns as well, each list is turned
+        into a column batch, and batches are yielded instead of records.
+        """
+        if processes:
+            if prefetch:
+                raise ValueError(f'{prefetch=}, {processes=}')
+            _decoding.check_loads(self._json_loads)
+
+        loads = self._loads
+        construct = type_
+        start = time.perf_counter()
         with self._client.stream('get', url, *args, **kwargs) as stream:
-            for line in stream.iter_lines():
-                yield type_(json.loads(line), self)
+            if sample is not None:
+                sample.ttfb_seconds = time.perf_counter() - start
+            stream.raise_for_status()
+            # Decoded here rather than by httpx, to measure compression
+            chunks = _encodings.decode(stream, sample)
+            if sample is not None:
+                loads = sample._time_loads(loads)
+                construct = sample._time_construct(type_)
+            if self.recorder is not None:
+                chunks = self.recorder.tee(stream, chunks)
+            try:
+                if processes:
+                    yield from self._decode_in_processes(
+                            chunks, type_, accept, key, processes,
+                            to_columns, batch_lines)
+                    return
+
+                if prefetch:
+                    batches = self._decode_batches(chunks, type_, accept, key,
+                                                   loads, construct)
+                    yield from _concurrency.prefetch(
+                            batches, prefetch, prefetch_bytes,
+                            lambda: _interrupt(stream))
+                    return
+
+                for line in _json.split_lines(chunks):
+                    dict_ = loads(line)
+                    if accept is not None and not accept(key(dict_)):
+                        continue
+                    if self.ledger is not None:
+                        self.ledger.record(dict_, line)
+                    yield construct(dict_, self, self.lazy,
+                                    self.raw_numbers)
+            finally:
+                if self.recorder is not None:
+                    # Record the buffered end of the body now rather than
+                    # when the generator is collected
+                    chunks.close()
+                if self.ledger is not None:
+                    self.ledger.flush()
+
+    def _decode_batches(self, chunks, type_, accept, key, loads, construct):
+        """Yield the records and size in bytes of the lines of each chunk
+
+        See _stream_records().
+        """
+        for lines in _json.split_batches(chunks):
+            records = []
+            for line in lines:
+                dict_ = loads(line)
+                if accept is not None and not accept(key(dict_)):
+                    continue
+                if self.ledger is not None:
+                    self.ledger.record(dict_, line)
+                records.append(construct(dict_, self, self.lazy,
+                                         self.raw_numbers))
+            yield records, sum(map(len, lines))
+
+    def _decode_in_processes(self, chunks, type_, accept, key, processes,
+                             to_columns, batch_lines):
+        """Yield the records, or column batches, decoded by a process pool
+
+        See _stream_records().
+        """
+        decode = functools.partial(
+                _decoding.decode, type_=type_, lazy=self.lazy,
+                raw_numbers=self.raw_numbers, json_loads=self._json_loads,
+                key=key if accept is not None else None,
+                ledger=self.ledger is not None, to_columns=to_columns)
+        attach = hasattr(type_, '_client')
+        results = _concurrency.ordered_map(
+                self._pool(processes), decode,
+                _decoding.batched(_json.split_lines(chunks), batch_lines),
+                window=2 * processes)
+
+        with contextlib.closing(results):
+            for records, keys, rows in results:
+                accepted = ([accept(record_key) for record_key in keys]
+                            if accept is not None else None)
+                if rows is not None:
+                    for i, row in enumerate(rows):
+                        if row is not None and (accepted is None
+                                                or accepted[i]):
+                            self.ledger._add(*row)
+
+                if to_columns is not None:
+                    if accepted is not None and not all(accepted):
+                        mask = columns._numpy().array(accepted, dtype=bool)
+                        records = {name: column[mask]
+                                   for name, column in records.items()}
+                    yield records
+                    continue
+
+                for i, record in enumerate(records):
+                    if accepted is not None and not accepted[i]:
+                        continue
+                    if attach:
+                        record._client = self
+                    yield record
+
+    def _pool(self, processes):
+        """Return the client's process pool with that many processes"""
+        with self._pools_lock:
+            pool = self._pools.get(processes)
+            if pool is None:
+                pool = self._pools[processes] = (
+                        concurrent.futures.ProcessPoolExecutor(processes))
+            return pool
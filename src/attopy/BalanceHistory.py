@@ -0,0 +1,338 @@
+"""The BalanceHistory class definition."""
+"""This file is part of Atto.py.
+
+Atto.py is free software: you can redistribute it and/or modify it under the
+terms of the GNU General Public License as published by the Free Software
+Foundation, either version 3 of the License, or (at your option) any later
+version.
+
+This program is distributed in the hope that it will be useful, but WITHOUT ANY
+WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+PARTICULAR PURPOSE. See the GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License along with
+this program. If not, see <https://www.gnu.org/licenses/>.
+"""
+from .Entry import Entry
+from .AttoClient import _account_to_key
+from .Ledger import _to_millis
+from .convert import raw_to_atto
+import array
+import bisect
+import threading
+
+__all__ = ['BalanceHistory']
+
+# Padding of the range trees, which never wins a comparison
+_NO_MIN = 2**64 - 1
+_NO_MAX = 0
+
+class _RangeTree:
+    """Range minimum and maximum of unsigned 64-bit integers.
+
+    The leaves are stored after the inner nodes, in arrays whose capacity is
+    doubled when it runs out, so extending the tree takes amortized time
+    proportional to the number of new values.
+    """
+    def __init__(self, values=()):
+        self.rebuild(values)
+
+    def rebuild(self, values):
+        self._n = len(values)
+        capacity = 1
+        while capacity < self._n:
+            capacity *= 2
+        self._capacity = capacity
+        self._min = array.array('Q', [_NO_MIN]) * (2 * capacity)
+        self._max = array.array('Q', [_NO_MAX]) * (2 * capacity)
+        self._set(0, values)
+
+    def extend(self, values):
+        if self._n + len(values) > self._capacity:
+            start = self._capacity
+            self.rebuild(self._min[start:start + self._n]
+                         + array.array('Q', values))
+        else:
+            self._set(self._n, values)
+            self._n += len(values)
+
+    def query(self, first, last):
+        """Return the minimum and maximum of the values first..last."""
+        low, high = _NO_MIN, _NO_MAX
+        first += self._capacity
+        last += self._capacity + 1
+        while first < last:
+            if first & 1:
+                low = min(low, self._min[first])
+                high = max(high, self._max[first])
+                first += 1
+            if last & 1:
+                last -= 1
+                low = min(low, self._min[last])
+                high = max(high, self._max[last])
+            first //= 2
+            last //= 2
+        return low, high
+
+    def _set(self, index, values):
+        """Set the leaves from index on, and update their ancestors"""
+        if not len(values):
+            return
+        first = self._capacity + index
+        last = first + len(values) - 1
+        self._min[first:last + 1] = array.array('Q', values)
+        self._max[first:last + 1] = array.array('Q', values)
+        minimum, maximum = self._min, self._max
+        first, last = first // 2, last // 2
+        while first:
+            for i in range(first, last + 1):
+                minimum[i] = min(minimum[2 * i], minimum[2 * i + 1])
+                maximum[i] = max(maximum[2 * i], maximum[2 * i + 1])
+            first, last = first // 2, last // 2
+
+class _Account:
+    """The entries of one account, sorted by height"""
+    def __init__(self):
+        self.heights = array.array('Q')
+        self.timestamps = array.array('q')
+        self.balances = array.array('Q')
+        self.previous_balances = array.array('Q')
+        # volumes[i] is the total absolute amount of the first i entries
+        self.volumes = [0]
+        self.tree = _RangeTree()
+        # The number of entries in volumes and tree
+        self.indexed = 0
+
+    def add(self, height, timestamp, balance, previous_balance):
+        """Add an entry, and return whether it's new"""
+        i = bisect.bisect_left(self.heights, height)
+        if i < len(self.heights) and self.heights[i] == height:
+            return False
+
+        self.heights.insert(i, height)
+        self.timestamps.insert(i, timestamp)
+        self.balances.insert(i, balance)
+        self.previous_balances.insert(i, previous_balance)
+        if i < self.indexed:
+            # Rebuild volumes and tree from scratch on the next query
+            self.indexed = 0
+            self.volumes = [0]
+        return True
+
+    def refresh(self):
+        """Index the entries that were added since the last query"""
+        if self.indexed == len(self.heights):
+            return
+
+        start = self.indexed
+        volume = self.volumes[-1]
+        for balance, previous in zip(self.balances[start:],
+                                     self.previous_balances[start:]):
+            volume += abs(balance - previous)
+            self.volumes.append(volume)
+        if start:
+            self.tree.extend(self.balances[start:])
+        else:
+            self.tree.rebuild(self.balances)
+        self.indexed = len(self.heights)
+
+    def complete(self, first, last):
+        """Whether no heights are missing between indices first and last"""
+        return self.heights[last] - self.heights[first] == last - first
+
+    def after(self, time):
+        """Return the index of the first entry after time, checking that
+        the balance at time is known"""
+        i = bisect.bisect_right(self.timestamps, time)
+        if i == 0:
+            if self.heights[0] != 1:
+                raise ValueError(f'{time=} is before the first entry')
+        elif i < len(self.heights) and not self.complete(i - 1, i):
+            raise ValueError(f'{time=} is in a gap of missing heights')
+        return i
+
+class BalanceHistory:
+    """An index of the balances of accounts over time.
+
+    Entries are added as they're streamed, and are kept per account in
+    arrays sorted by height, with the timestamps, balances and running
+    volume of each. Balances at a time or height are found by bisection, and
+    the lowest and highest balance and the volume of a time range in
+    O(log n), so reports don't have to stream an account's entries again.
+
+    Entries may arrive in any order, and more than once. Queries that depend
+    on heights which haven't been added raise a ValueError. An account's
+    history is assumed to be complete up to the highest added height, so
+    balances after the last entry are that entry's balance.
+
+    Typical usage example::
+
+        history = BalanceHistory()
+        with AttoClient() as atto_client:
+            # parallel ends the stream at the account's current height
+            history.update(atto_client.entries(ADDRESS, from_=1, parallel=4))
+            print(history.balance_at(ADDRESS, datetime.datetime(2024, 1, 1)))
+            for entry in history.follow(atto_client.entries(
+                    ADDRESS, from_=history.height(ADDRESS) + 1,
+                    resume=True)):
+                ...
+
+    Attributes:
+        raw_numbers: whether balances are returned in raw instead of atto
+    """
+    def __init__(self, raw_numbers=False):
+        """Create an empty history.
+
+        Args:
+            raw_numbers: if True, balances and volumes are returned as raw
+                integers instead of Decimals in atto
+        """
+        self.raw_numbers = raw_numbers
+        self._accounts = {}
+        self._lock = threading.Lock()
+
+    def add(self, entry):
+        """Add an Entry, or an entry's API dict.
+
+        Returns:
+            False if the entry's height was already added, otherwise True
+        """
+        if isinstance(entry, dict):
+            values = (entry['publicKey'].upper(), entry['height'],
+                      entry['timestamp'], entry['balance'],
+                      entry['previousBalance'])
+        else:
+            values = (Entry.public_key.stored(entry).hex().upper(),
+                      Entry.height.stored(entry),
+                      Entry.timestamp.stored(entry),
+                      Entry.balance.stored(entry),
+                      Entry.previous_balance.stored(entry))
+
+        public_key, *row = values
+        with self._lock:
+            account = self._accounts.get(public_key)
+            if account is None:
+                account = self._accounts[public_key] = _Account()
+            return account.add(*row)
+
+    def update(self, entries):
+        """Add entries, and return the number of new ones."""
+        return sum(self.add(entry) for entry in entries)
+
+    def follow(self, entries):
+        """Yield entries, adding each one first."""
+        for entry in entries:
+            self.add(entry)
+            yield entry
+
+    def height(self, account):
+        """Return the highest added height of an account, or 0."""
+        with self._lock:
+            history = self._accounts.get(self._key(account))
+            return history.heights[-1] if history is not None else 0
+
+    def balance_at(self, account, time):
+        """Return the balance of an account after the entries up to time.
+
+        Args:
+            account: an Account object, an address or a public key
+            time: a datetime, or milliseconds since the epoch
+        """
+        with self._lock:
+            history = self._history(account)
+            i = history.after(_to_millis(time))
+            return self._amount(history.balances[i - 1] if i else 0)
+
+    def balance_at_height(self, account, height):
+        """Return the balance of an account after the entry at height."""
+        with self._lock:
+            history = self._history(account)
+            heights = history.heights
+            if height == 0:
+                return self._amount(0)
+            if height > heights[-1]:
+                raise ValueError(f'{height=} is above the highest added '
+                                 f'height, {heights[-1]}')
+
+            i = bisect.bisect_left(heights, height)
+            if heights[i] == height:
+                return self._amount(history.balances[i])
+            # The next entry knows the balance before it
+            if heights[i] == height + 1:
+                return self._amount(history.previous_balances[i])
+            raise ValueError(f'{height=} is missing')
+
+    def balance_range(self, account, since=None, until=None):
+        """Return the lowest and highest balance of an account in a period.
+
+        The balance at since counts, as do the balances after each entry
+        after since and up to until.
+
+        Args:
+            account: an Account object, an address or a public key
+            since: the start, as a datetime or in milliseconds. Defaults to
+                the first added entry.
+            until: the end, as a datetime or in milliseconds. Defaults to
+                the last added entry.
+
+        Returns:
+            (lowest, highest)
+        """
+        with self._lock:
+            history = self._history(account)
+            history.refresh()
+            first, last = self._range(history, since, until)
+            if since is not None or first > last:
+                # The balance before the first entry of the period
+                low = high = history.balances[first - 1] if first else 0
+            else:
+                low, high = _NO_MIN, _NO_MAX
+            if first <= last:
+                range_low, range_high = history.tree.query(first, last)
+                low, high = min(low, range_low), max(high, range_high)
+            return self._amount(low), self._amount(high)
+
+    def volume(self, account, since=None, until=None):
+        """Return the total amount sent and received by an account in a
+        period.
+
+        See balance_range() for the arguments.
+        """
+        with self._lock:
+            history = self._history(account)
+            history.refresh()
+            first, last = self._range(history, since, until)
+            return self._amount(history.volumes[last + 1]
+                                - history.volumes[first])
+
+    def __repr__(self):
+        return f'<BalanceHistory {len(self._accounts)} accounts>'
+
+    def _key(self, account):
+        return _account_to_key(account).upper()
+
+    def _history(self, account):
+        history = self._accounts.get(self._key(account))
+        if history is None:
+            raise ValueError(f'{account=} has no entries')
+        return history
+
+    def _range(self, history, since, until):
+        """Return the indices of the first and last entry after since and
+        up to until, checking that none are missing"""
+        if since is None:
+            first = 0
+        else:
+            first = history.after(_to_millis(since))
+        if until is None:
+            last = len(history.heights) - 1
+        else:
+            last = history.after(_to_millis(until)) - 1
+
+        if first <= last and not history.complete(first, last):
+            raise ValueError(f'heights are missing between {since=} and '
+                             f'{until=}')
+        return first, last
+
+    def _amount(self, raw):
+        return raw if self.raw_numbers else raw_to_atto(raw)
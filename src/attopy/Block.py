@@ -15,26 +15,34 @@ You should have received a copy of the GNU General Public License along with
 this program. If not, see <https://www.gnu.org/licenses/>. 
 """
 from .convert import (_str_to_algorithm, _timestamp_to_datetime,
-                      _str_to_network, _raw_to_atto, _str_to_block_type)
+                      _str_to_network, _raw_to_atto, _str_to_block_type,
+                      _hex_to_bytes, _bytes_to_hex)
+from ._fields import Field, Record
 from . import _format
 
-class Block:
+class Block(Record):
     # TODO: docstring
-    def __init__(self, dict_):
-        self.public_key = dict_['publicKey']
-        self.version = dict_['version']
-        self.algorithm = _str_to_algorithm(dict_['algorithm'])
-        self.timestamp = _timestamp_to_datetime(dict_['timestamp'])
-        self.network = _str_to_network(dict_['network'])
-        self.balance = _raw_to_atto(dict_['balance'])
-        self.type = _str_to_block_type(dict_['type'])
-        self.height = dict_.get('height')
-        self.previous = dict_.get('previous')
-        self.representative_algorithm = dict_.get('representativeAlgorithm', None)
-        if self.representative_algorithm is not None:
-            self.representative_algorithm = _str_to_algorithm(
-                    self.representative_algorithm)
-        self.representative_public_key = dict_.get('representativePublicKey', None)
+    __slots__ = ('_public_key', '_version', '_algorithm', '_timestamp',
+                 '_network', '_balance', '_type', '_height', '_previous',
+                 '_representative_algorithm', '_representative_public_key')
+
+    public_key = Field('publicKey', _hex_to_bytes, _bytes_to_hex)
+    version = Field('version')
+    algorithm = Field('algorithm', _str_to_algorithm)
+    timestamp = Field('timestamp', export=_timestamp_to_datetime, numeric=True)
+    network = Field('network', _str_to_network)
+    balance = Field('balance', export=_raw_to_atto, numeric=True)
+    type = Field('type', _str_to_block_type)
+    height = Field('height', default=None)
+    previous = Field('previous', _hex_to_bytes, _bytes_to_hex, default=None)
+    representative_algorithm = Field('representativeAlgorithm',
+                                     _str_to_algorithm, default=None)
+    representative_public_key = Field('representativePublicKey',
+                                      _hex_to_bytes, _bytes_to_hex,
+                                      default=None)
+
+    def __init__(self, dict_, lazy=False, raw_numbers=False):
+        self._load(dict_, lazy, raw_numbers)
 
     def __repr__(self):
         return f'<Block {self.public_key[0:6]}... {self.height}>'
@@ -15,28 +15,42 @@ You should have received a copy of the GNU General Public License along with
 this program. If not, see <https://www.gnu.org/licenses/>. 
 """
 from .convert import (_str_to_algorithm, _str_to_block_type, _raw_to_atto,
-                      _timestamp_to_datetime)
+                      _timestamp_to_datetime, _hex_to_bytes, _bytes_to_hex,
+                      _context)
+from ._fields import Field, Record
 from . import _format
 
-class Entry:
+class Entry(Record):
     # TODO: docstring
-    def __init__(self, dict_, client):
+    __slots__ = ('_client', '_hash_', '_algorithm', '_public_key', '_height',
+                 '_block_type', '_subject_algorithm', '_subjectPublicKey',
+                 '_previous_balance', '_balance', '_timestamp')
+
+    hash_ = Field('hash', _hex_to_bytes, _bytes_to_hex)
+    algorithm = Field('algorithm', _str_to_algorithm)
+    public_key = Field('publicKey', _hex_to_bytes, _bytes_to_hex)
+    height = Field('height')
+    block_type = Field('blockType', _str_to_block_type)
+    subject_algorithm = Field('subjectAlgorithm', _str_to_algorithm)
+    subjectPublicKey = Field('subjectPublicKey', _hex_to_bytes, _bytes_to_hex)
+    previous_balance = Field('previousBalance', export=_raw_to_atto,
+                             numeric=True)
+    balance = Field('balance', export=_raw_to_atto, numeric=True)
+    timestamp = Field('timestamp', export=_timestamp_to_datetime, numeric=True)
+
+    def __init__(self, dict_, client, lazy=False, raw_numbers=False):
         self._client = client
+        self._load(dict_, lazy, raw_numbers)
 
-        self.hash_ = dict_['hash']
-        self.algorithm = _str_to_algorithm(dict_['algorithm'])
-        self.public_key = dict_['publicKey']
-        self.height = dict_['height']
-        self.block_type = _str_to_block_type(dict_['blockType'])
-        self.subject_algorithm = _str_to_algorithm(dict_['subjectAlgorithm'])
-        self.subjectPublicKey = dict_['subjectPublicKey']
-        self.previous_balance = _raw_to_atto(dict_['previousBalance'])
-        self.balance = _raw_to_atto(dict_['balance'])
-        self.amount = self.balance - self.previous_balance
-        self.timestamp = _timestamp_to_datetime(dict_['timestamp'])
+    @property
+    def amount(self):
+        if self._raw_numbers:
+            return self.balance - self.previous_balance
+        # In the private context, so that the caller's can't round it
+        return _context.subtract(self.balance, self.previous_balance)
 
     def stream(self, *args, **kwargs):
-        yield from client.entry(self.hash_, *args, stream=True, **kwargs)
+        return self._client.entry(self.hash_, *args, stream=True, **kwargs)
 
     def __repr__(self):
         return f'<Entry {self.hash_[0:6]}...>'
@@ -0,0 +1,178 @@
+"""The FanOutTransport class definition."""
+"""This file is part of Atto.py.
+
+Atto.py is free software: you can redistribute it and/or modify it under the
+terms of the GNU General Public License as published by the Free Software
+Foundation, either version 3 of the License, or (at your option) any later
+version.
+
+This program is distributed in the hope that it will be useful, but WITHOUT ANY
+WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+PARTICULAR PURPOSE. See the GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License along with
+this program. If not, see <https://www.gnu.org/licenses/>.
+"""
+import threading
+import httpx
+
+__all__ = ['FanOutTransport']
+
+class _Released(httpx.SyncByteStream, httpx.AsyncByteStream):
+    """A response stream that calls release once when it's closed"""
+    def __init__(self, stream, release):
+        self._stream = stream
+        self._release = release
+
+    def __iter__(self):
+        yield from self._stream
+
+    async def __aiter__(self):
+        async for chunk in self._stream:
+            yield chunk
+
+    def close(self):
+        try:
+            self._stream.close()
+        finally:
+            self._done()
+
+    async def aclose(self):
+        try:
+            await self._stream.aclose()
+        finally:
+            self._done()
+
+    def _done(self):
+        release, self._release = self._release, None
+        if release is not None:
+            release()
+
+class FanOutTransport(httpx.BaseTransport, httpx.AsyncBaseTransport):
+    """An httpx transport for hundreds of concurrent streams.
+
+    With httpx's default transport, each open stream takes a connection of a
+    pool of 100, so more streams than that wait for a connection or time
+    out, and every stream costs a TCP (and TLS) connection. FanOutTransport
+    multiplexes streams over a few HTTP/2 connections instead: it keeps one
+    httpx transport per connection and sends each request through the one
+    with the fewest open responses.
+
+    httpx sends every request to an origin over a single HTTP/2 connection,
+    and requests beyond the server's limit of concurrent streams (often 100
+    or 128) wait for a stream to end, which may be never for live streams.
+    Keep streams_per_connection at or below the server's limit and
+    connections * streams_per_connection above the number of streams that
+    are open at once.
+
+    If a server doesn't negotiate HTTP/2, each transport falls back to
+    HTTP/1.1 with up to streams_per_connection connections.
+
+    Pass it to AttoClient(transport=...) or AsyncAttoClient(transport=...).
+    Idle live streams are best closed by a read timeout and reopened with
+    AttoClient's resume=True, which doesn't count such reconnects as
+    failures. Requires the h2 package when http2 is True.
+
+    Typical usage example::
+
+        transport = FanOutTransport(connections=4)
+        timeout = httpx.Timeout(10.0, read=300.0)
+        with AttoClient(transport=transport, timeout=timeout) as atto_client:
+            ...  # stream up to 400 accounts from as many threads
+
+    Attributes:
+        connections: the number of connections to multiplex over
+        streams_per_connection: the number of concurrent streams that each
+            connection is sized for
+    """
+    def __init__(self, connections=4, streams_per_connection=100, http2=True,
+                 keepalive_expiry=60.0, **kwargs):
+        """Create a transport without connections.
+
+        Args:
+            connections: the number of HTTP/2 connections
+            streams_per_connection: the number of concurrent streams per
+                connection
+            http2: whether to negotiate HTTP/2. Pass http1=False as well for
+                HTTP/2 without TLS.
+            keepalive_expiry: the seconds that an idle connection is kept
+                open
+            **kwargs: arguments to pass to each httpx.HTTPTransport() or
+                httpx.AsyncHTTPTransport()
+        """
+        if http2:
+            try:
+                import h2  # noqa: F401
+            except ImportError as e:
+                raise ImportError('FanOutTransport(http2=True) requires h2. '
+                                  'Install it with '
+                                  '`pip install atto.py[http2]`.') from e
+
+        self.connections = connections
+        self.streams_per_connection = streams_per_connection
+        self._options = {'http2': http2,
+                         'limits': httpx.Limits(
+                                 max_connections=streams_per_connection,
+                                 max_keepalive_connections=(
+                                         streams_per_connection),
+                                 keepalive_expiry=keepalive_expiry),
+                         **kwargs}
+        self._lock = threading.Lock()
+        self._transports = None
+        self._async_transports = None
+        self._open = [0] * connections
+
+    def handle_request(self, request):
+        with self._lock:
+            if self._transports is None:
+                self._transports = [httpx.HTTPTransport(**self._options)
+                                    for _ in range(self.connections)]
+        i = self._acquire()
+        try:
+            response = self._transports[i].handle_request(request)
+        except BaseException:
+            self._release(i)
+            raise
+        response.stream = _Released(response.stream,
+                                    lambda: self._release(i))
+        return response
+
+    async def handle_async_request(self, request):
+        with self._lock:
+            if self._async_transports is None:
+                self._async_transports = [
+                        httpx.AsyncHTTPTransport(**self._options)
+                        for _ in range(self.connections)]
+        i = self._acquire()
+        try:
+            response = await self._async_transports[i].handle_async_request(
+                    request)
+        except BaseException:
+            self._release(i)
+            raise
+        response.stream = _Released(response.stream,
+                                    lambda: self._release(i))
+        return response
+
+    def close(self):
+        for transport in self._transports or ():
+            transport.close()
+
+    async def aclose(self):
+        for transport in self._async_transports or ():
+            await transport.aclose()
+
+    def __repr__(self):
+        return (f'<FanOutTransport {sum(self._open)} streams over '
+                f'{self.connections} connections>')
+
+    def _acquire(self):
+        """Return the index of the least busy transport and count a stream"""
+        with self._lock:
+            i = min(range(self.connections), key=self._open.__getitem__)
+            self._open[i] += 1
+            return i
+
+    def _release(self, i):
+        with self._lock:
+            self._open[i] -= 1
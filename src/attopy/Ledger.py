@@ -0,0 +1,220 @@
+"""The Ledger class definition."""
+"""This file is part of Atto.py.
+
+Atto.py is free software: you can redistribute it and/or modify it under the
+terms of the GNU General Public License as published by the Free Software
+Foundation, either version 3 of the License, or (at your option) any later
+version.
+
+This program is distributed in the hope that it will be useful, but WITHOUT ANY
+WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+PARTICULAR PURPOSE. See the GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License along with
+this program. If not, see <https://www.gnu.org/licenses/>.
+"""
+from .Entry import Entry
+from .Transaction import Transaction
+from .AttoClient import _account_to_key
+from . import _json
+import datetime
+import sqlite3
+import threading
+
+__all__ = ['Ledger']
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS entries (
+    public_key TEXT NOT NULL,
+    height INTEGER NOT NULL,
+    hash TEXT NOT NULL,
+    timestamp INTEGER NOT NULL,
+    line BLOB NOT NULL,
+    PRIMARY KEY (public_key, height)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS entries_timestamp ON entries (public_key, timestamp);
+CREATE TABLE IF NOT EXISTS transactions (
+    public_key TEXT NOT NULL,
+    height INTEGER NOT NULL,
+    timestamp INTEGER NOT NULL,
+    line BLOB NOT NULL,
+    PRIMARY KEY (public_key, height)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS transactions_timestamp
+    ON transactions (public_key, timestamp);
+'''
+
+def _to_millis(time):
+    if isinstance(time, datetime.datetime):
+        return int(time.timestamp() * 1000)
+    return time
+
+def _row(dict_, line):
+    """Return the table and row of a streamed record, or None"""
+    # Rows are keyed by height, so records without one aren't stored
+    if 'blockType' in dict_:
+        if dict_.get('height') is None:
+            return None
+        return 'entries', (dict_['publicKey'], dict_['height'],
+                           dict_['hash'], dict_['timestamp'], line)
+    if 'block' in dict_:
+        block = dict_['block']
+        if block.get('height') is None:
+            return None
+        return 'transactions', (block['publicKey'], block['height'],
+                                block['timestamp'], line)
+    return None
+
+class Ledger:
+    """A local SQLite copy of the entries and transactions of accounts.
+
+    When passed to AttoClient(ledger=...), every Entry and Transaction that
+    the client streams is stored, and AttoClient.sync() only fetches the
+    heights above the highest stored one. Stored records can then be queried
+    by account, height range and time range without contacting a node.
+
+    Rows are written in batches of batch_size, and when a stream ends. The
+    database uses write-ahead logging, so it can be read while it's written.
+
+    Typical usage example::
+
+        with AttoClient(ledger=Ledger('ledger.db')) as atto_client:
+            atto_client.sync(ADDRESS)
+            for entry in atto_client.ledger.entries(ADDRESS, from_=10, to=20):
+                print(entry)
+    """
+    def __init__(self, path, batch_size=1000):
+        """Open or create a ledger.
+
+        Args:
+            path: the path of the SQLite database
+            batch_size: the number of rows to buffer before writing them
+        """
+        self.path = path
+        self.batch_size = batch_size
+        self._loads = _json.get_loads()
+        self._lock = threading.Lock()
+        self._pending = {'entries': [], 'transactions': []}
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=NORMAL')
+        self._db.executescript(_SCHEMA)
+
+    def record(self, dict_, line):
+        """Store a streamed entry or transaction.
+
+        Other records, and blocks without a height, are ignored.
+
+        Args:
+            dict_: the decoded line
+            line: the line as received from the node
+        """
+        table_row = _row(dict_, line)
+        if table_row is not None:
+            self._add(*table_row)
+
+    def flush(self):
+        """Write all buffered rows."""
+        with self._lock:
+            self._write()
+
+    def height(self, account, table='entries'):
+        """Return the highest stored height of an account, or 0.
+
+        Args:
+            account: an Account object, an address or a public key
+            table: 'entries' or 'transactions'
+        """
+        public_key = _account_to_key(account)
+        with self._lock:
+            self._write()
+            (height,) = self._db.execute(
+                    f'SELECT MAX(height) FROM {table} WHERE public_key = ?',
+                    (public_key,)).fetchone()
+        return height or 0
+
+    def entries(self, account, from_=None, to=None, since=None, until=None,
+                client=None):
+        """Yield the stored entries of an account in height order.
+
+        Args:
+            account: an Account object, an address or a public key
+            from_: the first height
+            to: the last height
+            since: the earliest timestamp, as a datetime or in milliseconds
+            until: the latest timestamp, as a datetime or in milliseconds
+            client: the client to attach to the entries
+        """
+        yield from self._query('entries', Entry, account, from_, to, since,
+                               until, client)
+
+    def transactions(self, account, from_=None, to=None, since=None,
+                     until=None, client=None):
+        """Yield the stored transactions of an account in height order.
+
+        See entries().
+        """
+        yield from self._query('transactions', Transaction, account, from_,
+                               to, since, until, client)
+
+    def close(self):
+        """Write all buffered rows and close the database."""
+        self.flush()
+        self._db.close()
+
+    def __repr__(self):
+        return f'<Ledger {self.path}>'
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _add(self, table, row):
+        with self._lock:
+            pending = self._pending[table]
+            pending.append(row)
+            if len(pending) >= self.batch_size:
+                self._write()
+
+    def _write(self):
+        for table, rows in self._pending.items():
+            if not rows:
+                continue
+
+            placeholders = ', '.join('?' * len(rows[0]))
+            self._db.executemany(
+                    f'INSERT OR REPLACE INTO {table} VALUES ({placeholders})',
+                    rows)
+            rows.clear()
+        self._db.commit()
+
+    def _query(self, table, type_, account, from_, to, since, until, client):
+        self.flush()
+        conditions = ['public_key = ?']
+        values = [_account_to_key(account)]
+        for condition, value in (('height >= ?', from_),
+                                 ('height <= ?', to),
+                                 ('timestamp >= ?', _to_millis(since)),
+                                 ('timestamp <= ?', _to_millis(until))):
+            if value is not None:
+                conditions.append(condition)
+                values.append(value)
+
+        query = (f'SELECT height, line FROM {table} '
+                 f'WHERE {" AND ".join(conditions)} AND height > ? '
+                 f'ORDER BY height LIMIT {self.batch_size}')
+        lazy = client.lazy if client is not None else False
+        raw_numbers = client.raw_numbers if client is not None else False
+        last = 0
+        while True:
+            # Read a page at a time so that the lock isn't held while the
+            # caller handles the records
+            with self._lock:
+                rows = self._db.execute(query, values + [last]).fetchall()
+            if not rows:
+                return
+
+            for last, line in rows:
+                yield type_(self._loads(line), client, lazy, raw_numbers)
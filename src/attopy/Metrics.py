@@ -0,0 +1,204 @@
+"""The Metrics class definition."""
+"""This file is part of Atto.py.
+
+Atto.py is free software: you can redistribute it and/or modify it under the
+terms of the GNU General Public License as published by the Free Software
+Foundation, either version 3 of the License, or (at your option) any later
+version.
+
+This program is distributed in the hope that it will be useful, but WITHOUT ANY
+WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+PARTICULAR PURPOSE. See the GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License along with
+this program. If not, see <https://www.gnu.org/licenses/>.
+"""
+import dataclasses
+import threading
+import time
+
+__all__ = ['Metrics', 'Sample', 'EndpointStats']
+
+@dataclasses.dataclass
+class Sample:
+    """The measurements of one request, or of one reconnect.
+
+    Attributes:
+        endpoint: the request path, with keys and instants replaced by
+            placeholders, e.g. 'accounts/{key}/entries/stream'
+        kind: 'lookup', 'stream' or 'reconnect'
+        record_type: the name of the streamed record class, or None
+        connect_seconds: the time taken to open a new connection, or None if
+            an idle connection was reused
+        ttfb_seconds: the time until the response headers arrived
+        seconds: the time until the response was read, or until the stream
+            was closed
+        bytes: the number of body bytes received, after decompression
+        wire_bytes: the number of body bytes received before decompression
+        encoding: the Content-Encoding of the response, or None
+        decompress_seconds: the time spent decompressing the body
+        lines: the number of lines decoded
+        loads_seconds: the time spent decoding JSON
+        construct_seconds: the time spent constructing records
+        error: the exception that ended the request, or None
+    """
+    endpoint: str
+    kind: str
+    record_type: str = None
+    connect_seconds: float = None
+    ttfb_seconds: float = None
+    seconds: float = None
+    bytes: int = 0
+    wire_bytes: int = 0
+    encoding: str = None
+    decompress_seconds: float = 0.0
+    lines: int = 0
+    loads_seconds: float = 0.0
+    construct_seconds: float = 0.0
+    error: Exception = None
+
+    def _trace(self, event, info):
+        """Time new connections. An httpx trace extension."""
+        if event == 'connection.connect_tcp.started':
+            self._connect_start = time.perf_counter()
+        elif event in ('connection.connect_tcp.complete',
+                       'connection.start_tls.complete'):
+            self.connect_seconds = time.perf_counter() - self._connect_start
+
+    def _time_loads(self, loads):
+        def timed(line):
+            start = time.perf_counter()
+            try:
+                return loads(line)
+            finally:
+                self.loads_seconds += time.perf_counter() - start
+                self.lines += 1
+        return timed
+
+    def _time_construct(self, type_):
+        def timed(*args):
+            start = time.perf_counter()
+            try:
+                return type_(*args)
+            finally:
+                self.construct_seconds += time.perf_counter() - start
+        return timed
+
+@dataclasses.dataclass
+class EndpointStats:
+    """The totals of the samples of an endpoint.
+
+    Attributes:
+        requests: the number of lookups and streams
+        streams: the number of streams
+        reconnects: the number of times a resumed stream was reopened
+        errors: the number of requests that ended with an exception
+        connects: the number of new connections
+        connect_seconds: the total time taken to open new connections
+        ttfb_seconds: the total time until response headers arrived
+        seconds: the total time of lookups and lifetime of streams
+        bytes: the number of body bytes received, after decompression
+        wire_bytes: the number of body bytes received before decompression
+        decompress_seconds: the total time spent decompressing bodies
+        lines: the number of lines decoded
+        loads_seconds: the total time spent decoding JSON
+        construct_seconds: the total time spent constructing records
+    """
+    requests: int = 0
+    streams: int = 0
+    reconnects: int = 0
+    errors: int = 0
+    connects: int = 0
+    connect_seconds: float = 0.0
+    ttfb_seconds: float = 0.0
+    seconds: float = 0.0
+    bytes: int = 0
+    wire_bytes: int = 0
+    decompress_seconds: float = 0.0
+    lines: int = 0
+    loads_seconds: float = 0.0
+    construct_seconds: float = 0.0
+
+    @property
+    def lines_per_second(self):
+        """The number of lines decoded per second of request time."""
+        return self.lines / self.seconds if self.seconds else 0.0
+
+    @property
+    def compression_ratio(self):
+        """The decompressed bytes per byte received on the wire."""
+        return self.bytes / self.wire_bytes if self.wire_bytes else 1.0
+
+    def add(self, sample):
+        """Add a Sample to the totals."""
+        if sample.kind == 'reconnect':
+            self.reconnects += 1
+            return
+
+        self.requests += 1
+        self.streams += sample.kind == 'stream'
+        self.errors += sample.error is not None
+        if sample.connect_seconds is not None:
+            self.connects += 1
+            self.connect_seconds += sample.connect_seconds
+        self.ttfb_seconds += sample.ttfb_seconds or 0.0
+        self.seconds += sample.seconds or 0.0
+        self.bytes += sample.bytes
+        self.wire_bytes += sample.wire_bytes
+        self.decompress_seconds += sample.decompress_seconds
+        self.lines += sample.lines
+        self.loads_seconds += sample.loads_seconds
+        self.construct_seconds += sample.construct_seconds
+
+class Metrics:
+    """Measurements of a client's requests, per endpoint.
+
+    When passed to AttoClient(metrics=...), every lookup and stream produces
+    a Sample when it ends, and every reconnect of a resumed stream produces
+    one as well. Samples are added to the totals in endpoints and passed to
+    each callback, in the thread that made the request. See
+    attopy.monitoring for callbacks that export samples to Prometheus and
+    OpenTelemetry.
+
+    Without metrics, requests aren't timed at all.
+
+    Typical usage example::
+
+        metrics = Metrics()
+        with AttoClient(metrics=metrics) as atto_client:
+            for transaction in atto_client.transactions(ADDRESS):
+                pass
+        for endpoint, stats in metrics.endpoints.items():
+            print(endpoint, stats.lines_per_second, stats.loads_seconds)
+
+    Attributes:
+        callbacks: the functions that are called with every Sample
+        endpoints: a dict mapping endpoints to EndpointStats
+    """
+    def __init__(self, callbacks=()):
+        """Create metrics without samples.
+
+        Args:
+            callbacks: functions to call with every Sample
+        """
+        self.callbacks = list(callbacks)
+        self.endpoints = {}
+        self._lock = threading.Lock()
+
+    def observe(self, sample):
+        """Add a Sample to the totals and pass it to the callbacks."""
+        with self._lock:
+            stats = self.endpoints.get(sample.endpoint)
+            if stats is None:
+                stats = self.endpoints[sample.endpoint] = EndpointStats()
+            stats.add(sample)
+        for callback in self.callbacks:
+            callback(sample)
+
+    def clear(self):
+        """Remove all totals."""
+        with self._lock:
+            self.endpoints.clear()
+
+    def __repr__(self):
+        return f'<Metrics {len(self.endpoints)} endpoints>'
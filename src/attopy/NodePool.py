@@ -0,0 +1,291 @@
+"""The NodePool class definition."""
+"""This file is part of Atto.py.
+
+Atto.py is free software: you can redistribute it and/or modify it under the
+terms of the GNU General Public License as published by the Free Software
+Foundation, either version 3 of the License, or (at your option) any later
+version.
+
+This program is distributed in the hope that it will be useful, but WITHOUT ANY
+WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+PARTICULAR PURPOSE. See the GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License along with
+this program. If not, see <https://www.gnu.org/licenses/>.
+"""
+import contextlib
+import dataclasses
+import datetime
+import socket
+import threading
+import time
+import httpx
+
+__all__ = ['NodePool', 'Node']
+
+# The weight of the newest latency in a node's moving average
+_ALPHA = 0.3
+
+def _interrupt(response):
+    """Wake a thread that's blocked reading a streamed httpx.Response, by
+    shutting down its socket. Returns whether it was shut down.
+
+    Only HTTP/1 sockets are shut down: an HTTP/2 socket carries the other
+    streams of its connection as well.
+    """
+    if not response.http_version.startswith('HTTP/1'):
+        return False
+    network_stream = response.extensions.get('network_stream')
+    if network_stream is None:
+        return False
+    sock = network_stream.get_extra_info('socket')
+    if sock is None:
+        return False
+    with contextlib.suppress(OSError):
+        sock.shutdown(socket.SHUT_RDWR)
+    return True
+
+def _failed(response):
+    """Whether another node may answer a request that got response"""
+    return response.status_code >= 500 or response.status_code == 429
+
+def _health_url():
+    instant = datetime.datetime.now(datetime.UTC).isoformat()
+    return f'instants/{instant}'
+
+@dataclasses.dataclass
+class Node:
+    """The state of one node of a NodePool.
+
+    Attributes:
+        base_url: the node API's base URL
+        latency: the moving average of the seconds until response headers
+            arrived, or None before the first response
+        streams: the number of streams that are open
+        failures: the number of failed requests and health checks in a row
+        down_until: the time.monotonic() until which the node is only used
+            when no other node is up
+    """
+    base_url: str
+    latency: float = None
+    streams: int = 0
+    failures: int = 0
+    down_until: float = 0.0
+
+    @property
+    def up(self):
+        """Whether the node is used for new requests."""
+        return time.monotonic() >= self.down_until
+
+class NodePool:
+    """Connections to several nodes of the same network.
+
+    A NodePool can be used by AttoClient in place of a single node, by
+    passing a list of base URLs (or a NodePool) as its base_url:
+
+    * every node has its own httpx.Client, and so its own connection pool
+    * lookups go to the node with the lowest recent latency
+    * streams (URLs ending in /stream) go to the node with the fewest open
+      streams, so that long-lived streams are spread over the nodes
+    * a request that fails to connect, times out or gets a 5xx or 429
+      response is sent to the next node, and the failed node is down for
+      retry_after seconds
+
+    A background thread checks the health of each node every
+    health_interval seconds, which also keeps a connection to it open. When
+    a check fails, the node's open streams are interrupted, so that streams
+    opened with resume=True reconnect to another node and continue where
+    they left off. Streams without resume raise an httpx.TransportError.
+    HTTP/2 streams share their connection with other streams, so they
+    aren't interrupted, and end with their read timeout instead.
+
+    Typical usage example::
+
+        nodes = NodePool(['https://node-a.example/api',
+                          'https://node-b.example/api'], timeout=10)
+        with AttoClient(nodes) as atto_client:
+            for entry in atto_client.entries(resume=True):
+                print(entry)
+        print(nodes.nodes)
+
+    Attributes:
+        nodes: a list of Node, in the order of the base URLs
+        health_interval: the seconds between health checks, or None
+        retry_after: the seconds that a node is down after a failure
+    """
+    def __init__(self, base_urls, health_interval=4.0, retry_after=30.0,
+                 health_url=None, **kwargs):
+        """Create a pool with a client per node.
+
+        Args:
+            base_urls: the base URLs of the node APIs
+            health_interval: the seconds between health checks. The default
+                is below httpx's keep-alive expiry of 5 seconds, so that each
+                node's connection stays warm. If None, there is no health
+                checking, and down nodes are tried again after retry_after.
+            retry_after: the seconds that a node isn't used after a failed
+                request or health check, unless every node is down
+            health_url: the URL to check the nodes' health with, relative to
+                the base URLs. Defaults to the instants endpoint.
+            **kwargs: arguments to pass to each httpx.Client()
+        """
+        base_urls = list(base_urls)
+        if not base_urls:
+            raise ValueError(f'{base_urls=}')
+
+        self.nodes = [Node(base_url) for base_url in base_urls]
+        self.health_interval = health_interval
+        self.retry_after = retry_after
+        self._health_url = health_url
+        self._clients = [httpx.Client(base_url=base_url, **kwargs)
+                         for base_url in base_urls]
+        self._responses = [set() for _ in base_urls]
+        self._lock = threading.Lock()
+        self._closed = threading.Event()
+        self._checker = None
+        if health_interval is not None:
+            self._checker = threading.Thread(target=self._check_health,
+                                             name='attopy-health',
+                                             daemon=True)
+            self._checker.start()
+
+    def get(self, url, *args, **kwargs):
+        """Send a GET request to the fastest node that is up.
+
+        Takes the arguments of httpx.Client.get().
+        """
+        indices = self._route(stream=False)
+        for i in indices:
+            start = time.perf_counter()
+            try:
+                response = self._clients[i].get(url, *args, **kwargs)
+            except httpx.TransportError:
+                self._fail(i)
+                if i == indices[-1]:
+                    raise
+                continue
+
+            if not _failed(response):
+                self._succeed(i, time.perf_counter() - start)
+                return response
+            self._fail(i)
+            if i == indices[-1]:
+                return response
+
+    @contextlib.contextmanager
+    def stream(self, method, url, *args, **kwargs):
+        """Stream a response from a node that is up.
+
+        Takes the arguments of httpx.Client.stream(). Streams are opened on
+        the node with the fewest open streams, other requests on the node
+        with the lowest latency.
+        """
+        indices = self._route(stream=str(url).endswith('/stream'))
+        for i in indices:
+            opened = False
+            start = time.perf_counter()
+            try:
+                with self._clients[i].stream(method, url, *args,
+                                             **kwargs) as response:
+                    if not _failed(response):
+                        self._succeed(i, time.perf_counter() - start)
+                    else:
+                        self._fail(i)
+                        if i != indices[-1]:
+                            continue
+
+                    opened = True
+                    with self._lock:
+                        self.nodes[i].streams += 1
+                        self._responses[i].add(response)
+                    try:
+                        yield response
+                    finally:
+                        with self._lock:
+                            self.nodes[i].streams -= 1
+                            self._responses[i].discard(response)
+                    return
+            except httpx.TransportError as e:
+                # A live stream that was idle for the read timeout doesn't
+                # mean that its node is down
+                if not (opened and isinstance(e, httpx.ReadTimeout)):
+                    self._fail(i)
+                # Once the caller has the response, it handles the error,
+                # e.g. by resuming the stream on another node
+                if opened or i == indices[-1]:
+                    raise
+
+    def close(self):
+        """Stop the health checks and close the connections."""
+        self._closed.set()
+        if self._checker is not None:
+            self._checker.join()
+        for client in self._clients:
+            client.close()
+
+    def __repr__(self):
+        return f'<NodePool {sum(node.up for node in self.nodes)}/' \
+               f'{len(self.nodes)} nodes up>'
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _route(self, stream):
+        """Return the indices of the nodes in the order to try them in"""
+        def latency(i):
+            # Nodes without a latency are tried first, to measure them
+            return self.nodes[i].latency or 0.0
+
+        with self._lock:
+            up = [i for i, node in enumerate(self.nodes) if node.up]
+            down = [i for i, node in enumerate(self.nodes) if not node.up]
+            if stream:
+                up.sort(key=lambda i: (self.nodes[i].streams, latency(i)))
+            else:
+                up.sort(key=latency)
+            down.sort(key=lambda i: self.nodes[i].down_until)
+        return up + down
+
+    def _succeed(self, i, latency):
+        with self._lock:
+            node = self.nodes[i]
+            node.failures = 0
+            node.down_until = 0.0
+            node.latency = (latency if node.latency is None
+                            else _ALPHA * latency
+                                 + (1 - _ALPHA) * node.latency)
+
+    def _fail(self, i):
+        with self._lock:
+            node = self.nodes[i]
+            node.failures += 1
+            node.down_until = time.monotonic() + self.retry_after
+            responses = list(self._responses[i])
+        return responses
+
+    def _check_health(self):
+        while True:
+            for i, client in enumerate(self._clients):
+                if self._closed.is_set():
+                    return
+                url = self._health_url or _health_url()
+                start = time.perf_counter()
+                try:
+                    response = client.get(url, timeout=max(
+                            self.health_interval, 1.0))
+                    healthy = not _failed(response)
+                except httpx.TransportError:
+                    healthy = False
+
+                if healthy:
+                    self._succeed(i, time.perf_counter() - start)
+                    continue
+                # Move the node's streams to other nodes
+                for response in self._fail(i):
+                    _interrupt(response)
+
+            if self._closed.wait(self.health_interval):
+                return
@@ -14,21 +14,29 @@ PARTICULAR PURPOSE. See the GNU General Public License for more details.
 You should have received a copy of the GNU General Public License along with
 this program. If not, see <https://www.gnu.org/licenses/>. 
 """
-import datetime
-from .convert import _str_to_algorithm, _timestamp_to_datetime, _raw_to_atto
+from .convert import (_str_to_algorithm, _timestamp_to_datetime, _raw_to_atto,
+                      _hex_to_bytes, _bytes_to_hex)
+from ._fields import Field, Record
 from . import _format
 
-class Receivable:
+class Receivable(Record):
     # TODO: docstring
-    def __init__(self, dict_, client):
-        self.hash_ = dict_['hash']
-        self.version = dict_['version']
-        self.algorithm = _str_to_algorithm(dict_['algorithm'])
-        self.public_key = dict_['publicKey']
-        self.timestamp = _timestamp_to_datetime(dict_['timestamp'])
-        self.receiver_algorithm = _str_to_algorithm(dict_['receiverAlgorithm'])
-        self.receiver_public_key = dict_['receiverPublicKey']
-        self.amount = _raw_to_atto(dict_['amount'])
+    __slots__ = ('_hash_', '_version', '_algorithm', '_public_key',
+                 '_timestamp', '_receiver_algorithm', '_receiver_public_key',
+                 '_amount')
+
+    hash_ = Field('hash', _hex_to_bytes, _bytes_to_hex)
+    version = Field('version')
+    algorithm = Field('algorithm', _str_to_algorithm)
+    public_key = Field('publicKey', _hex_to_bytes, _bytes_to_hex)
+    timestamp = Field('timestamp', export=_timestamp_to_datetime, numeric=True)
+    receiver_algorithm = Field('receiverAlgorithm', _str_to_algorithm)
+    receiver_public_key = Field('receiverPublicKey', _hex_to_bytes,
+                                _bytes_to_hex)
+    amount = Field('amount', export=_raw_to_atto, numeric=True)
+
+    def __init__(self, dict_, client, lazy=False, raw_numbers=False):
+        self._load(dict_, lazy, raw_numbers)
 
     def __repr__(self):
         return f'<Receivable {self.hash_[0:6]}...>'
@@ -0,0 +1,178 @@
+"""The Recorder class definition."""
+"""This file is part of Atto.py.
+
+Atto.py is free software: you can redistribute it and/or modify it under the
+terms of the GNU General Public License as published by the Free Software
+Foundation, either version 3 of the License, or (at your option) any later
+version.
+
+This program is distributed in the hope that it will be useful, but WITHOUT ANY
+WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+PARTICULAR PURPOSE. See the GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License along with
+this program. If not, see <https://www.gnu.org/licenses/>.
+"""
+import gzip
+import itertools
+import json
+import pathlib
+import threading
+import time
+
+__all__ = ['Recorder']
+
+_INDEX = 'index.ndjson'
+
+def _segment_name(number):
+    return f'{number:06}.gz'
+
+def _read_index(directory):
+    """Yield the entries of a recording's index.
+
+    A partly written last line, left by an interrupted recording, is ignored.
+    """
+    path = pathlib.Path(directory, _INDEX)
+    if not path.exists():
+        return
+    with open(path, 'rb') as file:
+        for line in file:
+            try:
+                yield json.loads(line)
+            except ValueError:
+                return
+
+class Recorder:
+    """Records the responses of a client to a directory, for replaying.
+
+    When passed to AttoClient(recorder=...), the body of every successful
+    lookup and stream is written exactly as it was received. Replaying the
+    recording with AttoClient(transport=ReplayTransport(directory)) yields
+    the same records without contacting a node.
+
+    Bodies are written in blocks of up to block_size bytes. Each block is
+    compressed as a gzip member and appended to the current segment file,
+    and a new segment is started after segment_size bytes and whenever the
+    recording is reopened. Blocks are listed in index.ndjson after they're
+    written, so an interrupted recording stays readable.
+
+    Typical usage example::
+
+        with AttoClient(recorder=Recorder('traffic')) as atto_client:
+            for transaction in atto_client.transactions():
+                print(transaction)
+
+    Attributes:
+        directory: the recording directory
+        bytes_received: the number of body bytes recorded
+        bytes_written: the number of compressed bytes written
+    """
+    def __init__(self, directory, segment_size=64 * 2**20,
+                 block_size=2**20, compresslevel=6):
+        """Open or create a recording.
+
+        Args:
+            directory: the recording directory. It's created if needed, and
+                new responses are appended to an existing recording.
+            segment_size: the approximate size of a segment file in bytes
+            block_size: the maximum number of uncompressed bytes per block.
+                Streams are written at least this often.
+            compresslevel: the gzip compression level, from 0 to 9
+        """
+        self.directory = pathlib.Path(directory)
+        self.segment_size = segment_size
+        self.block_size = block_size
+        self.compresslevel = compresslevel
+        self.bytes_received = 0
+        self.bytes_written = 0
+        self._lock = threading.Lock()
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        index = _read_index(self.directory)
+        last_id = max((entry['id'] for entry in index), default=0)
+        self._ids = itertools.count(last_id + 1)
+        self._segment_number = len(list(self.directory.glob('*.gz')))
+        self._segment = None
+        self._index = open(self.directory / _INDEX, 'ab')
+        self._new_segment()
+
+    def record(self, response, body):
+        """Record the complete body of an httpx.Response."""
+        for _ in self.tee(response, (body,)):
+            pass
+
+    def tee(self, response, chunks):
+        """Return an iterator of body chunks that records them as well.
+
+        Args:
+            response: the httpx.Response that the chunks belong to
+            chunks: an iterable of bytes
+        """
+        # Start the recording now, so that empty bodies are recorded too
+        return self._tee(self._start(response), chunks)
+
+    def close(self):
+        """Close the current segment and the index."""
+        with self._lock:
+            self._segment.close()
+            self._index.close()
+
+    def __repr__(self):
+        return f'<Recorder {self.directory}>'
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _new_segment(self):
+        if self._segment is not None:
+            self._segment.close()
+        self._segment_number += 1
+        self._segment = open(
+                self.directory / _segment_name(self._segment_number), 'ab')
+
+    def _append_index(self, entry):
+        self._index.write(json.dumps(entry).encode() + b'\n')
+        self._index.flush()
+
+    def _start(self, response):
+        url = response.request.url
+        with self._lock:
+            id_ = next(self._ids)
+            self._append_index({'id': id_,
+                                'method': response.request.method,
+                                'url': str(url),
+                                'path': url.raw_path.decode(),
+                                'status': response.status_code,
+                                'time': time.time()})
+        return id_
+
+    def _tee(self, id_, chunks):
+        buffer = bytearray()
+        try:
+            for chunk in chunks:
+                buffer += chunk
+                if len(buffer) >= self.block_size:
+                    self._write(id_, buffer)
+                    buffer.clear()
+                yield chunk
+        finally:
+            if buffer:
+                self._write(id_, buffer)
+
+    def _write(self, id_, data):
+        block = gzip.compress(data, self.compresslevel)
+        with self._lock:
+            if self._segment.tell() >= self.segment_size:
+                self._new_segment()
+            offset = self._segment.tell()
+            self._segment.write(block)
+            # The block must be on disk before the index points to it
+            self._segment.flush()
+            segment = _segment_name(self._segment_number)
+            self._append_index({'id': id_, 'segment': segment,
+                                'offset': offset, 'size': len(block)})
+            self.bytes_received += len(data)
+            self.bytes_written += len(block)
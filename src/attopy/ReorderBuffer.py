@@ -0,0 +1,243 @@
+"""The ReorderBuffer class definition."""
+"""This file is part of Atto.py.
+
+Atto.py is free software: you can redistribute it and/or modify it under the
+terms of the GNU General Public License as published by the Free Software
+Foundation, either version 3 of the License, or (at your option) any later
+version.
+
+This program is distributed in the hope that it will be useful, but WITHOUT ANY
+WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+PARTICULAR PURPOSE. See the GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License along with
+this program. If not, see <https://www.gnu.org/licenses/>.
+"""
+from .Block import Block
+from .Entry import Entry
+from .Transaction import Transaction
+from .AttoClient import _account_to_key
+import collections
+import dataclasses
+import threading
+
+__all__ = ['ReorderBuffer', 'StreamGap']
+
+@dataclasses.dataclass
+class StreamGap:
+    """Heights of an account that were skipped by a ReorderBuffer.
+
+    The records can be fetched with, e.g., ``atto_client.entries(gap.account,
+    from_=gap.first, to=gap.last)``.
+
+    Attributes:
+        account: the public key of the account
+        first: the first missing height
+        last: the last missing height
+    """
+    account: str
+    first: int
+    last: int
+
+    @property
+    def count(self):
+        """The number of missing heights."""
+        return self.last - self.first + 1
+
+    def __repr__(self):
+        return (f'<StreamGap {self.account[0:6]}... '
+                f'{self.first}-{self.last}>')
+
+def _identify(record):
+    """Return the key, account and height of a record"""
+    if isinstance(record, Entry):
+        public_key = Entry.public_key.stored(record).hex().upper()
+        return (Entry.hash_.stored(record), public_key,
+                Entry.height.stored(record))
+    if isinstance(record, Transaction):
+        # Transactions have no hash field, but a block is identified by its
+        # account and height
+        block = Transaction.block.stored(record)
+        public_key = Block.public_key.stored(block).hex().upper()
+        height = Block.height.stored(block)
+        return (public_key, height), public_key, height
+    if 'block' in record:
+        block = record['block']
+        public_key = block['publicKey'].upper()
+        return (public_key, block['height']), public_key, block['height']
+    return (record['hash'].upper(), record['publicKey'].upper(),
+            record['height'])
+
+class ReorderBuffer:
+    """Drops repeated records of a stream and orders them by height.
+
+    Merged or resumed streams of new entries or transactions of all accounts
+    may repeat records and deliver an account's heights out of order.
+    ReorderBuffer holds each record back until `window` more records have
+    arrived, and releases the records of every account in height order.
+
+    Once an account's record was released, records at or below its height
+    are dropped, and heights that didn't arrive within the window are
+    skipped: a StreamGap is released in their place, and records that arrive
+    later are dropped and counted as late.
+
+    Memory is bounded: at most `window` records are held, and the hashes of
+    the last `seen_size` records and the heights of the `accounts` most
+    recently active accounts are remembered. An account that was forgotten
+    starts over as if it was never seen.
+
+    Records are Entry or Transaction objects, or their API dicts, and are
+    released as they were pushed. A held record is only released when more
+    records arrive or when the buffer is flushed, so in a quiet live stream
+    it may be held for a while. ReorderBuffer is thread-safe, so the streams
+    of several nodes can be pushed from their own threads.
+
+    Typical usage example::
+
+        buffer = ReorderBuffer(window=256)
+        with AttoClient(['https://a.example', 'https://b.example']) as client:
+            for record in buffer.feed(client.entries(resume=True)):
+                if isinstance(record, StreamGap):
+                    ...  # fetch the missing heights, or give up on them
+                else:
+                    ...  # the account's next entry
+
+    Attributes:
+        window: the number of records that a record is held back for
+        duplicates: the number of repeated records that were dropped
+        late: the number of records that were dropped because a higher
+            height of their account was already released
+    """
+    def __init__(self, window=256, seen_size=65536, accounts=65536,
+                 heights=None):
+        """Create an empty buffer.
+
+        Args:
+            window: the number of records to wait for lower heights of an
+                account before skipping them. With 0, records are only
+                deduplicated, and released as they arrive without
+                StreamGaps.
+            seen_size: the number of record hashes to remember
+            accounts: the number of accounts whose last released height is
+                remembered
+            heights: a dict of accounts (Account objects, addresses or public
+                keys) to the last height that was already handled, e.g. by a
+                previous run. Gaps after these heights are reported even
+                before the account's first record is released.
+        """
+        if window < 0:
+            raise ValueError(f'{window=}')
+
+        self.window = window
+        self.duplicates = 0
+        self.late = 0
+        self._seen_size = seen_size
+        self._accounts = accounts
+        self._seen = collections.OrderedDict()
+        # The next height to release of each account
+        self._next = collections.OrderedDict()
+        for account, height in (heights or {}).items():
+            self._next[_account_to_key(account).upper()] = height + 1
+        # Held records, by account and height
+        self._pending = {}
+        # (arrival, account, height) of held records, in arrival order
+        self._queue = collections.deque()
+        self._arrivals = 0
+        self._lock = threading.Lock()
+
+    def push(self, record):
+        """Add a record, and return a list of the records and StreamGaps
+        that are released by it."""
+        key, account, height = _identify(record)
+        released = []
+        with self._lock:
+            if key in self._seen:
+                self._seen.move_to_end(key)
+                self.duplicates += 1
+                return released
+            self._seen[key] = None
+            if len(self._seen) > self._seen_size:
+                self._seen.popitem(last=False)
+            if not self.window:
+                released.append(record)
+                return released
+
+            next_ = self._next.get(account)
+            if next_ is not None and height < next_:
+                self.late += 1
+                return released
+            pending = self._pending.setdefault(account, {})
+            if height in pending:
+                # A different record at a held height: keep the first one
+                self.duplicates += 1
+                return released
+
+            pending[height] = record
+            self._arrivals += 1
+            self._queue.append((self._arrivals, account, height))
+            if height == next_:
+                self._release(account, height, released)
+
+            while (self._queue
+                   and self._queue[0][0] <= self._arrivals - self.window):
+                _, account, height = self._queue.popleft()
+                if height in self._pending.get(account, ()):
+                    self._release(account, height, released)
+        return released
+
+    def flush(self):
+        """Release all held records, and return them with StreamGaps."""
+        released = []
+        with self._lock:
+            for account in list(self._pending):
+                self._release(account, max(self._pending[account]),
+                              released)
+            self._queue.clear()
+        return released
+
+    def feed(self, records):
+        """Push records, and yield the released records and StreamGaps.
+
+        The buffer is flushed when records ends.
+        """
+        for record in records:
+            yield from self.push(record)
+        yield from self.flush()
+
+    def height(self, account):
+        """Return the last released height of an account, or None.
+
+        With a window of 0, heights aren't tracked.
+        """
+        with self._lock:
+            next_ = self._next.get(_account_to_key(account).upper())
+            return None if next_ is None else next_ - 1
+
+    def __len__(self):
+        """Return the number of held records."""
+        with self._lock:
+            return sum(len(pending) for pending in self._pending.values())
+
+    def __repr__(self):
+        return f'<ReorderBuffer {len(self)} held, window {self.window}>'
+
+    def _release(self, account, height, released):
+        """Release the held records of account up to height, and the ones
+        that follow them without a gap"""
+        pending = self._pending[account]
+        next_ = self._next.get(account)
+        for held in sorted(held for held in pending if held <= height):
+            if next_ is not None and held > next_:
+                released.append(StreamGap(account, next_, held - 1))
+            released.append(pending.pop(held))
+            next_ = held + 1
+        while next_ in pending:
+            released.append(pending.pop(next_))
+            next_ += 1
+        if not pending:
+            del self._pending[account]
+
+        self._next[account] = next_
+        self._next.move_to_end(account)
+        while len(self._next) > self._accounts:
+            self._next.popitem(last=False)
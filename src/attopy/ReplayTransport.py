@@ -0,0 +1,105 @@
+"""The ReplayTransport class definition."""
+"""This file is part of Atto.py.
+
+Atto.py is free software: you can redistribute it and/or modify it under the
+terms of the GNU General Public License as published by the Free Software
+Foundation, either version 3 of the License, or (at your option) any later
+version.
+
+This program is distributed in the hope that it will be useful, but WITHOUT ANY
+WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+PARTICULAR PURPOSE. See the GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License along with
+this program. If not, see <https://www.gnu.org/licenses/>.
+"""
+from .Recorder import _read_index
+import asyncio
+import collections
+import gzip
+import httpx
+import pathlib
+import threading
+
+__all__ = ['ReplayTransport']
+
+class ReplayTransport(httpx.BaseTransport, httpx.AsyncBaseTransport):
+    """An httpx transport that answers requests from a Recorder's recording.
+
+    Pass it to AttoClient(transport=...) or AsyncAttoClient(transport=...).
+    Requests are matched by method, path and query, regardless of the scheme
+    and host of the base URL. If a request was recorded several times, the
+    recordings are replayed in order. Requests that weren't recorded, or
+    whose recordings have all been replayed, get a 404 response.
+
+    Typical usage example::
+
+        with AttoClient(transport=ReplayTransport('traffic')) as atto_client:
+            for transaction in atto_client.transactions():
+                print(transaction)
+    """
+    def __init__(self, directory):
+        """Load the index of a recording.
+
+        Args:
+            directory: the directory of a Recorder
+        """
+        self.directory = pathlib.Path(directory)
+        self._lock = threading.Lock()
+        self._responses = collections.defaultdict(collections.deque)
+        self._statuses = {}
+        self._blocks = collections.defaultdict(list)
+        for entry in _read_index(self.directory):
+            if 'url' in entry:
+                key = (entry['method'], entry['path'])
+                self._responses[key].append(entry['id'])
+                self._statuses[entry['id']] = entry['status']
+            else:
+                self._blocks[entry['id']].append(
+                        (entry['segment'], entry['offset'], entry['size']))
+
+    def handle_request(self, request):
+        id_ = self._next(request)
+        if id_ is None:
+            return httpx.Response(404, text='Not recorded')
+        return httpx.Response(self._statuses[id_], content=self._body(id_))
+
+    async def handle_async_request(self, request):
+        id_ = self._next(request)
+        if id_ is None:
+            return httpx.Response(404, text='Not recorded')
+        return httpx.Response(self._statuses[id_],
+                              content=self._abody(id_))
+
+    def __repr__(self):
+        return f'<ReplayTransport {self.directory}>'
+
+    def _next(self, request):
+        key = (request.method, request.url.raw_path.decode())
+        with self._lock:
+            responses = self._responses.get(key)
+            return responses.popleft() if responses else None
+
+    def _body(self, id_):
+        files = {}
+        try:
+            for segment, offset, size in self._blocks[id_]:
+                if segment not in files:
+                    files[segment] = open(self.directory / segment, 'rb')
+                file = files[segment]
+                file.seek(offset)
+                yield gzip.decompress(file.read(size))
+        finally:
+            for file in files.values():
+                file.close()
+
+    def _read(self, segment, offset, size):
+        with open(self.directory / segment, 'rb') as file:
+            file.seek(offset)
+            return gzip.decompress(file.read(size))
+
+    async def _abody(self, id_):
+        # Blocks are read and decompressed in a thread, so that the event
+        # loop isn't blocked
+        for segment, offset, size in self._blocks[id_]:
+            yield await asyncio.to_thread(self._read, segment, offset, size)
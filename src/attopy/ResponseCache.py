@@ -0,0 +1,142 @@
+"""The ResponseCache class definition."""
+"""This file is part of Atto.py.
+
+Atto.py is free software: you can redistribute it and/or modify it under the
+terms of the GNU General Public License as published by the Free Software
+Foundation, either version 3 of the License, or (at your option) any later
+version.
+
+This program is distributed in the hope that it will be useful, but WITHOUT ANY
+WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+PARTICULAR PURPOSE. See the GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License along with
+this program. If not, see <https://www.gnu.org/licenses/>.
+"""
+import collections
+import concurrent.futures
+import threading
+import time
+
+__all__ = ['ResponseCache']
+
+class ResponseCache:
+    """A thread-safe cache of lookup results with a TTL and LRU eviction.
+
+    When passed to AttoClient(cache=...), the results of account() and
+    instants() are reused for ttl seconds. If several threads miss the same
+    key at the same time, only one of them makes the request and the others
+    wait for its result.
+
+    While an account stream is open, the account's cached result is replaced
+    by every streamed update, and a result that the stream put in the cache
+    doesn't expire until the stream is closed. A result that was cached
+    before the stream opened still expires after ttl.
+
+    Attributes:
+        ttl: the number of seconds a result is reused for
+        maxsize: the maximum number of results to keep. The least recently
+            used result is evicted first.
+        hits: the number of lookups answered from the cache
+        misses: the number of lookups that made a request
+        coalesced: the number of lookups that waited for another thread's
+            request
+        evictions: the number of results evicted because of maxsize
+    """
+    def __init__(self, ttl=1.0, maxsize=1024):
+        """Create an empty cache.
+
+        Args:
+            ttl: the number of seconds a result is reused for
+            maxsize: the maximum number of results to keep
+        """
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        # Results by key, as (expiry, result, whether it was put while the
+        # key was pinned)
+        self._results = collections.OrderedDict()
+        self._loading = {}
+        self._pinned = collections.Counter()
+
+    def get(self, key, load):
+        """Return the cached result for key, or load() it.
+
+        Args:
+            key: a hashable key
+            load: a function that returns the result
+        """
+        with self._lock:
+            cached = self._results.get(key)
+            if cached is not None and (cached[2]
+                                       or cached[0] > time.monotonic()):
+                self.hits += 1
+                self._results.move_to_end(key)
+                return cached[1]
+
+            future = self._loading.get(key)
+            leader = future is None
+            if leader:
+                self.misses += 1
+                future = self._loading[key] = concurrent.futures.Future()
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            return future.result()
+
+        try:
+            result = load()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            self.put(key, result)
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._loading[key]
+
+    def put(self, key, result):
+        """Cache a result, evicting the least recently used if needed."""
+        with self._lock:
+            self._results[key] = (time.monotonic() + self.ttl, result,
+                                  key in self._pinned)
+            self._results.move_to_end(key)
+            while len(self._results) > self.maxsize:
+                self._results.popitem(last=False)
+                self.evictions += 1
+
+    def pin(self, key):
+        """Stop the results that are put for key from expiring until
+        unpin() is called."""
+        with self._lock:
+            self._pinned[key] += 1
+
+    def unpin(self, key):
+        """Undo one pin() call."""
+        with self._lock:
+            self._pinned[key] -= 1
+            if self._pinned[key] <= 0:
+                del self._pinned[key]
+                if key in self._results:
+                    # The result was only kept fresh by the stream
+                    self._results[key] = (time.monotonic() + self.ttl,
+                                          self._results[key][1], False)
+
+    def clear(self):
+        """Remove all cached results."""
+        with self._lock:
+            self._results.clear()
+
+    def __len__(self):
+        return len(self._results)
+
+    def __repr__(self):
+        return (f'<ResponseCache {len(self)}/{self.maxsize} '
+                f'hits={self.hits} misses={self.misses}>')
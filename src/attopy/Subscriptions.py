@@ -0,0 +1,204 @@
+"""The Subscriptions class definition."""
+"""This file is part of Atto.py.
+
+Atto.py is free software: you can redistribute it and/or modify it under the
+terms of the GNU General Public License as published by the Free Software
+Foundation, either version 3 of the License, or (at your option) any later
+version.
+
+This program is distributed in the hope that it will be useful, but WITHOUT ANY
+WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+PARTICULAR PURPOSE. See the GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License along with
+this program. If not, see <https://www.gnu.org/licenses/>.
+"""
+from .AttoClient import _account_to_key
+import asyncio
+import contextlib
+import dataclasses
+
+__all__ = ['Subscriptions', 'SubscriptionEvent']
+
+@dataclasses.dataclass
+class SubscriptionEvent:
+    """A record received on one of the followed streams.
+
+    Attributes:
+        account: the public key of the account the stream belongs to
+        kind: 'account' for Account updates, 'receivable' for Receivables,
+            'error' if one of the account's streams failed, or 'end' if the
+            node closed one of them
+        record: the Account or Receivable, the exception of an 'error', or
+            None
+    """
+    account: str
+    kind: str
+    record: object
+    _release: object = dataclasses.field(default=None, repr=False,
+                                         compare=False)
+    # The tasks of the subscription the event belongs to
+    _source: object = dataclasses.field(default=None, repr=False,
+                                        compare=False)
+
+    def __repr__(self):
+        return f'<SubscriptionEvent {self.kind} {self.account[0:6]}...>'
+
+_CLOSED = object()
+
+class Subscriptions:
+    """Follows the streams of a changing set of accounts.
+
+    The account and receivable streams of every added account are merged into
+    a single feed of SubscriptionEvents, in the order in which they arrive.
+    Accounts can be added and removed while the feed is being consumed.
+
+    If a stream fails, an 'error' event is delivered for its account, and the
+    account's other stream is still followed. If the node closes a stream,
+    e.g. when it restarts, an 'end' event is delivered instead. Either way,
+    the stream isn't followed anymore. To follow it again, remove() the
+    account and add() it again.
+
+    Each account may have at most `buffer` undelivered events. Once that limit
+    is reached, its streams stop being read until the consumer catches up, so
+    a busy account can't make the feed grow without bounds.
+
+    All streams share the connection pool of the AsyncAttoClient. Without
+    HTTP/2, every stream holds a connection for as long as it's open, so the
+    client's limits should allow at least `max_streams` connections.
+
+    Typical usage example::
+
+        limits = httpx.Limits(max_connections=None)
+        async with (AsyncAttoClient(limits=limits) as atto_client,
+                    Subscriptions(atto_client) as subscriptions):
+            for address in ADDRESSES:
+                subscriptions.add(address)
+
+            async for event in subscriptions:
+                print(event.account, event.record)
+    """
+    def __init__(self, client, buffer=16, max_streams=None, receivables=True,
+                 **kwargs):
+        """Create an empty set of subscriptions.
+
+        Args:
+            client: the AsyncAttoClient to stream from
+            buffer: the maximum number of undelivered events per account
+            max_streams: the maximum number of streams that are open at once.
+                Streams beyond this limit wait for another stream to close.
+                Defaults to no limit.
+            receivables: whether to follow the receivables streams as well as
+                the account streams
+            **kwargs: arguments to pass to the stream requests. Defaults to
+                timeout=None, since the streams are long-lived.
+        """
+        kwargs.setdefault('timeout', None)
+
+        self._client = client
+        self._buffer = buffer
+        self._slots = (asyncio.Semaphore(max_streams) if max_streams
+                       else contextlib.nullcontext())
+        self._kinds = ('account', 'receivable') if receivables else ('account',)
+        self._kwargs = kwargs
+        self._feed = asyncio.Queue()
+        self._tasks = {}
+        # Tasks of removed accounts that haven't finished cancelling
+        self._removed = set()
+
+    @property
+    def accounts(self):
+        """The public keys of the accounts that are being followed."""
+        return set(self._tasks)
+
+    def add(self, account):
+        """Start following an account.
+
+        Adding an account that is already followed has no effect.
+
+        Args:
+            account: an Account object, an address or a public key
+        """
+        public_key = _account_to_key(account)
+        if public_key in self._tasks:
+            return
+
+        credits = asyncio.Semaphore(self._buffer)
+        # The list identifies the events of this subscription, which
+        # outlive it if the account is removed and added again
+        tasks = self._tasks[public_key] = []
+        tasks.extend(asyncio.create_task(self._follow(public_key, kind,
+                                                      credits, tasks))
+                     for kind in self._kinds)
+
+    def remove(self, account):
+        """Stop following an account.
+
+        Events of the account that haven't been delivered yet are dropped.
+
+        Args:
+            account: an Account object, an address or a public key
+        """
+        for task in self._tasks.pop(_account_to_key(account), ()):
+            task.cancel()
+            self._removed.add(task)
+            task.add_done_callback(self._removed.discard)
+
+    async def close(self):
+        """Close all streams and end the feed.
+
+        When used as an async context manager, this is called automatically
+        upon exiting the context.
+        """
+        tasks = [task for tasks in self._tasks.values() for task in tasks]
+        tasks.extend(self._removed)
+        self._tasks.clear()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._feed.put_nowait(_CLOSED)
+
+    def __repr__(self):
+        return f'<Subscriptions {len(self._tasks)} accounts>'
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        await self.close()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        while True:
+            event = await self._feed.get()
+            if event is _CLOSED:
+                self._feed.put_nowait(_CLOSED)
+                raise StopAsyncIteration
+
+            if event._release is not None:
+                event._release()
+            if self._tasks.get(event.account) is event._source:
+                return event
+
+    async def _follow(self, public_key, kind, credits, tasks):
+        try:
+            async with self._slots:
+                if kind == 'account':
+                    stream = self._client.account(public_key, stream=True,
+                                                  **self._kwargs)
+                else:
+                    stream = self._client.receivables(public_key,
+                                                      **self._kwargs)
+
+                async for record in stream:
+                    await credits.acquire()
+                    self._feed.put_nowait(SubscriptionEvent(
+                            public_key, kind, record, credits.release,
+                            tasks))
+        except Exception as e:
+            event = SubscriptionEvent(public_key, 'error', e, _source=tasks)
+        else:
+            event = SubscriptionEvent(public_key, 'end', None, _source=tasks)
+        self._feed.put_nowait(event)
@@ -15,15 +15,20 @@ You should have received a copy of the GNU General Public License along with
 this program. If not, see <https://www.gnu.org/licenses/>. 
 """
 from .Block import Block
+from .convert import _hex_to_bytes, _bytes_to_hex
+from ._fields import Field, Record
 
-class Transaction:
+class Transaction(Record):
     # TODO: docstring
-    def __init__(self, dict_, client):
-        self._client = client
+    __slots__ = ('_client', '_block', '_signature', '_work')
+
+    block = Field('block', Block, nested=True)
+    signature = Field('signature', _hex_to_bytes, _bytes_to_hex)
+    work = Field('work', _hex_to_bytes, _bytes_to_hex)
 
-        self.block = Block(dict_['block'])
-        self.signature = dict_['signature']
-        self.work = dict_['work']
+    def __init__(self, dict_, client, lazy=False, raw_numbers=False):
+        self._client = client
+        self._load(dict_, lazy, raw_numbers)
 
     def __repr__(self):
         return f'<Transaction {self.block.public_key[0:6]}... {self.block.height}>'
@@ -1,8 +1,8 @@
 """A Python interface for the Atto node API.
 
-This module includes the synchronous client AttoClient (for interacting with
-the API) as well as utility classes and functions that may be needed during
-this interaction.
+This module includes the synchronous client AttoClient and its asyncio
+counterpart AsyncAttoClient (for interacting with the API) as well as utility
+classes and functions that may be needed during this interaction.
 
 Typical usage example::
 
@@ -52,4 +52,15 @@ finally:
     del version, PackageNotFoundError
 
 from .AttoClient import *
+from .AsyncAttoClient import *
+from .Subscriptions import *
+from .Ledger import *
+from .ResponseCache import *
+from .Recorder import *
+from .ReplayTransport import *
+from .FanOutTransport import *
+from .Metrics import *
+from .NodePool import *
+from .BalanceHistory import *
+from .ReorderBuffer import *
 from .convert import *
@@ -0,0 +1,111 @@
+"""Helpers for running requests concurrently while keeping their order"""
+"""
+This file is part of Atto.py.
+
+Atto.py is free software: you can redistribute it and/or modify it under the
+terms of the GNU General Public License as published by the Free Software
+Foundation, either version 3 of the License, or (at your option) any later
+version.
+
+This program is distributed in the hope that it will be useful, but WITHOUT ANY
+WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+PARTICULAR PURPOSE. See the GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License along with
+this program. If not, see <https://www.gnu.org/licenses/>.
+"""
+import collections
+import threading
+
+def ordered_map(executor, fn, iterable, window):
+    """Yield fn(item) for each item, in order, computing up to window at once.
+
+    Results that finish early wait in the window until every result before
+    them has been yielded. Unstarted work is cancelled when the generator is
+    closed.
+    """
+    pending = collections.deque()
+    try:
+        for item in iterable:
+            pending.append(executor.submit(fn, item))
+            if len(pending) >= window:
+                yield pending.popleft().result()
+
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        for future in pending:
+            future.cancel()
+
+def height_chunks(from_, to, chunk_size):
+    """Yield (first, last) pairs that cover from_..to inclusively."""
+    for first in range(from_, to + 1, chunk_size):
+        yield first, min(first + chunk_size - 1, to)
+
+def prefetch(batches, depth, max_bytes, interrupt=None):
+    """Yield the items of batches, which are read by a background thread.
+
+    batches is an iterable of (items, size) pairs. Up to depth batches, and
+    up to max_bytes of their sizes, are read ahead, but a batch is always
+    read if none are waiting. Exceptions are raised after the batches that
+    were read before them have been yielded.
+
+    When the generator is closed, the thread stops at its next batch.
+    interrupt() is called to wake it if it's blocked, and the generator
+    waits for it to finish, so batches is no longer in use afterwards. If
+    interrupt() can't wake it, that's when its next batch arrives.
+    """
+    condition = threading.Condition()
+    queue = collections.deque()
+    queued_bytes = 0
+    stopped = False
+    done = False
+    error = None
+
+    def read():
+        nonlocal queued_bytes, done, error
+        try:
+            for batch in batches:
+                with condition:
+                    while queue and not stopped and (
+                            len(queue) >= depth
+                            or queued_bytes + batch[1] > max_bytes):
+                        condition.wait()
+                    if stopped:
+                        return
+                    queue.append(batch)
+                    queued_bytes += batch[1]
+                    condition.notify_all()
+        except BaseException as e:
+            error = e
+        finally:
+            if hasattr(batches, 'close'):
+                batches.close()
+            with condition:
+                done = True
+                condition.notify_all()
+
+    thread = threading.Thread(target=read, name='attopy-prefetch',
+                              daemon=True)
+    thread.start()
+    try:
+        while True:
+            with condition:
+                while not queue and not done:
+                    condition.wait()
+                if queue:
+                    items, size = queue.popleft()
+                    queued_bytes -= size
+                    condition.notify_all()
+                elif error is not None:
+                    raise error
+                else:
+                    return
+            yield from items
+    finally:
+        with condition:
+            stopped = True
+            condition.notify_all()
+        if not done and interrupt is not None:
+            interrupt()
+        thread.join()
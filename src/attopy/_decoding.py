@@ -0,0 +1,80 @@
+"""Decoding of streamed lines in worker processes"""
+"""
+This file is part of Atto.py.
+
+Atto.py is free software: you can redistribute it and/or modify it under the
+terms of the GNU General Public License as published by the Free Software
+Foundation, either version 3 of the License, or (at your option) any later
+version.
+
+This program is distributed in the hope that it will be useful, but WITHOUT ANY
+WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+PARTICULAR PURPOSE. See the GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License along with
+this program. If not, see <https://www.gnu.org/licenses/>.
+"""
+from . import _json
+import pickle
+
+# The decoders of a worker process, by backend
+_decoders = {}
+
+def check_loads(json_loads):
+    """Raise a ValueError if json_loads can't be sent to worker processes."""
+    if not callable(json_loads):
+        return
+    try:
+        pickle.dumps(json_loads)
+    except (pickle.PicklingError, AttributeError, TypeError) as e:
+        raise ValueError(f"{json_loads=} can't be sent to worker processes. "
+                         'Pass a backend name or a module-level function.'
+                         ) from e
+
+def batched(lines, size):
+    """Yield lists of up to size lines."""
+    batch = []
+    for line in lines:
+        batch.append(line)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def decode(lines, type_, lazy, raw_numbers, json_loads, key, ledger,
+           to_columns=None):
+    """Decode lines in a worker process.
+
+    Records are constructed without a client, which the caller attaches.
+
+    Args:
+        lines: a list of lines as bytes
+        type_: the record class
+        lazy, raw_numbers: passed to type_
+        json_loads: the json_loads argument of the client
+        key: a function that identifies a record by its dict, or None
+        ledger: whether to return Ledger rows
+        to_columns: if given, a function from attopy.columns that turns the
+            dicts into one batch, which is returned instead of records
+
+    Returns:
+        (records or batch, keys or None, Ledger rows or None)
+    """
+    if json_loads not in _decoders:
+        _decoders[json_loads] = _json.get_loads(json_loads)
+    loads = _decoders[json_loads]
+
+    dicts = [loads(line) for line in lines]
+    keys = None if key is None else [key(dict_) for dict_ in dicts]
+    rows = None
+    if ledger:
+        # Imported here because Ledger imports AttoClient, which imports
+        # this module
+        from .Ledger import _row
+        rows = [_row(dict_, line) for dict_, line in zip(dicts, lines)]
+
+    if to_columns is not None:
+        return to_columns(dicts), keys, rows
+    return ([type_(dict_, None, lazy, raw_numbers) for dict_ in dicts], keys,
+            rows)
@@ -0,0 +1,210 @@
+"""Incremental decoding of compressed response bodies"""
+"""
+This file is part of Atto.py.
+
+Atto.py is free software: you can redistribute it and/or modify it under the
+terms of the GNU General Public License as published by the Free Software
+Foundation, either version 3 of the License, or (at your option) any later
+version.
+
+This program is distributed in the hope that it will be useful, but WITHOUT ANY
+WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+PARTICULAR PURPOSE. See the GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License along with
+this program. If not, see <https://www.gnu.org/licenses/>.
+"""
+import time
+import zlib
+import httpx
+
+class _Identity:
+    def decompress(self, data):
+        return data
+
+    def flush(self):
+        return b''
+
+class _Zlib:
+    """gzip or deflate, including concatenated gzip members"""
+    def __init__(self, wbits):
+        self._wbits = wbits
+        self._decompressor = zlib.decompressobj(wbits)
+        self._first = True
+
+    def decompress(self, data):
+        try:
+            output = self._decompressor.decompress(data)
+        except zlib.error:
+            if not (self._first and self._wbits == zlib.MAX_WBITS):
+                raise
+            # Some servers send raw deflate data without a zlib header
+            self._wbits = -zlib.MAX_WBITS
+            self._decompressor = zlib.decompressobj(self._wbits)
+            output = self._decompressor.decompress(data)
+        self._first = False
+
+        while self._decompressor.eof and self._decompressor.unused_data:
+            data = self._decompressor.unused_data
+            self._decompressor = zlib.decompressobj(self._wbits)
+            output += self._decompressor.decompress(data)
+        return output
+
+    def flush(self):
+        return self._decompressor.flush()
+
+class _Brotli:
+    def __init__(self):
+        try:
+            import brotli
+        except ImportError:
+            import brotlicffi as brotli
+        self._decompressor = brotli.Decompressor()
+
+    def decompress(self, data):
+        # brotli has process(), brotlicffi has decompress()
+        if hasattr(self._decompressor, 'process'):
+            return self._decompressor.process(data)
+        return self._decompressor.decompress(data)
+
+    def flush(self):
+        return b''
+
+class _Zstd:
+    """zstd, including concatenated frames"""
+    def __init__(self):
+        import zstandard
+        self._zstandard = zstandard
+        self._decompressor = zstandard.ZstdDecompressor().decompressobj()
+
+    def decompress(self, data):
+        if self._decompressor.eof and data:
+            # The last frame ended at the end of the previous chunk
+            self._decompressor = (self._zstandard.ZstdDecompressor()
+                                  .decompressobj())
+        output = self._decompressor.decompress(data)
+        while self._decompressor.eof and self._decompressor.unused_data:
+            data = self._decompressor.unused_data
+            self._decompressor = (self._zstandard.ZstdDecompressor()
+                                  .decompressobj())
+            output += self._decompressor.decompress(data)
+        return output
+
+    def flush(self):
+        return self._decompressor.flush()
+
+DECODERS = {'identity': _Identity,
+            'gzip': lambda: _Zlib(zlib.MAX_WBITS | 16),
+            'deflate': lambda: _Zlib(zlib.MAX_WBITS),
+            'br': _Brotli,
+            'zstd': _Zstd}
+
+# The module and extra that each encoding requires
+_REQUIREMENTS = {'br': (('brotli', 'brotlicffi'), 'brotli'),
+                 'zstd': (('zstandard',), 'zstd')}
+
+def _check(encoding):
+    if encoding not in DECODERS:
+        raise ValueError(f'{encoding=}')
+    if encoding not in _REQUIREMENTS:
+        return
+
+    modules, extra = _REQUIREMENTS[encoding]
+    for module in modules:
+        try:
+            __import__(module)
+            return
+        except ImportError:
+            pass
+    raise ImportError(f'{encoding} requires {modules[0]}. Install it with '
+                      f'`pip install atto.py[{extra}]`.')
+
+def accept_encoding(encodings):
+    """Return an Accept-Encoding header that prefers earlier encodings.
+
+    Args:
+        encodings: an encoding, or a sequence of them in order of preference
+    """
+    if isinstance(encodings, str):
+        encodings = (encodings,)
+    values = []
+    for i, encoding in enumerate(encodings):
+        _check(encoding)
+        quality = max(1000 - 100 * i, 1) / 1000
+        values.append(encoding if quality == 1 else f'{encoding};q={quality}')
+    return ', '.join(values)
+
+def _decoders(response):
+    encodings = [encoding.strip().lower() for encoding in
+                 response.headers.get('content-encoding', '').split(',')
+                 if encoding.strip()]
+    # Encodings are listed in the order they were applied
+    try:
+        return [DECODERS[encoding]() for encoding in reversed(encodings)]
+    except KeyError as e:
+        raise httpx.DecodingError(f'Unsupported content encoding {e}',
+                                  request=response.request) from None
+
+def _decompress(decoders, data, request):
+    try:
+        for decoder in decoders:
+            data = decoder.decompress(data)
+        return data
+    except Exception as e:
+        # zlib.error, brotli.error or zstandard.ZstdError
+        raise httpx.DecodingError(str(e), request=request) from e
+
+def _flush(decoders, request):
+    data = b''
+    try:
+        for decoder in decoders:
+            data = (decoder.decompress(data) if data else b'') \
+                   + decoder.flush()
+        return data
+    except Exception as e:
+        raise httpx.DecodingError(str(e), request=request) from e
+
+def decode(response, sample=None):
+    """Yield the decoded body chunks of a streamed httpx.Response.
+
+    Unlike Response.iter_bytes(), the chunks received on the wire are read,
+    so that their size and the time spent decompressing them can be added to
+    sample.wire_bytes and sample.decompress_seconds. sample.bytes counts the
+    decoded bytes.
+
+    Args:
+        response: a response from httpx.Client.stream()
+        sample: a Metrics Sample, or None
+    """
+    if sample is not None:
+        sample.encoding = response.headers.get('content-encoding',
+                                               'identity')
+    if response.is_stream_consumed:
+        # A response that was created from bytes, e.g. by an
+        # httpx.MockTransport, was already read and decoded by httpx
+        if sample is not None:
+            sample.bytes += len(response.content)
+            sample.wire_bytes += len(response.content)
+        if response.content:
+            yield response.content
+        return
+
+    decoders = _decoders(response)
+
+    for raw in response.iter_raw():
+        if sample is None:
+            chunk = _decompress(decoders, raw, response.request)
+        else:
+            start = time.perf_counter()
+            chunk = _decompress(decoders, raw, response.request)
+            sample.decompress_seconds += time.perf_counter() - start
+            sample.wire_bytes += len(raw)
+            sample.bytes += len(chunk)
+        if chunk:
+            yield chunk
+
+    chunk = _flush(decoders, response.request)
+    if chunk:
+        if sample is not None:
+            sample.bytes += len(chunk)
+        yield chunk
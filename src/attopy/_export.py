@@ -0,0 +1,247 @@
+"""Writing streamed records to NDJSON, CSV and Parquet files"""
+"""
+This file is part of Atto.py.
+
+Atto.py is free software: you can redistribute it and/or modify it under the
+terms of the GNU General Public License as published by the Free Software
+Foundation, either version 3 of the License, or (at your option) any later
+version.
+
+This program is distributed in the hope that it will be useful, but WITHOUT ANY
+WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+PARTICULAR PURPOSE. See the GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License along with
+this program. If not, see <https://www.gnu.org/licenses/>.
+"""
+import bz2
+import csv
+import gzip
+import io
+import json
+import lzma
+import os
+import pathlib
+
+# Compressors of the line formats. Each written chunk is compressed on its
+# own; the resulting streams can be concatenated and are read back as one.
+COMPRESSORS = {None: None, 'gzip': gzip.compress, 'bz2': bz2.compress,
+               'xz': lzma.compress}
+
+# (column, API key or (block key,), Parquet type) of each format's columns
+ENTRY_COLUMNS = (
+    ('hash', 'hash', 'string'),
+    ('algorithm', 'algorithm', 'string'),
+    ('public_key', 'publicKey', 'string'),
+    ('height', 'height', 'uint64'),
+    ('block_type', 'blockType', 'string'),
+    ('subject_algorithm', 'subjectAlgorithm', 'string'),
+    ('subject_public_key', 'subjectPublicKey', 'string'),
+    ('previous_balance', 'previousBalance', 'uint64'),
+    ('balance', 'balance', 'uint64'),
+    ('timestamp', 'timestamp', 'int64'),
+)
+
+TRANSACTION_COLUMNS = (
+    ('public_key', ('publicKey',), 'string'),
+    ('height', ('height',), 'uint64'),
+    ('type', ('type',), 'string'),
+    ('version', ('version',), 'uint16'),
+    ('algorithm', ('algorithm',), 'string'),
+    ('network', ('network',), 'string'),
+    ('timestamp', ('timestamp',), 'int64'),
+    ('balance', ('balance',), 'uint64'),
+    ('previous', ('previous',), 'string'),
+    ('representative_algorithm', ('representativeAlgorithm',), 'string'),
+    ('representative_public_key', ('representativePublicKey',), 'string'),
+    ('send_hash_algorithm', ('sendHashAlgorithm',), 'string'),
+    ('send_hash', ('sendHash',), 'string'),
+    ('receiver_algorithm', ('receiverAlgorithm',), 'string'),
+    ('receiver_public_key', ('receiverPublicKey',), 'string'),
+    ('amount', ('amount',), 'uint64'),
+    ('signature', 'signature', 'string'),
+    ('work', 'work', 'string'),
+)
+
+def entry_height(dict_):
+    return dict_['height']
+
+def transaction_height(dict_):
+    return dict_['block']['height']
+
+def _values(dicts, columns):
+    """Return a list of values per column."""
+    values = []
+    for _, key, _ in columns:
+        if isinstance(key, tuple):
+            values.append([d['block'].get(key[0]) for d in dicts])
+        else:
+            values.append([d.get(key) for d in dicts])
+    return values
+
+def _progress_path(path):
+    return pathlib.Path(f'{path}.progress')
+
+def read_progress(path):
+    """Return the progress of an earlier export to path, or None.
+
+    Progress whose rows are no longer all in path, e.g. because the file was
+    deleted, is removed, so that the export starts over.
+    """
+    try:
+        with open(_progress_path(path)) as file:
+            progress = json.load(file)
+    except FileNotFoundError:
+        return None
+
+    if progress['format'] == 'parquet':
+        directory = pathlib.Path(path)
+        complete = all((directory / f'part-{part:06}.parquet').is_file()
+                       for part in range(progress['parts']))
+    else:
+        complete = (os.path.isfile(path)
+                    and os.path.getsize(path) >= progress['offset'])
+    if not complete:
+        _progress_path(path).unlink(missing_ok=True)
+        return None
+    return progress
+
+def _save_progress(path, progress):
+    # Replace the file at once, so an interruption leaves the old progress
+    temporary = _progress_path(f'{path}.tmp')
+    with open(temporary, 'w') as file:
+        json.dump(progress, file)
+    os.replace(temporary, _progress_path(path))
+
+class _LinesWriter:
+    """Appends NDJSON or CSV chunks to a file, truncated to progress."""
+    def __init__(self, path, format, compression, columns, dumps, offset):
+        self._format = format
+        self._compress = COMPRESSORS[compression]
+        self._columns = columns
+        self._dumps = dumps
+        self._file = open(path, 'r+b' if offset else 'wb')
+        # Drop whatever was written after the last saved progress
+        self._file.truncate(offset)
+        self._file.seek(offset)
+        self._header = not offset and format == 'csv'
+
+    def write(self, dicts):
+        if self._format == 'ndjson':
+            data = b''.join(self._dumps(d) + b'\n' for d in dicts)
+        else:
+            text = io.StringIO()
+            writer = csv.writer(text, lineterminator='\n')
+            if self._header:
+                writer.writerow(name for name, _, _ in self._columns)
+                self._header = False
+            writer.writerows(zip(*_values(dicts, self._columns)))
+            data = text.getvalue().encode()
+
+        if self._compress is not None:
+            data = self._compress(data)
+        self._file.write(data)
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        return {'offset': self._file.tell()}
+
+    def close(self):
+        self._file.close()
+
+class _ParquetWriter:
+    """Writes each chunk as a Parquet file in a directory."""
+    def __init__(self, path, compression, columns, parts):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError as e:
+            raise ImportError("format='parquet' requires PyArrow. Install "
+                              'it with `pip install atto.py[parquet]`.') from e
+        self._pa = pyarrow
+        self._pq = pyarrow.parquet
+        self._directory = pathlib.Path(path)
+        self._compression = compression or 'none'
+        self._columns = columns
+        self._schema = pyarrow.schema([(name, getattr(pyarrow, type_)())
+                                       for name, _, type_ in columns])
+        self._parts = parts
+
+        self._directory.mkdir(parents=True, exist_ok=True)
+        # Remove parts that were written after the last saved progress
+        for part in self._directory.glob('part-*.parquet'):
+            if int(part.stem.removeprefix('part-')) >= parts:
+                part.unlink()
+
+    def write(self, dicts):
+        table = self._pa.table(dict(zip(self._schema.names,
+                                        _values(dicts, self._columns))),
+                               schema=self._schema)
+        part = self._directory / f'part-{self._parts:06}.parquet'
+        self._pq.write_table(table, part, row_group_size=len(dicts),
+                             compression=self._compression)
+        self._parts += 1
+        return {'parts': self._parts}
+
+    def close(self):
+        pass
+
+def export(dicts, path, format, compression, columns, height, batch_size,
+           progress, dumps):
+    """Write dicts to path in chunks of batch_size, saving progress.
+
+    Progress is saved after every chunk, and the buffered chunk is written
+    when dicts raises or is interrupted, so the export can be resumed.
+
+    Args:
+        dicts: an iterable of API dicts
+        path: the file, or the directory with format='parquet'
+        format: 'ndjson', 'csv' or 'parquet'
+        compression: see COMPRESSORS, or a Parquet codec
+        columns: ENTRY_COLUMNS or TRANSACTION_COLUMNS
+        height: a function that returns the height of a dict
+        batch_size: the number of rows per chunk
+        progress: the progress of the export to continue, or None
+        dumps: a function that encodes a dict as JSON bytes
+
+    Returns:
+        the number of rows written
+    """
+    progress = progress or {'format': format, 'compression': compression,
+                            'rows': 0, 'height': None, 'offset': 0,
+                            'parts': 0}
+    if format == 'parquet':
+        writer = _ParquetWriter(path, compression, columns,
+                                progress['parts'])
+    elif format in ('ndjson', 'csv'):
+        if compression not in COMPRESSORS:
+            raise ValueError(f'{compression=}')
+        writer = _LinesWriter(path, format, compression, columns, dumps,
+                              progress['offset'])
+    else:
+        raise ValueError(f'{format=}')
+
+    written = 0
+    buffer = []
+
+    def flush():
+        nonlocal written
+        if not buffer:
+            return
+        progress.update(writer.write(buffer))
+        progress['rows'] += len(buffer)
+        progress['height'] = height(buffer[-1])
+        _save_progress(path, progress)
+        written += len(buffer)
+        buffer.clear()
+
+    try:
+        for dict_ in dicts:
+            buffer.append(dict_)
+            if len(buffer) >= batch_size:
+                flush()
+    finally:
+        try:
+            flush()
+        finally:
+            writer.close()
+    return written
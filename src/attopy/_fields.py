@@ -0,0 +1,111 @@
+"""Compact storage for the fields of API records"""
+"""
+This file is part of Atto.py.
+
+Atto.py is free software: you can redistribute it and/or modify it under the
+terms of the GNU General Public License as published by the Free Software
+Foundation, either version 3 of the License, or (at your option) any later
+version.
+
+This program is distributed in the hope that it will be useful, but WITHOUT ANY
+WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+PARTICULAR PURPOSE. See the GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License along with
+this program. If not, see <https://www.gnu.org/licenses/>.
+"""
+_REQUIRED = object()
+
+class Field:
+    """An attribute that is stored compactly and converted when it's read.
+
+    The value of API key `key` is passed through `parse` and stored in the
+    slot named after the attribute with a leading underscore. Reading the
+    attribute passes the stored value through `export`.
+
+    Missing optional keys and null values are stored as None and are never
+    passed to `parse` or `export`.
+
+    In lazy records, the slot stays empty until the attribute is first read.
+    If `nested` is True, `parse` is a Record class, and nested records are
+    created with the same lazy and raw_numbers settings.
+
+    If `numeric` is True, records with raw_numbers skip `export`, so amounts
+    stay raw integers and timestamps stay milliseconds.
+    """
+    def __init__(self, key, parse=None, export=None, default=_REQUIRED,
+                 nested=False, numeric=False):
+        self.key = key
+        self.parse = parse
+        self.export = export
+        self.default = default
+        self.nested = nested
+        self.numeric = numeric
+
+    def __set_name__(self, owner, name):
+        self.name = name
+        self.slot = owner.__dict__[f'_{name}']
+
+    def __get__(self, obj, owner=None):
+        if obj is None:
+            return self
+
+        value = self.stored(obj)
+        if (value is None or self.export is None
+                or self.numeric and obj._raw_numbers):
+            return value
+        return self.export(value)
+
+    def __set__(self, obj, value):
+        raise AttributeError(f'{self.name} is read-only')
+
+    def stored(self, obj):
+        """Return the value of the field in obj without export."""
+        try:
+            return self.slot.__get__(obj)
+        except AttributeError:
+            return self.load(obj, obj._raw, lazy=True)
+
+    def load(self, obj, dict_, lazy=False):
+        if self.default is _REQUIRED:
+            value = dict_[self.key]
+        else:
+            value = dict_.get(self.key, self.default)
+
+        if value is not None and self.parse is not None:
+            if self.nested:
+                value = self.parse(value, lazy=lazy,
+                                   raw_numbers=obj._raw_numbers)
+            else:
+                value = self.parse(value)
+        self.slot.__set__(obj, value)
+        return value
+
+class Record:
+    """Base class for records built from API dicts.
+
+    Subclasses declare their attributes as Fields, and a slot with a leading
+    underscore for each of them. The Fields are loaded by _load().
+
+    Lazy records keep the API dict and convert each field the first time it's
+    read, so records that are skipped or only partly read cost little more
+    than the parsed JSON.
+
+    Records with raw_numbers return amounts in raw and timestamps in
+    milliseconds, without creating Decimals or datetimes.
+    """
+    __slots__ = ('_raw', '_raw_numbers')
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._fields = tuple(attribute for attribute in vars(cls).values()
+                            if isinstance(attribute, Field))
+
+    def _load(self, dict_, lazy=False, raw_numbers=False):
+        self._raw_numbers = raw_numbers
+        if lazy:
+            self._raw = dict_
+            return
+
+        for field in self._fields:
+            field.load(self, dict_)
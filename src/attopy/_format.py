@@ -1,3 +1,5 @@
+from .convert import raw_to_atto, timestamp_to_datetime
+
 def pub_key(pub_key):
     return f'{pub_key[:5]}..{pub_key[-4:]}'
 
@@ -5,6 +7,8 @@ def height(height):
     return f'{f"#{height:,}":>7}'
 
 def balance(balance):
+    if isinstance(balance, int): # raw
+        balance = raw_to_atto(balance)
     return f'{balance:18,.4F}'
 
 def block_type(block_type):
@@ -22,4 +26,6 @@ def amount(amount):
     return balance(abs(amount))
 
 def timestamp(timestamp):
+    if isinstance(timestamp, int): # milliseconds
+        timestamp = timestamp_to_datetime(timestamp)
     return f'{timestamp.strftime("%Y%m%d %H:%M")}';
@@ -0,0 +1,102 @@
+"""JSON decoding and line splitting for API responses"""
+"""
+This file is part of Atto.py.
+
+Atto.py is free software: you can redistribute it and/or modify it under the
+terms of the GNU General Public License as published by the Free Software
+Foundation, either version 3 of the License, or (at your option) any later
+version.
+
+This program is distributed in the hope that it will be useful, but WITHOUT ANY
+WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+PARTICULAR PURPOSE. See the GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License along with
+this program. If not, see <https://www.gnu.org/licenses/>.
+"""
+import json
+
+def _orjson():
+    import orjson
+    return orjson.loads
+
+def _msgspec():
+    import msgspec
+    return msgspec.json.Decoder().decode
+
+def _stdlib():
+    return json.loads
+
+# In order of preference
+BACKENDS = {'msgspec': _msgspec, 'orjson': _orjson, 'json': _stdlib}
+
+def get_loads(backend=None):
+    """Return a function that decodes a JSON document from bytes.
+
+    Args:
+        backend: 'msgspec', 'orjson', 'json' or a callable. Defaults to the
+            first of these that is installed.
+    """
+    if callable(backend):
+        return backend
+    if backend is not None:
+        return BACKENDS[backend]()
+
+    for load in BACKENDS.values():
+        try:
+            return load()
+        except ImportError:
+            pass
+
+def get_dumps():
+    """Return the fastest installed function that encodes JSON as bytes."""
+    try:
+        import orjson
+        return orjson.dumps
+    except ImportError:
+        pass
+    try:
+        import msgspec
+        return msgspec.json.Encoder().encode
+    except ImportError:
+        pass
+    return lambda value: json.dumps(value, separators=(',', ':')).encode()
+
+def split_lines(chunks):
+    """Yield the non-blank lines in an iterable of bytes chunks."""
+    buffer = b''
+    for chunk in chunks:
+        lines = (buffer + chunk).split(b'\n')
+        buffer = lines.pop()
+        for line in lines:
+            if line.strip():
+                yield line
+    if buffer.strip():
+        yield buffer
+
+def split_batches(chunks):
+    """Yield a list of the non-blank lines completed by each bytes chunk.
+
+    Chunks that complete no line are skipped.
+    """
+    buffer = b''
+    for chunk in chunks:
+        lines = (buffer + chunk).split(b'\n')
+        buffer = lines.pop()
+        lines = [line for line in lines if line.strip()]
+        if lines:
+            yield lines
+    if buffer.strip():
+        yield [buffer]
+
+async def asplit_lines(chunks):
+    """Yield the non-blank lines in an async iterable of bytes chunks."""
+    buffer = b''
+    async for chunk in chunks:
+        lines = (buffer + chunk).split(b'\n')
+        buffer = lines.pop()
+        for line in lines:
+            if line.strip():
+                yield line
+    if buffer.strip():
+        yield buffer
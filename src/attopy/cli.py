@@ -0,0 +1,357 @@
+"""The atto command-line tool.
+
+Subcommands:
+    tail: print new entries or transactions of all accounts
+    backfill: write an account's entries or transactions to a file
+    balances: print the height and balance of many accounts as CSV
+    bench: measure a node's lookup latency and stream throughput
+
+Records and results are printed to stdout, and live statistics to stderr
+when it's a terminal (or with --stats), so the tool can be used in shell
+pipelines and cron jobs. Run ``atto <subcommand> --help`` for the options.
+"""
+"""
+This file is part of Atto.py.
+
+Atto.py is free software: you can redistribute it and/or modify it under the
+terms of the GNU General Public License as published by the Free Software
+Foundation, either version 3 of the License, or (at your option) any later
+version.
+
+This program is distributed in the hope that it will be useful, but WITHOUT ANY
+WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+PARTICULAR PURPOSE. See the GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License along with
+this program. If not, see <https://www.gnu.org/licenses/>.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+from .AttoClient import (AttoClient, _DEFAULT_BASE_URL, _Resume,
+                         _account_to_key, _block_id, _entries_endpoint, _hash,
+                         _transactions_endpoint)
+from .Entry import Entry
+from .Metrics import Metrics
+from .Transaction import Transaction
+from .convert import key_to_address, raw_to_atto
+from . import _export, _json, columns
+
+__all__ = ['main', 'run']
+
+class _Stats:
+    """Records per second and lag, printed to stderr every interval."""
+    def __init__(self, enabled, interval):
+        self.enabled = enabled
+        self.interval = interval
+        self.total = 0
+        self._count = 0
+        self._lags = []
+        self._last = time.monotonic()
+
+    def update(self, count=1, timestamp=None):
+        self.total += count
+        self._count += count
+        if timestamp is not None:
+            self._lags.append(time.time() - timestamp / 1000)
+
+        now = time.monotonic()
+        if self.enabled and now - self._last >= self.interval:
+            self.report(now)
+
+    def report(self, now=None):
+        now = time.monotonic() if now is None else now
+        rate = self._count / (now - self._last) if now > self._last else 0
+        line = f'{rate:,.0f} records/s, {self.total:,} total'
+        if self._lags:
+            line += (f', lag median {statistics.median(self._lags):.2f}s'
+                     f' max {max(self._lags):.2f}s')
+        end = '\r' if sys.stderr.isatty() else '\n'
+        print(line.ljust(72), end=end, file=sys.stderr, flush=True)
+        self._count = 0
+        self._lags.clear()
+        self._last = now
+
+    def finish(self):
+        if self.enabled:
+            self.report()
+            if sys.stderr.isatty():
+                print(file=sys.stderr)
+
+def _client(args, **kwargs):
+    nodes = args.node.split(',')
+    encodings = args.accept_encoding and args.accept_encoding.split(',')
+    return AttoClient(nodes if len(nodes) > 1 else nodes[0],
+                      timeout=args.timeout, compression=encodings, **kwargs)
+
+def _stats(args):
+    enabled = sys.stderr.isatty() if args.stats is None else args.stats
+    return _Stats(enabled, args.interval)
+
+def _entry_timestamp(dict_):
+    return dict_['timestamp']
+
+def _transaction_timestamp(dict_):
+    return dict_['block']['timestamp']
+
+def _tail(args):
+    if args.kind == 'entries':
+        type_, key, timestamp = Entry, _hash, _entry_timestamp
+        endpoint, params = _entries_endpoint(None, None, None)
+    else:
+        type_, key, timestamp = Transaction, _block_id, _transaction_timestamp
+        endpoint, params = _transactions_endpoint(None, None, None)
+
+    stats = _stats(args)
+    dumps = _json.get_dumps()
+    with _client(args, raw_numbers=args.raw) as client:
+        # Stream the API dicts, so that NDJSON is written without records
+        dicts = client._open(endpoint, columns._as_dict,
+                             _Resume(key, False), params=params)
+        try:
+            for count, dict_ in enumerate(dicts, 1):
+                if args.format == 'ndjson':
+                    sys.stdout.buffer.write(dumps(dict_) + b'\n')
+                else:
+                    print(type_(dict_, client, False, client.raw_numbers))
+                if args.flush:
+                    sys.stdout.flush()
+                stats.update(timestamp=timestamp(dict_))
+                if args.limit is not None and count >= args.limit:
+                    break
+        finally:
+            dicts.close()
+            stats.finish()
+
+def _watch_progress(path, stats, done):
+    """Update stats from the rows saved in an export's progress file."""
+    written = 0
+    while not done.wait(min(stats.interval, 1.0)):
+        progress = _export.read_progress(path) or {'rows': written}
+        stats.update(progress['rows'] - written)
+        written = progress['rows']
+
+def _backfill(args):
+    stats = _stats(args)
+    done = threading.Event()
+    start = time.monotonic()
+    with _client(args) as client:
+        method = (client.export_transactions if args.transactions
+                  else client.export_entries)
+        watcher = threading.Thread(target=_watch_progress,
+                                   args=(args.path, stats, done), daemon=True)
+        watcher.start()
+        try:
+            written = method(args.account, args.path, format=args.format,
+                             compression=args.compression, from_=args.from_,
+                             to=args.to, batch_size=args.batch_size,
+                             resume=not args.restart, retries=args.retries,
+                             parallel=args.parallel)
+        finally:
+            done.set()
+            watcher.join()
+            stats.finish()
+
+    seconds = time.monotonic() - start
+    print(f'{written:,} records written to {args.path} in {seconds:.1f}s',
+          file=sys.stderr)
+
+def _read_accounts(args):
+    for account in args.accounts:
+        if account == '-':
+            yield from (line.strip() for line in sys.stdin if line.strip())
+        else:
+            yield account
+
+def _balances(args):
+    errors = {}
+    stats = _stats(args)
+    print('address,height,balance')
+    with _client(args, raw_numbers=True) as client:
+        for account in client.accounts_many(_read_accounts(args),
+                                            args.max_in_flight, errors):
+            balance = account.balance
+            if not args.raw:
+                balance = raw_to_atto(balance)
+            print(f'{key_to_address(account.public_key)},{account.height},'
+                  f'{balance}')
+            stats.update()
+    stats.finish()
+
+    for account, error in errors.items():
+        print(f'{account}: {error}', file=sys.stderr)
+    return 1 if errors else 0
+
+def _percentiles(values):
+    values = sorted(values)
+    return {'p50': values[len(values) // 2],
+            'p99': values[min(len(values) - 1, int(len(values) * 0.99))],
+            'max': values[-1]}
+
+def _bench(args):
+    metrics = Metrics()
+    results = {'node': args.node}
+    with _client(args, metrics=metrics, raw_numbers=True) as client:
+        public_key = _account_to_key(args.account)
+        latencies = []
+        for _ in range(args.lookups):
+            start = time.perf_counter()
+            height = client.account(public_key).height
+            latencies.append(time.perf_counter() - start)
+        results['lookup_seconds'] = _percentiles(latencies)
+
+        stream = client.transactions if args.transactions else client.entries
+        to = min(height, args.records)
+        start = time.perf_counter()
+        count = sum(1 for _ in stream(public_key, from_=1, to=to))
+        seconds = time.perf_counter() - start
+
+    stats = metrics.endpoints[('accounts/{key}/transactions/stream'
+                               if args.transactions
+                               else 'accounts/{key}/entries/stream')]
+    results['stream'] = {'records': count, 'seconds': seconds,
+                         'records_per_second': count / seconds,
+                         'bytes': stats.bytes,
+                         'wire_bytes': stats.wire_bytes,
+                         'decompress_seconds': stats.decompress_seconds,
+                         'ttfb_seconds': stats.ttfb_seconds,
+                         'loads_seconds': stats.loads_seconds,
+                         'construct_seconds': stats.construct_seconds}
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    lookup = results['lookup_seconds']
+    stream = results['stream']
+    print(f'lookup latency: p50 {lookup["p50"] * 1000:.1f} ms, '
+          f'p99 {lookup["p99"] * 1000:.1f} ms, '
+          f'max {lookup["max"] * 1000:.1f} ms ({args.lookups} lookups)')
+    print(f'stream: {stream["records_per_second"]:,.0f} records/s, '
+          f'{stream["bytes"] / seconds / 1e6:.2f} MB/s, '
+          f'first byte after {stream["ttfb_seconds"] * 1000:.1f} ms '
+          f'({count:,} records)')
+    print(f'transfer: {stream["wire_bytes"] / 1e6:.2f} MB on the wire, '
+          f'{stats.compression_ratio:.1f}x compression, '
+          f'{stream["decompress_seconds"] * 1000:.1f} ms decompressing')
+
+def parse_args(args):
+    """Parse command line parameters.
+
+    Args:
+        args: command line parameters as a list of strings
+    """
+    parser = argparse.ArgumentParser(
+            prog='atto', description='Work with an Atto node from the shell.')
+    parser.add_argument('--node', default=os.environ.get('ATTO_NODE',
+                                                         _DEFAULT_BASE_URL),
+                        help='the node API base URL, or several separated '
+                             'by commas (default: $ATTO_NODE or '
+                             "Atto.py's default node)")
+    parser.add_argument('--timeout', type=float, default=None,
+                        help='the network timeout in seconds (default: none)')
+    parser.add_argument('--accept-encoding', default=None,
+                        help='the content encodings to accept, separated by '
+                             'commas in order of preference, e.g. zstd,gzip '
+                             "(default: httpx's)")
+    parser.add_argument('--stats', action=argparse.BooleanOptionalAction,
+                        default=None,
+                        help='print live statistics to stderr (default: when '
+                             'stderr is a terminal)')
+    parser.add_argument('--interval', type=float, default=1.0,
+                        help='seconds between statistics lines')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    tail = commands.add_parser('tail', help='print new records of all '
+                                            'accounts')
+    tail.add_argument('kind', choices=('entries', 'transactions'))
+    tail.add_argument('--format', choices=('text', 'ndjson'), default='text')
+    tail.add_argument('--raw', action='store_true',
+                      help='print amounts in raw and timestamps in ms')
+    tail.add_argument('--limit', type=int, default=None,
+                      help='stop after this many records')
+    tail.add_argument('--flush', action='store_true',
+                      help='flush stdout after every record')
+    tail.set_defaults(function=_tail)
+
+    backfill = commands.add_parser('backfill', help="write an account's "
+                                                    'history to a file')
+    backfill.add_argument('account', help='an address or a public key')
+    backfill.add_argument('path', help='the file, or directory for Parquet')
+    backfill.add_argument('--transactions', action='store_true',
+                          help='write transactions instead of entries')
+    backfill.add_argument('--format', choices=('ndjson', 'csv', 'parquet'),
+                          default='ndjson')
+    backfill.add_argument('--compression', default=None,
+                          help='gzip, bz2 or xz, or a Parquet codec')
+    backfill.add_argument('--from', dest='from_', type=int, default=None,
+                          help='the first height')
+    backfill.add_argument('--to', type=int, default=None,
+                          help="the last height (default: the account's)")
+    backfill.add_argument('--batch-size', type=int, default=65536,
+                          help='records per written chunk')
+    backfill.add_argument('--parallel', type=int, default=None,
+                          help='the number of connections to fetch with')
+    backfill.add_argument('--retries', type=int, default=5,
+                          help='reconnects in a row before giving up')
+    backfill.add_argument('--restart', action='store_true',
+                          help="overwrite instead of resuming")
+    backfill.set_defaults(function=_backfill)
+
+    balances = commands.add_parser('balances', help='print the height and '
+                                                    'balance of accounts')
+    balances.add_argument('accounts', nargs='+',
+                          help='addresses or public keys, or - to read them '
+                               'from stdin, one per line')
+    balances.add_argument('--raw', action='store_true',
+                          help='print balances in raw')
+    balances.add_argument('--max-in-flight', type=int, default=20,
+                          help='the number of concurrent lookups')
+    balances.set_defaults(function=_balances)
+
+    bench = commands.add_parser('bench', help='measure lookup latency and '
+                                              'stream throughput')
+    bench.add_argument('account', help='the account to look up and stream')
+    bench.add_argument('--lookups', type=int, default=20)
+    bench.add_argument('--records', type=int, default=10000,
+                       help='the maximum number of records to stream')
+    bench.add_argument('--transactions', action='store_true',
+                       help='stream transactions instead of entries')
+    bench.add_argument('--json', action='store_true',
+                       help='print the results as JSON')
+    bench.set_defaults(function=_bench)
+
+    return parser.parse_args(args)
+
+def main(args):
+    """Run the command line tool with a list of arguments.
+
+    Returns:
+        the exit status
+    """
+    args = parse_args(args)
+    try:
+        return args.function(args) or 0
+    except KeyboardInterrupt:
+        return 130
+    except BrokenPipeError:
+        # The reader of stdout went away, e.g. `atto tail entries | head`.
+        # Point stdout at devnull so that the interpreter doesn't complain
+        # while flushing it at exit.
+        devnull = os.open(os.devnull, os.O_WRONLY)
+        os.dup2(devnull, sys.stdout.fileno())
+        return 1
+
+def run():
+    """Call main() with sys.argv and exit with its status.
+
+    This is the entry point of the atto console script.
+    """
+    sys.exit(main(sys.argv[1:]))
+
+if __name__ == '__main__':
+    run()
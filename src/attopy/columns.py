@@ -0,0 +1,133 @@
+"""Conversion of streamed records into batches of NumPy columns"""
+"""
+This file is part of Atto.py.
+
+Atto.py is free software: you can redistribute it and/or modify it under the
+terms of the GNU General Public License as published by the Free Software
+Foundation, either version 3 of the License, or (at your option) any later
+version.
+
+This program is distributed in the hope that it will be useful, but WITHOUT ANY
+WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+PARTICULAR PURPOSE. See the GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License along with
+this program. If not, see <https://www.gnu.org/licenses/>.
+"""
+from .field_types import BlockType
+import time
+
+__all__ = ['BLOCK_TYPE_CODES', 'entry_columns', 'transaction_columns']
+
+# Block types are stored as their position in BlockType, so that
+# list(BlockType)[code] turns a code back into a BlockType.
+BLOCK_TYPE_CODES = {type_.value: code for code, type_ in enumerate(BlockType)}
+
+_NO_HASH = '00' * 32
+_NO_HEIGHT = 0
+
+def _as_dict(dict_, client, lazy=False, raw_numbers=False):
+    """Used in place of a record class to stream the API dicts themselves."""
+    return dict_
+
+def _numpy():
+    try:
+        import numpy
+    except ImportError as e:
+        raise ImportError('as_columns=True requires NumPy. Install it with '
+                          '`pip install atto.py[columns]`.') from e
+    return numpy
+
+def _bytes(np, values, width):
+    # The void dtype keeps trailing zero bytes, which the S dtype would strip
+    # when reading single elements.
+    return np.frombuffer(bytes.fromhex(''.join(values)), dtype=f'V{width}')
+
+def _ints(np, values, dtype, count):
+    # Raw amounts are at most 18e18, which fits in uint64. Anything larger
+    # raises OverflowError rather than wrapping around.
+    return np.fromiter(values, dtype=dtype, count=count)
+
+def entry_columns(dicts):
+    """Return a dict of NumPy arrays with one element per entry dict.
+
+    Columns:
+        hash, public_key, subject_public_key: 32-byte void arrays
+        height: uint64
+        block_type: uint8 codes (see BLOCK_TYPE_CODES)
+        previous_balance, balance: raw amounts as uint64
+        timestamp: milliseconds since the epoch as int64
+    """
+    np = _numpy()
+    count = len(dicts)
+    return {
+        'hash': _bytes(np, (d['hash'] for d in dicts), 32),
+        'public_key': _bytes(np, (d['publicKey'] for d in dicts), 32),
+        'height': _ints(np, (d['height'] for d in dicts), np.uint64, count),
+        'block_type': _ints(np, (BLOCK_TYPE_CODES[d['blockType']]
+                                 for d in dicts), np.uint8, count),
+        'subject_public_key': _bytes(np, (d['subjectPublicKey']
+                                          for d in dicts), 32),
+        'previous_balance': _ints(np, (d['previousBalance'] for d in dicts),
+                                  np.uint64, count),
+        'balance': _ints(np, (d['balance'] for d in dicts), np.uint64, count),
+        'timestamp': _ints(np, (d['timestamp'] for d in dicts), np.int64,
+                           count),
+    }
+
+def transaction_columns(dicts):
+    """Return a dict of NumPy arrays with one element per transaction dict.
+
+    Columns:
+        public_key, previous: 32-byte void arrays. previous is all zeroes for
+            blocks without a previous block.
+        height: uint64, 0 for blocks without a height
+        type: uint8 codes (see BLOCK_TYPE_CODES)
+        balance: raw amounts as uint64
+        timestamp: milliseconds since the epoch as int64
+        signature: 64-byte void array
+        work: 8-byte void array
+    """
+    np = _numpy()
+    count = len(dicts)
+    blocks = [d['block'] for d in dicts]
+    return {
+        'public_key': _bytes(np, (b['publicKey'] for b in blocks), 32),
+        'height': _ints(np, (b.get('height') or _NO_HEIGHT for b in blocks),
+                        np.uint64, count),
+        'type': _ints(np, (BLOCK_TYPE_CODES[b['type']] for b in blocks),
+                      np.uint8, count),
+        'balance': _ints(np, (b['balance'] for b in blocks), np.uint64,
+                         count),
+        'timestamp': _ints(np, (b['timestamp'] for b in blocks), np.int64,
+                           count),
+        'previous': _bytes(np, (b.get('previous') or _NO_HASH
+                                for b in blocks), 32),
+        'signature': _bytes(np, (d['signature'] for d in dicts), 64),
+        'work': _bytes(np, (d['work'] for d in dicts), 8),
+    }
+
+def _column_batches(dicts, to_columns, batch_size, max_delay=None):
+    """Return a generator of to_columns() of each batch of batch_size dicts.
+
+    If max_delay is given, a batch is also ended by the first dict that
+    arrives max_delay seconds or more after the batch's first dict.
+
+    Raises ImportError immediately if NumPy isn't installed.
+    """
+    _numpy()
+    return _generate_batches(dicts, to_columns, batch_size, max_delay)
+
+def _generate_batches(dicts, to_columns, batch_size, max_delay):
+    batch = []
+    for dict_ in dicts:
+        if not batch:
+            start = time.monotonic()
+        batch.append(dict_)
+        if (len(batch) >= batch_size
+                or max_delay is not None
+                and time.monotonic() - start >= max_delay):
+            yield to_columns(batch)
+            batch = []
+    if batch:
+        yield to_columns(batch)
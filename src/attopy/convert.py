@@ -15,17 +15,29 @@ You should have received a copy of the GNU General Public License along with
 this program. If not, see <https://www.gnu.org/licenses/>. 
 """
 import base64
+import binascii
 import datetime
 import decimal
+import functools
+import hashlib
 from .field_types import *
 
-decimal.setcontext(decimal.BasicContext) # enable most traps
-_context = decimal.getcontext()
+# Only used for our own conversions, so the caller's decimal context is left
+# alone
+_context = decimal.BasicContext.copy() # enable most traps
 for signal in (decimal.Inexact, decimal.Rounded, decimal.Subnormal):
     _context.traps[signal] = True # enable the remaining traps
 _context.prec = 20 # 99,999,999,999.999999999
+_RAW_PER_ATTO = decimal.Decimal(1_000_000_000)
 
-__all__ = ['address_to_key']
+__all__ = ['address_to_key', 'key_to_address', 'addresses_to_keys',
+           'keys_to_addresses', 'raw_to_atto', 'timestamp_to_datetime']
+
+_PROTOCOL = 'atto://'
+_ADDRESS_BYTES = 38 # version, 32-byte public key, 5-byte checksum
+
+def _checksum(version_and_key):
+    return hashlib.blake2b(version_and_key, digest_size=5).digest()
 
 def address_to_key(address_without_protocol):
     """Convert an address into a public key.
@@ -36,26 +48,95 @@ def address_to_key(address_without_protocol):
     Client API functions accept public keys, not addresses. Similarly, accounts
     returned from API functions contain public keys, not addresses.
 
+    Recent results are cached, so converting the same address again is cheap.
+
     Args:
         address: An address (which typically starts with atto://), with atto://
             removed. The protocol (atto://) can be removed from an address using
-            ``address.removeprefix('atto://')``.
+            ``address.removeprefix('atto://')``, but addresses that still start
+            with it are accepted too.
     Return:
         A public key in the form of a binary string that can be passed to the
         Atto.py client API functions.
+    Raises:
+        ValueError: the address isn't valid base32, has the wrong length, has
+            an unknown version or its checksum doesn't match.
     """
-    decoded = base64.b32decode(address_without_protocol.upper() + '===')
+    return _address_to_key(address_without_protocol)
+
+@functools.lru_cache(maxsize=65536)
+def _address_to_key(address):
+    address = address.removeprefix(_PROTOCOL)
+    try:
+        decoded = base64.b32decode(address.upper() + '===')
+    except binascii.Error:
+        raise ValueError(f'{address} is not valid base32') from None
+    if len(decoded) != _ADDRESS_BYTES:
+        raise ValueError(f'{address} is not {_ADDRESS_BYTES} bytes long')
 
     # The first byte is the version. The last five bytes are the checksum.
-    key_bytes_hex = (format(byte, '02X') for byte in decoded[1:-5])
+    version_and_key, checksum = decoded[:-5], decoded[-5:]
+    if version_and_key[0] >= len(_VERSIONS):
+        raise ValueError(f'{address} has an unknown version')
+    if _checksum(version_and_key) != checksum:
+        raise ValueError(f'{address} has an invalid checksum')
+
+    return version_and_key[1:].hex().upper()
+
+def key_to_address(public_key, algorithm=Algorithm.V1):
+    """Convert a public key into an address.
+
+    This is the inverse of address_to_key().
+
+    Args:
+        public_key: a public key as a hexadecimal string
+        algorithm: the key's Algorithm
+    Return:
+        The address, starting with atto://
+    """
+    version_and_key = bytes((_VERSIONS.index(algorithm),)) \
+                      + bytes.fromhex(public_key)
+    encoded = base64.b32encode(version_and_key + _checksum(version_and_key))
+    return _PROTOCOL + encoded.decode().rstrip('=').lower()
 
-    return ''.join(key_bytes_hex)
+def addresses_to_keys(addresses):
+    """Return a list of address_to_key() of each address.
 
-def _timestamp_to_datetime(timestamp):
+    Raises ValueError for the first invalid address.
+    """
+    return [_address_to_key(address) for address in addresses]
+
+def keys_to_addresses(public_keys, algorithm=Algorithm.V1):
+    """Return a list of key_to_address() of each public key."""
+    return [key_to_address(public_key, algorithm)
+            for public_key in public_keys]
+
+def _hex_to_bytes(hex_):
+    return bytes.fromhex(hex_)
+
+def _bytes_to_hex(bytes_):
+    return bytes_.hex().upper()
+
+def timestamp_to_datetime(timestamp):
+    """Convert a timestamp in milliseconds since the epoch to a datetime.
+
+    The datetime is naive and in local time.
+    """
     return datetime.datetime.fromtimestamp(timestamp/1000)
 
-def _raw_to_atto(amount) -> decimal.Decimal:
-    return amount / decimal.Decimal(1_000_000_000)
+def raw_to_atto(amount) -> decimal.Decimal:
+    """Convert an amount in raw (the smallest unit) to a Decimal in atto.
+
+    The division is done in a private decimal context that traps on any loss
+    of precision.
+    """
+    return _context.divide(amount, _RAW_PER_ATTO)
+
+_timestamp_to_datetime = timestamp_to_datetime
+_raw_to_atto = raw_to_atto
+
+# Address versions are indices into this tuple
+_VERSIONS = (Algorithm.V1,)
 
 def _str_to_network(str_):
     try:
@@ -0,0 +1,151 @@
+"""Callbacks that export Metrics samples to monitoring systems"""
+"""
+This file is part of Atto.py.
+
+Atto.py is free software: you can redistribute it and/or modify it under the
+terms of the GNU General Public License as published by the Free Software
+Foundation, either version 3 of the License, or (at your option) any later
+version.
+
+This program is distributed in the hope that it will be useful, but WITHOUT ANY
+WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+PARTICULAR PURPOSE. See the GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License along with
+this program. If not, see <https://www.gnu.org/licenses/>.
+"""
+__all__ = ['prometheus_callback', 'opentelemetry_callback']
+
+# (name, Sample attribute, unit, description) of each exported counter
+_COUNTERS = (
+    ('bytes', 'bytes', 'By', 'Response body bytes after decompression'),
+    ('wire_bytes', 'wire_bytes', 'By',
+     'Response body bytes received before decompression'),
+    ('decompress_seconds', 'decompress_seconds', 's',
+     'Time spent decompressing response bodies'),
+    ('lines', 'lines', '1', 'JSON lines decoded'),
+    ('loads_seconds', 'loads_seconds', 's', 'Time spent decoding JSON'),
+    ('construct_seconds', 'construct_seconds', 's',
+     'Time spent constructing records'),
+)
+
+# (name, Sample attribute, description) of each exported histogram
+_HISTOGRAMS = (
+    ('connect_seconds', 'connect_seconds', 'Time taken to connect'),
+    ('ttfb_seconds', 'ttfb_seconds', 'Time until response headers'),
+    ('request_seconds', 'seconds', 'Lookup time or stream lifetime'),
+)
+
+def _labels(sample):
+    return {'endpoint': sample.endpoint, 'kind': sample.kind}
+
+def prometheus_callback(registry=None, prefix='attopy'):
+    """Return a Metrics callback that updates Prometheus metrics.
+
+    Every metric is labelled with the endpoint and the kind of the sample.
+    Reconnects and errors are counted in {prefix}_reconnects_total and
+    {prefix}_errors_total.
+
+    Args:
+        registry: the prometheus_client registry. Defaults to the global one.
+        prefix: the prefix of the metric names
+
+    Typical usage example::
+
+        metrics = Metrics([prometheus_callback()])
+        prometheus_client.start_http_server(8000)
+    """
+    try:
+        import prometheus_client
+    except ImportError as e:
+        raise ImportError('prometheus_callback() requires prometheus_client. '
+                          'Install it with '
+                          '`pip install atto.py[prometheus]`.') from e
+
+    options = {'labelnames': ('endpoint', 'kind')}
+    if registry is not None:
+        options['registry'] = registry
+
+    counters = {attribute: prometheus_client.Counter(
+                        f'{prefix}_{name}', description, **options)
+                for name, attribute, _, description in _COUNTERS}
+    histograms = {attribute: prometheus_client.Histogram(
+                          f'{prefix}_{name}', description, **options)
+                  for name, attribute, description in _HISTOGRAMS}
+    requests = prometheus_client.Counter(f'{prefix}_requests',
+                                         'Lookups and streams', **options)
+    reconnects = prometheus_client.Counter(f'{prefix}_reconnects',
+                                           'Stream reconnects', **options)
+    errors = prometheus_client.Counter(f'{prefix}_errors',
+                                       'Requests that raised', **options)
+
+    def callback(sample):
+        labels = _labels(sample)
+        if sample.kind == 'reconnect':
+            reconnects.labels(**labels).inc()
+            return
+
+        requests.labels(**labels).inc()
+        if sample.error is not None:
+            errors.labels(**labels).inc()
+        for attribute, counter in counters.items():
+            counter.labels(**labels).inc(getattr(sample, attribute))
+        for attribute, histogram in histograms.items():
+            value = getattr(sample, attribute)
+            if value is not None:
+                histogram.labels(**labels).observe(value)
+
+    return callback
+
+def opentelemetry_callback(meter=None, prefix='attopy'):
+    """Return a Metrics callback that records OpenTelemetry metrics.
+
+    Instruments are named like those of prometheus_callback(), with dots
+    instead of underscores after the prefix, and have the endpoint and kind
+    of the sample as attributes.
+
+    Args:
+        meter: the opentelemetry.metrics.Meter. Defaults to the global
+            meter provider's 'attopy' meter.
+        prefix: the prefix of the instrument names
+    """
+    try:
+        from opentelemetry import metrics
+    except ImportError as e:
+        raise ImportError('opentelemetry_callback() requires the '
+                          'OpenTelemetry API. Install it with '
+                          '`pip install atto.py[opentelemetry]`.') from e
+
+    if meter is None:
+        meter = metrics.get_meter('attopy')
+
+    counters = {attribute: meter.create_counter(
+                        f'{prefix}.{name}', unit, description)
+                for name, attribute, unit, description in _COUNTERS}
+    histograms = {attribute: meter.create_histogram(
+                          f'{prefix}.{name}', 's', description)
+                  for name, attribute, description in _HISTOGRAMS}
+    requests = meter.create_counter(f'{prefix}.requests', '1',
+                                    'Lookups and streams')
+    reconnects = meter.create_counter(f'{prefix}.reconnects', '1',
+                                      'Stream reconnects')
+    errors = meter.create_counter(f'{prefix}.errors', '1',
+                                  'Requests that raised')
+
+    def callback(sample):
+        labels = _labels(sample)
+        if sample.kind == 'reconnect':
+            reconnects.add(1, labels)
+            return
+
+        requests.add(1, labels)
+        if sample.error is not None:
+            errors.add(1, labels)
+        for attribute, counter in counters.items():
+            counter.add(getattr(sample, attribute), labels)
+        for attribute, histogram in histograms.items():
+            value = getattr(sample, attribute)
+            if value is not None:
+                histogram.record(value, labels)
+
+    return callback
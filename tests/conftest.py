@@ -0,0 +1,38 @@
+import pathlib
+import subprocess
+import sys
+
+import pytest
+
+__author__ = "Waldo Lemmer"
+__copyright__ = "Waldo Lemmer"
+__license__ = "GPL-3.0-only"
+
+_BENCHMARKS = pathlib.Path(__file__).parent.parent / 'benchmarks'
+
+
+@pytest.fixture
+def http2_node():
+    """Start benchmarks/http2_node.py, and return a function that takes its
+    options and returns its base URL. The function's processes attribute
+    maps the base URLs to the node processes."""
+    pytest.importorskip('h2')
+
+    def start(height=1000, rate=2000, chunk_size=10, max_streams=100):
+        node = subprocess.Popen(
+                [sys.executable, str(_BENCHMARKS / 'http2_node.py'),
+                 '--height', str(height), '--rate', str(rate),
+                 '--chunk-size', str(chunk_size),
+                 '--max-streams', str(max_streams)],
+                stdout=subprocess.PIPE, text=True)
+        url = f'http://127.0.0.1:{int(node.stdout.readline())}'
+        start.processes[url] = node
+        return url
+
+    start.processes = {}
+    yield start
+    for node in start.processes.values():
+        # Stopped nodes ignore SIGTERM
+        node.kill()
+        node.wait()
+        node.stdout.close()
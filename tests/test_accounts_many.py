@@ -0,0 +1,116 @@
+import asyncio
+import re
+import threading
+import time
+
+import httpx
+import pytest
+
+from attopy import AsyncAttoClient, AttoClient, key_to_address
+
+__author__ = "Waldo Lemmer"
+__copyright__ = "Waldo Lemmer"
+__license__ = "GPL-3.0-only"
+
+KEYS = [f'{i:064X}' for i in range(1, 31)]
+MISSING = {KEYS[3], KEYS[17]}
+
+
+class Node:
+    """A node that answers account lookups after delay seconds, with a 404
+    for MISSING accounts, and counts the lookups in flight"""
+    def __init__(self, delays=None):
+        self.delays = delays or {}
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    def handle(self, request):
+        public_key = re.search(r'accounts/(\w{64})$', request.url.path)[1]
+        with self._lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            time.sleep(self.delays.get(public_key, 0.01))
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+        if public_key in MISSING:
+            return httpx.Response(404)
+        return httpx.Response(200, json={'publicKey': public_key,
+                                         'height': KEYS.index(public_key)})
+
+    def client(self):
+        return AttoClient('http://node', lazy=True,
+                          transport=httpx.MockTransport(self.handle))
+
+
+def test_accounts_are_yielded_as_their_lookups_complete():
+    node = Node(delays={KEYS[0]: 0.3})
+    errors = {}
+    with node.client() as client:
+        keys = [account.public_key for account in
+                client.accounts_many(KEYS, max_in_flight=5, errors=errors)]
+
+    assert sorted(keys) == sorted(set(KEYS) - MISSING)
+    # The slow first lookup doesn't hold back the others
+    assert keys[-1] == KEYS[0]
+    assert 1 < node.max_in_flight <= 5
+
+
+def test_failures_are_added_to_errors():
+    errors = {}
+    # Failures are keyed by the accounts as given
+    addresses = {key_to_address(key): key for key in KEYS}
+    with Node().client() as client:
+        list(client.accounts_many(addresses, errors=errors))
+    assert {addresses[address] for address in errors} == MISSING
+    assert all(isinstance(error, httpx.HTTPStatusError)
+               for error in errors.values())
+
+
+def test_failures_are_raised_together_at_the_end():
+    keys = []
+    with Node().client() as client:
+        with pytest.raises(ExceptionGroup) as group:
+            for account in client.accounts_many(KEYS, max_in_flight=4):
+                keys.append(account.public_key)
+    assert len(keys) == len(KEYS) - len(MISSING)
+    assert len(group.value.exceptions) == len(MISSING)
+
+
+def test_exceptions_thrown_into_the_generator_are_raised():
+    errors = {}
+    with Node().client() as client:
+        accounts = client.accounts_many(KEYS, errors=errors)
+        next(accounts)
+        with pytest.raises(RuntimeError):
+            accounts.throw(RuntimeError)
+    assert set(errors) <= MISSING
+
+
+def test_async_accounts_many():
+    node = Node()
+
+    async def handle(request):
+        return await asyncio.to_thread(node.handle, request)
+
+    async def main():
+        errors = {}
+        async with AsyncAttoClient(
+                'http://node', lazy=True,
+                transport=httpx.MockTransport(handle)) as client:
+            keys = [account.public_key async for account in
+                    client.accounts_many(KEYS, max_in_flight=4,
+                                         errors=errors)]
+            assert 1 < node.max_in_flight <= 4
+
+            accounts = client.accounts_many(KEYS, errors=errors)
+            await anext(accounts)
+            with pytest.raises(RuntimeError):
+                await accounts.athrow(RuntimeError)
+        return keys, errors
+
+    keys, errors = asyncio.run(main())
+    assert sorted(keys) == sorted(set(KEYS) - MISSING)
+    assert set(errors) == MISSING
@@ -0,0 +1,211 @@
+import asyncio
+import datetime
+import json
+
+import httpx
+import pytest
+
+from attopy import AsyncAttoClient, AttoClient, key_to_address
+from attopy.Account import Account
+from attopy.Entry import Entry
+from attopy.Receivable import Receivable
+from attopy.Transaction import Transaction
+
+__author__ = "Waldo Lemmer"
+__copyright__ = "Waldo Lemmer"
+__license__ = "GPL-3.0-only"
+
+ACCOUNT = 'AB' * 32
+MISSING = 'CD' * 32
+HASH = 'EF' * 32
+TIMESTAMP = 1_744_740_180_123
+
+
+def account(height=3):
+    return {'publicKey': ACCOUNT, 'network': 'LIVE', 'version': 0,
+            'algorithm': 'V1', 'height': height, 'balance': 10**9 * height,
+            'lastTransactionHash': HASH,
+            'lastTransactionTimestamp': TIMESTAMP,
+            'representativeAlgorithm': 'V1',
+            'representativePublicKey': 'EF' * 32}
+
+
+def entry(height):
+    return {'hash': f'{height:064X}', 'algorithm': 'V1', 'publicKey': ACCOUNT,
+            'height': height, 'blockType': 'RECEIVE',
+            'subjectAlgorithm': 'V1', 'subjectPublicKey': 'EF' * 32,
+            'previousBalance': height - 1, 'balance': height,
+            'timestamp': TIMESTAMP}
+
+
+def transaction(height):
+    return {'block': {'publicKey': ACCOUNT, 'version': 0, 'algorithm': 'V1',
+                      'network': 'LIVE', 'type': 'RECEIVE', 'balance': height,
+                      'timestamp': TIMESTAMP, 'height': height,
+                      'previous': f'{height - 1:064X}'},
+            'signature': 'AB' * 64, 'work': 'CD' * 8}
+
+
+def receivable(amount):
+    return {'hash': f'{amount:064X}', 'version': 0, 'algorithm': 'V1',
+            'publicKey': 'EF' * 32, 'timestamp': TIMESTAMP,
+            'receiverAlgorithm': 'V1', 'receiverPublicKey': ACCOUNT,
+            'amount': amount}
+
+
+def ndjson(records):
+    return b''.join(json.dumps(record).encode() + b'\n'
+                    for record in records)
+
+
+def handle(request):
+    """Answer the requests of each AsyncAttoClient method like a node"""
+    path = request.url.path.removeprefix('/')
+    params = request.url.params
+    if MISSING in path:
+        return httpx.Response(404)
+    if path.startswith('instants/'):
+        return httpx.Response(200, json={
+                'clientInstant': '2025-04-15T18:03:00.123Z',
+                'serverInstant': '2025-04-15T18:03:00.623Z',
+                'differenceMillis': 500})
+    if path == f'accounts/{ACCOUNT}':
+        return httpx.Response(200, json=account())
+    if path == f'accounts/{ACCOUNT}/stream':
+        return httpx.Response(200, content=ndjson([account(3), account(4)]))
+    if path == f'accounts/{ACCOUNT}/entries/stream':
+        heights = range(int(params['fromHeight']),
+                        int(params['toHeight']) + 1)
+        return httpx.Response(200, content=ndjson(map(entry, heights)))
+    if path == f'accounts/{ACCOUNT}/transactions/stream':
+        heights = range(int(params['fromHeight']),
+                        int(params['toHeight']) + 1)
+        return httpx.Response(200, content=ndjson(map(transaction, heights)))
+    if path == f'accounts/{ACCOUNT}/receivables/stream':
+        return httpx.Response(200, content=ndjson([receivable(1),
+                                                   receivable(2)]))
+    if path == f'accounts/entries/{HASH}/stream':
+        return httpx.Response(200, content=ndjson([entry(2)]))
+    if path == f'transactions/{HASH}/stream':
+        return httpx.Response(200, content=ndjson([transaction(2)]))
+    return httpx.Response(404)
+
+
+def run(test):
+    """Run test(client) with an AsyncAttoClient of the node in handle()"""
+    async def main():
+        async with AsyncAttoClient(
+                'http://node', transport=httpx.MockTransport(handle)) \
+                as client:
+            return await test(client)
+    return asyncio.run(main())
+
+
+async def collect(records):
+    return [record async for record in records]
+
+
+def test_instants():
+    async def test(client):
+        return await client.instants(datetime.datetime(2025, 4, 15))
+
+    instants = run(test)
+    assert instants.difference == datetime.timedelta(milliseconds=500)
+    assert instants.server_instant - instants.client_instant \
+        == instants.difference
+
+
+def test_lookups_match_the_sync_client():
+    async def test(client):
+        return (await client.account(ACCOUNT),
+                await client.account(key_to_address(ACCOUNT)))
+
+    by_key, by_address = run(test)
+    with AttoClient('http://node',
+                    transport=httpx.MockTransport(handle)) as client:
+        expected = client.account(ACCOUNT)
+    for account_ in by_key, by_address:
+        assert isinstance(account_, Account)
+        assert str(account_) == str(expected)
+
+
+def test_lookup_errors_are_raised():
+    async def test(client):
+        with pytest.raises(httpx.HTTPStatusError):
+            await client.account(MISSING)
+
+    run(test)
+
+
+def test_streams():
+    async def test(client):
+        return (await collect(client.account(ACCOUNT, stream=True)),
+                await collect(client.entries(ACCOUNT, from_=2, to=4)),
+                await collect(client.transactions(ACCOUNT, from_=1, to=2)),
+                await collect(client.receivables(ACCOUNT)),
+                await collect(client.entry(HASH, stream=True)),
+                await collect(client.transaction(HASH, stream=True)))
+
+    accounts, entries, transactions, receivables, by_hash, \
+        transaction_by_hash = run(test)
+    assert [account_.height for account_ in accounts] == [3, 4]
+    assert [entry_.height for entry_ in entries] == [2, 3, 4]
+    assert all(type(entry_) is Entry for entry_ in entries)
+    assert [transaction_.block.height
+            for transaction_ in transactions] == [1, 2]
+    assert all(type(transaction_) is Transaction
+               for transaction_ in transactions)
+    assert [type(receivable_) for receivable_ in receivables] == [
+            Receivable, Receivable]
+    assert [entry_.height for entry_ in by_hash] == [2]
+    assert [transaction_.block.height
+            for transaction_ in transaction_by_hash] == [2]
+
+
+def test_lines_split_across_chunks():
+    body = ndjson(map(entry, range(1, 6)))
+
+    async def chunks():
+        for i in range(0, len(body), 7):
+            yield body[i:i + 7]
+
+    async def main():
+        async with AsyncAttoClient(
+                'http://node', lazy=True, raw_numbers=True,
+                transport=httpx.MockTransport(
+                    lambda request: httpx.Response(200, content=chunks()))) \
+                as client:
+            return await collect(client.entries(ACCOUNT, from_=1, to=5))
+
+    entries = asyncio.run(main())
+    assert [entry_.height for entry_ in entries] == [1, 2, 3, 4, 5]
+    assert entries[-1].balance == 5
+
+
+@pytest.mark.parametrize('method', ['entry', 'transaction'])
+def test_lookups_by_hash_must_stream(method):
+    async def test(client):
+        with pytest.raises(ValueError, match='stream'):
+            getattr(client, method)(HASH)
+
+    run(test)
+
+
+def test_account_methods_return_the_clients_results():
+    async def test(client):
+        account_ = await client.account(ACCOUNT)
+        lookup = account_.get()
+        stream = account_.stream()
+        assert asyncio.iscoroutine(lookup)
+        assert hasattr(stream, '__anext__')
+        return (await lookup, await collect(stream),
+                await collect(account_.entries(from_=1, to=2)),
+                await collect(account_.transactions(from_=1, to=1)),
+                await collect(account_.receivables()))
+
+    got, streamed, entries, transactions, receivables = run(test)
+    assert got.height == 3
+    assert [account_.height for account_ in streamed] == [3, 4]
+    assert [entry_.height for entry_ in entries] == [1, 2]
+    assert len(transactions) == 1
+    assert len(receivables) == 2
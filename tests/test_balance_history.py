@@ -0,0 +1,176 @@
+import random
+
+import pytest
+
+from attopy import BalanceHistory
+from attopy.BalanceHistory import _RangeTree
+from attopy.Entry import Entry
+
+__author__ = "Waldo Lemmer"
+__copyright__ = "Waldo Lemmer"
+__license__ = "GPL-3.0-only"
+
+ACCOUNT = 'AB' * 32
+START = 1_000_000
+
+
+def make_entries(count, seed=1):
+    """Return the entry dicts of an account, with balances that go up and
+    down and timestamps that may repeat"""
+    rng = random.Random(seed)
+    balance, timestamp = 0, START
+    entries = []
+    for height in range(1, count + 1):
+        previous = balance
+        balance = max(0, balance + rng.randint(-50, 100))
+        timestamp += rng.randint(0, 3)
+        entries.append({'hash': f'{height:064X}', 'algorithm': 'V1',
+                        'publicKey': ACCOUNT.lower(), 'height': height,
+                        'blockType': 'RECEIVE', 'subjectAlgorithm': 'V1',
+                        'subjectPublicKey': 'CD' * 32,
+                        'previousBalance': previous, 'balance': balance,
+                        'timestamp': timestamp})
+    return entries
+
+
+def balance_at(entries, time):
+    balance = 0
+    for entry in entries:
+        if entry['timestamp'] <= time:
+            balance = entry['balance']
+    return balance
+
+
+def balance_range(entries, since, until):
+    """Return the lowest and highest balance and the volume by brute force"""
+    inside = [e for e in entries
+              if (since is None or e['timestamp'] > since)
+              and (until is None or e['timestamp'] <= until)]
+    balances = [e['balance'] for e in inside]
+    if since is not None or not inside:
+        balances.append(balance_at(entries,
+                                   since if since is not None else until))
+    volume = sum(abs(e['balance'] - e['previousBalance']) for e in inside)
+    return min(balances), max(balances), volume
+
+
+def check(history, entries, rng, queries=300):
+    end = entries[-1]['timestamp']
+    for _ in range(queries):
+        time = rng.randint(START, end + 10)
+        assert history.balance_at(ACCOUNT, time) == balance_at(entries, time)
+
+        height = rng.randint(0, len(entries))
+        assert history.balance_at_height(ACCOUNT, height) == (
+                entries[height - 1]['balance'] if height else 0)
+
+        since, until = sorted(rng.sample(range(START, end + 10), 2))
+        since = rng.choice([since, None])
+        until = rng.choice([until, None])
+        low, high = history.balance_range(ACCOUNT, since, until)
+        volume = history.volume(ACCOUNT, since, until)
+        assert (low, high, volume) == balance_range(entries, since, until)
+
+
+@pytest.mark.parametrize('order', ['sorted', 'shuffled'])
+def test_matches_brute_force(order):
+    rng = random.Random(2)
+    entries = make_entries(1500)
+    added = list(entries)
+    if order == 'shuffled':
+        rng.shuffle(added)
+
+    history = BalanceHistory(raw_numbers=True)
+    for i, entry in enumerate(added):
+        # API dicts, eager and lazy Entries
+        if i % 3 == 0:
+            assert history.add(entry)
+        else:
+            assert history.add(Entry(entry, None, lazy=i % 3 == 2,
+                                     raw_numbers=True))
+    assert not history.add(entries[0])
+    assert history.height(ACCOUNT) == len(entries)
+    check(history, entries, rng)
+
+
+def test_queries_between_appends():
+    # Each batch extends the range tree, past its capacity at times
+    rng = random.Random(3)
+    entries = make_entries(1000)
+    history = BalanceHistory(raw_numbers=True)
+    added = 0
+    while added < len(entries):
+        batch = rng.randint(1, 150)
+        history.update(entries[added:added + batch])
+        added = min(added + batch, len(entries))
+        check(history, entries[:added], rng, queries=20)
+
+
+def test_older_entries_after_queries_rebuild_the_index():
+    rng = random.Random(4)
+    entries = make_entries(800)
+    history = BalanceHistory(raw_numbers=True)
+    history.update(entries[400:])
+    # Queries after the first added entry work without the older ones
+    assert history.balance_at_height(ACCOUNT, 800) == entries[-1]['balance']
+    assert history.volume(ACCOUNT) == balance_range(entries[400:], None,
+                                                    None)[2]
+
+    history.update(reversed(entries[:400]))
+    check(history, entries, rng)
+
+
+def test_missing_heights_raise_value_error():
+    entries = make_entries(300)
+    history = BalanceHistory(raw_numbers=True)
+    history.update(e for e in entries if not 100 <= e['height'] <= 110)
+
+    with pytest.raises(ValueError):
+        history.balance_at_height(ACCOUNT, 105)
+    with pytest.raises(ValueError):
+        history.balance_at_height(ACCOUNT, 301)
+    with pytest.raises(ValueError):
+        history.balance_at(ACCOUNT, entries[104]['timestamp'])
+    with pytest.raises(ValueError):
+        history.volume(ACCOUNT, entries[50]['timestamp'],
+                       entries[200]['timestamp'])
+    with pytest.raises(ValueError):
+        history.balance_range(ACCOUNT, entries[50]['timestamp'])
+    with pytest.raises(ValueError):
+        history.balance_at(ACCOUNT.replace('A', 'C'), START)
+
+    # Heights next to the gap are known
+    assert history.balance_at_height(ACCOUNT, 99) == entries[98]['balance']
+    assert history.balance_at_height(ACCOUNT, 110) == entries[109]['balance']
+    since = entries[120]['timestamp']
+    assert history.balance_range(ACCOUNT, since) == balance_range(
+            entries, since, None)[:2]
+
+
+def test_times_before_first_entry():
+    entries = make_entries(50)
+    history = BalanceHistory(raw_numbers=True)
+    history.update(entries[10:])
+    with pytest.raises(ValueError):
+        history.balance_at(ACCOUNT, START - 1)
+
+    history.update(entries[:10])
+    assert history.balance_at(ACCOUNT, START - 1) == 0
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_range_tree_matches_brute_force(seed):
+    rng = random.Random(seed)
+    values = []
+    tree = _RangeTree()
+    for _ in range(20):
+        new = [rng.randrange(2**64) for _ in range(rng.randint(0, 40))]
+        values.extend(new)
+        tree.extend(new)
+        for _ in range(20):
+            if not values:
+                break
+            first = rng.randrange(len(values))
+            last = rng.randrange(first, len(values))
+            assert tree.query(first, last) == (min(values[first:last + 1]),
+                                               max(values[first:last + 1]))
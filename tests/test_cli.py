@@ -0,0 +1,166 @@
+import functools
+import importlib.util
+import io
+import json
+import os
+import pathlib
+
+import pytest
+
+from attopy import AttoClient, cli, key_to_address, raw_to_atto
+
+__author__ = "Waldo Lemmer"
+__copyright__ = "Waldo Lemmer"
+__license__ = "GPL-3.0-only"
+
+ADDRESS = 'atto://ad7z3jdoeqwayzpaiafizb5su6zc2fyvbeg2wq5t3yfj3q5iuprx23z437juk'
+
+_spec = importlib.util.spec_from_file_location(
+        'fake_node',
+        pathlib.Path(__file__).parent.parent / 'benchmarks' / 'fake_node.py')
+fake_node = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(fake_node)
+
+KEY = fake_node.key(7)
+
+
+def test_accept_encoding_and_backfill_compression():
+    args = cli.parse_args(['--accept-encoding', 'zstd,gzip', 'backfill',
+                           ADDRESS, 'out.ndjson.xz', '--compression', 'xz'])
+    assert args.accept_encoding == 'zstd,gzip'
+    assert args.compression == 'xz'
+
+
+def test_accept_encoding_survives_backfill_defaults():
+    args = cli.parse_args(['--accept-encoding', 'zstd', 'backfill', ADDRESS,
+                           'out.ndjson'])
+    assert args.accept_encoding == 'zstd'
+    assert args.compression is None
+
+
+def test_backfill_compression_does_not_change_accept_encoding():
+    args = cli.parse_args(['backfill', ADDRESS, 'out.csv.gz', '--format',
+                           'csv', '--compression', 'gzip'])
+    assert args.compression == 'gzip'
+    assert args.accept_encoding is None
+
+    with cli._client(args) as client:
+        assert client.compression is None
+
+
+def test_accept_encoding_reaches_client():
+    args = cli.parse_args(['--accept-encoding', 'gzip,identity',
+                           'backfill', ADDRESS, 'out.ndjson'])
+    assert args.compression is None
+    with cli._client(args) as client:
+        assert client.compression == ['gzip', 'identity']
+
+
+@pytest.fixture
+def node(monkeypatch):
+    """Make the tool's clients talk to a FakeNode, and return it"""
+    node = fake_node.FakeNode(height=100, chunk_size=8)
+    monkeypatch.setattr(cli, 'AttoClient', functools.partial(
+            AttoClient, transport=node.transport()))
+    return node
+
+
+def test_tail_ndjson(node, capsys):
+    assert cli.main(['tail', 'entries', '--format', 'ndjson',
+                     '--limit', '5']) == 0
+    lines = capsys.readouterr().out.splitlines()
+    assert [json.loads(line) for line in lines] == [
+            node.entry(h % 16, h // 16 + 1) for h in range(5)]
+
+
+def test_tail_text(node, capsys):
+    assert cli.main(['tail', 'transactions', '--raw', '--limit', '3',
+                     '--flush']) == 0
+    assert len(capsys.readouterr().out.splitlines()) == 3
+
+
+class BrokenStdout:
+    """A stdout whose reader went away, with a file descriptor at path"""
+    def __init__(self, path):
+        self.file = open(path, 'wb')
+        self.buffer = self
+
+    def write(self, data):
+        raise BrokenPipeError
+
+    def flush(self):
+        pass
+
+    def fileno(self):
+        return self.file.fileno()
+
+
+def test_tail_into_a_closed_pipe(node, monkeypatch, tmp_path):
+    stdout = BrokenStdout(tmp_path / 'stdout')
+    monkeypatch.setattr('sys.stdout', stdout)
+    try:
+        assert cli.main(['tail', 'entries', '--format', 'ndjson']) == 1
+        # stdout now points at devnull
+        os.write(stdout.fileno(), b'lost')
+    finally:
+        stdout.file.close()
+    assert (tmp_path / 'stdout').read_bytes() == b''
+
+
+def test_backfill(node, capsys, tmp_path):
+    path = tmp_path / 'entries.ndjson'
+    assert cli.main(['backfill', KEY, str(path), '--to', '50',
+                     '--batch-size', '8']) == 0
+    assert [json.loads(line)['height']
+            for line in path.read_text().splitlines()] == list(range(1, 51))
+    assert capsys.readouterr().err.startswith(
+            f'50 records written to {path} in ')
+
+    # Continues after the saved progress
+    assert cli.main(['backfill', KEY, str(path), '--parallel', '2']) == 0
+    assert len(path.read_text().splitlines()) == node.height
+    assert capsys.readouterr().err.startswith('50 records written')
+
+
+def test_backfill_transactions_csv(node, tmp_path):
+    path = tmp_path / 'transactions.csv'
+    assert cli.main(['backfill', ADDRESS, str(path), '--transactions',
+                     '--format', 'csv', '--from', '91']) == 0
+    # A header and the last 10 heights
+    assert len(path.read_text().splitlines()) == 11
+
+
+def test_balances(node, capsys, monkeypatch):
+    monkeypatch.setattr('sys.stdin', io.StringIO(f'{fake_node.key(2)}\n\n'))
+    assert cli.main(['balances', KEY, '-', 'atto://invalid']) == 1
+    out, err = capsys.readouterr()
+    balance = raw_to_atto(node.height * 1_000_000_000)
+    assert sorted(out.splitlines()) == sorted([
+            'address,height,balance',
+            f'{key_to_address(KEY)},{node.height},{balance}',
+            f'{key_to_address(fake_node.key(2))},{node.height},{balance}'])
+    assert err.startswith('atto://invalid: ')
+
+
+def test_balances_raw(node, capsys):
+    assert cli.main(['balances', '--raw', KEY]) == 0
+    assert capsys.readouterr().out.splitlines()[1].endswith(
+            f',{node.height * 1_000_000_000}')
+
+
+def test_bench_json(node, capsys):
+    node.compress = True
+    assert cli.main(['--accept-encoding', 'zstd', 'bench', KEY,
+                     '--lookups', '3', '--records', '40', '--json']) == 0
+    results = json.loads(capsys.readouterr().out)
+    assert set(results['lookup_seconds']) == {'p50', 'p99', 'max'}
+    assert results['stream']['records'] == 40
+    assert 0 < results['stream']['wire_bytes'] < results['stream']['bytes']
+
+
+def test_bench_text(node, capsys):
+    assert cli.main(['bench', KEY, '--lookups', '2', '--transactions']) == 0
+    lines = capsys.readouterr().out.splitlines()
+    assert [line.split(':')[0] for line in lines] == [
+            'lookup latency', 'stream', 'transfer']
+    assert f'({node.height:,} records)' in lines[1]
@@ -0,0 +1,73 @@
+import json
+
+import httpx
+import pytest
+
+from attopy import AttoClient, columns
+
+__author__ = "Waldo Lemmer"
+__copyright__ = "Waldo Lemmer"
+__license__ = "GPL-3.0-only"
+
+np = pytest.importorskip('numpy')
+
+ACCOUNT = 'AB' * 32
+
+
+def transaction(height):
+    block = {'publicKey': ACCOUNT, 'type': 'RECEIVE', 'balance': 5,
+             'timestamp': 1_700_000_000_000, 'previous': 'CD' * 32}
+    if height is not None:
+        block['height'] = height
+    return {'block': block, 'signature': 'AB' * 64, 'work': 'CD' * 8}
+
+
+def test_transactions_without_height():
+    batch = columns.transaction_columns([transaction(3), transaction(None)])
+    assert batch['height'].tolist() == [3, 0]
+    assert batch['height'].dtype == np.uint64
+
+
+def test_partial_batches_after_max_delay(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(columns.time, 'monotonic', lambda: now[0])
+
+    def dicts():
+        for height in range(1, 8):
+            # Heights 4 and 6 arrive after a pause
+            if height in (4, 6):
+                now[0] += 2.0
+            yield transaction(height)
+
+    batches = columns._column_batches(dicts(), columns.transaction_columns,
+                                      100, max_delay=1.0)
+    assert [batch['height'].tolist() for batch in batches] == [
+            [1, 2, 3, 4], [5, 6], [7]]
+
+
+def test_full_batches_without_max_delay():
+    batches = columns._column_batches(
+            (transaction(height) for height in range(1, 8)),
+            columns.transaction_columns, 3)
+    assert [batch['height'].tolist() for batch in batches] == [
+            [1, 2, 3], [4, 5, 6], [7]]
+
+
+def test_live_stream_of_all_accounts_yields_partial_batches(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(columns.time, 'monotonic', lambda: now[0])
+
+    def handle(request):
+        def lines():
+            for height in range(1, 4):
+                now[0] += 0.6
+                yield json.dumps(transaction(height)).encode() + b'\n'
+            # The stream stays open
+            raise AssertionError('read past the records')
+        return httpx.Response(200, content=lines())
+
+    with AttoClient('http://node',
+                    transport=httpx.MockTransport(handle)) as client:
+        batches = client.transactions(as_columns=True)
+        # Without a delay, this would wait for 65536 transactions
+        assert next(batches)['height'].tolist() == [1, 2, 3]
@@ -0,0 +1,71 @@
+import base64
+import hashlib
+import random
+
+import pytest
+
+from attopy import (address_to_key, addresses_to_keys, key_to_address,
+                    keys_to_addresses)
+
+__author__ = "Waldo Lemmer"
+__copyright__ = "Waldo Lemmer"
+__license__ = "GPL-3.0-only"
+
+# The address in the README
+ADDRESS = 'atto://ad7z3jdoeqwayzpaiafizb5su6zc2fyvbeg2wq5t3yfj3q5iuprx23z437juk'
+
+
+def flip(address, i):
+    """Replace the base32 character at i with another one"""
+    character = 'b' if address[i] == 'a' else 'a'
+    return address[:i] + character + address[i + 1:]
+
+
+def test_address_round_trip():
+    key = address_to_key(ADDRESS)
+    assert len(key) == 64
+    assert key == key.upper()
+    assert key_to_address(key) == ADDRESS
+    # The protocol and case don't matter
+    assert address_to_key(ADDRESS.removeprefix('atto://')) == key
+    assert address_to_key(ADDRESS.upper().replace('ATTO://', '')) == key
+    assert key_to_address(key.lower()) == ADDRESS
+
+
+@pytest.mark.parametrize('i', [
+    # The checksum, the key and the version
+    -1, -2, -4, 20, 40, len('atto://'),
+])
+def test_changed_characters_are_rejected(i):
+    with pytest.raises(ValueError):
+        address_to_key(flip(ADDRESS, i))
+
+
+@pytest.mark.parametrize('address', [
+    ADDRESS[:-1], ADDRESS + 'a', ADDRESS[:-8], 'atto://', 'atto://1!',
+])
+def test_malformed_addresses_are_rejected(address):
+    with pytest.raises(ValueError):
+        address_to_key(address)
+
+
+def test_unknown_versions_are_rejected():
+    version_and_key = bytes((1,)) + bytes(32)
+    checksum = hashlib.blake2b(version_and_key, digest_size=5).digest()
+    address = base64.b32encode(version_and_key + checksum).decode()
+    with pytest.raises(ValueError, match='version'):
+        address_to_key(address.rstrip('=').lower())
+
+
+def test_bulk_conversion():
+    rng = random.Random(1)
+    keys = [rng.randbytes(32).hex().upper() for _ in range(500)]
+    addresses = keys_to_addresses(keys)
+    assert addresses == [key_to_address(key) for key in keys]
+    assert addresses_to_keys(addresses) == keys
+    assert addresses_to_keys(address.removeprefix('atto://')
+                             for address in addresses) == keys
+
+    addresses[250] = flip(addresses[250], -2)
+    with pytest.raises(ValueError, match=addresses[250][-10:]):
+        addresses_to_keys(addresses)
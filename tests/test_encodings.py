@@ -0,0 +1,185 @@
+import functools
+import json
+import zlib
+
+import httpx
+import pytest
+
+from attopy import AttoClient, Metrics
+
+__author__ = "Waldo Lemmer"
+__copyright__ = "Waldo Lemmer"
+__license__ = "GPL-3.0-only"
+
+ACCOUNT = 'AB' * 32
+HEIGHT = 50
+
+
+def entry(height):
+    return {'hash': f'{height:064X}', 'algorithm': 'V1',
+            'publicKey': ACCOUNT, 'height': height,
+            'blockType': 'OPEN' if height == 1 else 'RECEIVE',
+            'subjectAlgorithm': 'V1', 'subjectPublicKey': 'CD' * 32,
+            'previousBalance': height - 1, 'balance': height,
+            'timestamp': 1_700_000_000_000 + height}
+
+
+BODY = b''.join(json.dumps(entry(height)).encode() + b'\n'
+                for height in range(1, HEIGHT + 1))
+
+
+def pieces(data, size):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+_WBITS = {'gzip': 31, 'deflate': zlib.MAX_WBITS,
+          'raw-deflate': -zlib.MAX_WBITS}
+
+
+def compressor(encoding):
+    """Return functions that compress a chunk, flush it and finish"""
+    if encoding in _WBITS:
+        compressor = zlib.compressobj(6, zlib.DEFLATED, _WBITS[encoding])
+        return (compressor.compress,
+                functools.partial(compressor.flush, zlib.Z_SYNC_FLUSH),
+                compressor.flush)
+    if encoding == 'br':
+        compressor = pytest.importorskip('brotli').Compressor()
+        return compressor.process, compressor.flush, compressor.finish
+    zstandard = pytest.importorskip('zstandard')
+    compressor = zstandard.ZstdCompressor().compressobj()
+    return (compressor.compress,
+            functools.partial(compressor.flush,
+                              zstandard.COMPRESSOBJ_FLUSH_BLOCK),
+            compressor.flush)
+
+
+def compress(encoding, data):
+    """Compress data, flushing every 37 bytes so that lines are split across
+    compressed chunks"""
+    compress_chunk, flush, finish = compressor(encoding)
+    output = b''
+    for piece in pieces(data, 37):
+        output += compress_chunk(piece) + flush()
+    return output + finish()
+
+
+def members(encoding, data):
+    """Compress the halves of data as separate gzip members or zstd
+    frames"""
+    half = len(data) // 2 + 3
+    return [compress(encoding, data[:half]), compress(encoding, data[half:])]
+
+
+def client(wire, content_encoding, requests=None, **kwargs):
+    """Return an AttoClient whose node sends wire in 7-byte chunks, or in
+    the given chunks if wire is a list"""
+    def handle(request):
+        if requests is not None:
+            requests.append(request)
+        chunks = wire if isinstance(wire, list) else pieces(wire, 7)
+        return httpx.Response(200, content=iter(chunks),
+                              headers={'Content-Encoding': content_encoding})
+
+    return AttoClient('http://node', raw_numbers=True,
+                      transport=httpx.MockTransport(handle), **kwargs)
+
+
+def stream(wire, content_encoding, **kwargs):
+    """Return the heights of the streamed entries and the stream's
+    Sample"""
+    samples = []
+    with client(wire, content_encoding,
+                metrics=Metrics([samples.append]), **kwargs) as atto_client:
+        heights = [e.height for e in atto_client.entries(ACCOUNT, from_=1,
+                                                         to=HEIGHT)]
+    [sample] = samples
+    return heights, sample
+
+
+@pytest.mark.parametrize('encoding', ['gzip', 'deflate', 'br', 'zstd'])
+def test_streams_are_decoded_incrementally(encoding):
+    wire = compress(encoding, BODY)
+    heights, sample = stream(wire, encoding)
+
+    assert heights == list(range(1, HEIGHT + 1))
+    assert sample.encoding == encoding
+    assert sample.wire_bytes == len(wire)
+    assert sample.bytes == len(BODY)
+    assert sample.lines == HEIGHT
+    assert sample.decompress_seconds > 0
+    assert sample.error is None
+
+
+@pytest.mark.parametrize('encoding', ['gzip', 'zstd'])
+@pytest.mark.parametrize('aligned', [False, True])
+def test_concatenated_members_and_frames(encoding, aligned):
+    # Aligned members end with a chunk, others end inside one
+    wire = members(encoding, BODY)
+    heights, sample = stream(wire if aligned else b''.join(wire), encoding)
+    assert heights == list(range(1, HEIGHT + 1))
+    assert sample.bytes == len(BODY)
+    assert sample.wire_bytes == sum(map(len, wire))
+
+
+def test_raw_deflate_without_zlib_header():
+    wire = compress('raw-deflate', BODY)
+    heights, sample = stream(wire, 'deflate')
+    assert heights == list(range(1, HEIGHT + 1))
+    assert sample.bytes == len(BODY)
+
+
+def test_layered_encodings_are_undone_in_reverse():
+    # gzip was applied first, then br. The end of the gzip member is only
+    # decoded when the br decoder is flushed.
+    pytest.importorskip('brotli')
+    wire = compress('br', zlib.compress(BODY, wbits=31))
+    heights, sample = stream(wire, 'gzip, br')
+    assert heights == list(range(1, HEIGHT + 1))
+    assert (sample.bytes, sample.wire_bytes) == (len(BODY), len(wire))
+
+
+def test_identity_counts_the_same_bytes():
+    heights, sample = stream(BODY, 'identity')
+    assert heights == list(range(1, HEIGHT + 1))
+    assert sample.bytes == sample.wire_bytes == len(BODY)
+    assert sample.encoding == 'identity'
+
+
+def test_lookups_are_decoded():
+    body = json.dumps({'clientInstant': '2025-04-15T18:03:00+00:00',
+                       'serverInstant': '2025-04-15T18:03:01+00:00',
+                       'differenceMillis': 1000}).encode()
+    wire = compress('gzip', body)
+    metrics = Metrics()
+    with client(wire, 'gzip', metrics=metrics) as atto_client:
+        assert atto_client.instants().difference.total_seconds() == 1
+
+    [stats] = metrics.endpoints.values()
+    assert (stats.bytes, stats.wire_bytes) == (len(body), len(wire))
+    assert stats.compression_ratio == len(body) / len(wire)
+
+
+@pytest.mark.parametrize('measured', [False, True])
+def test_unsupported_and_corrupt_encodings_raise_decoding_error(measured):
+    metrics = Metrics() if measured else None
+    with client(BODY, 'compress', metrics=metrics) as atto_client:
+        with pytest.raises(httpx.DecodingError):
+            list(atto_client.entries(ACCOUNT, from_=1, to=HEIGHT))
+
+    with client(b'\x1f\x8b' + BODY, 'gzip', metrics=metrics) as atto_client:
+        with pytest.raises(httpx.DecodingError):
+            list(atto_client.entries(ACCOUNT, from_=1, to=HEIGHT))
+
+
+def test_accept_encoding_prefers_earlier_encodings():
+    requests = []
+    wire = compress('zstd', BODY)
+    with client(wire, 'zstd', requests,
+                compression=['zstd', 'br', 'gzip']) as atto_client:
+        list(atto_client.entries(ACCOUNT, from_=1, to=HEIGHT))
+    assert requests[0].headers['Accept-Encoding'] == (
+            'zstd, br;q=0.9, gzip;q=0.8')
+
+    with pytest.raises(ValueError):
+        AttoClient('http://node', compression='lzma')
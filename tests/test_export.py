@@ -0,0 +1,125 @@
+import csv
+import gzip
+import json
+import re
+import sys
+
+import httpx
+import pytest
+
+from attopy import AttoClient
+
+__author__ = "Waldo Lemmer"
+__copyright__ = "Waldo Lemmer"
+__license__ = "GPL-3.0-only"
+
+# The module, which the class of the same name shadows in attopy
+client_module = sys.modules['attopy.AttoClient']
+
+ACCOUNT = 'AB' * 32
+HEIGHT = 20
+
+
+def entry(height):
+    return {'hash': f'{height:064X}', 'algorithm': 'V1',
+            'publicKey': ACCOUNT, 'height': height,
+            'blockType': 'OPEN' if height == 1 else 'RECEIVE',
+            'subjectAlgorithm': 'V1', 'subjectPublicKey': 'CD' * 32,
+            'previousBalance': height - 1, 'balance': height,
+            'timestamp': 1_700_000_000_000 + height}
+
+
+def client(drop_after=None):
+    """Return an AttoClient whose node streams heights up to HEIGHT, and
+    drops the connection after drop_after records if it's given"""
+    def handle(request):
+        assert re.search(r'accounts/\w{64}/entries/stream$', request.url.path)
+        start = int(request.url.params['fromHeight'])
+
+        def chunks():
+            for i, height in enumerate(range(start, HEIGHT + 1)):
+                if i == drop_after:
+                    raise httpx.ReadError('connection reset')
+                yield json.dumps(entry(height)).encode() + b'\n'
+
+        return httpx.Response(200, content=chunks())
+
+    return AttoClient('http://node', transport=httpx.MockTransport(handle))
+
+
+def read_heights(path, format, compression):
+    opener = gzip.open if compression == 'gzip' else open
+    with opener(path, 'rt', newline='') as file:
+        if format == 'ndjson':
+            return [json.loads(line)['height'] for line in file]
+        rows = list(csv.DictReader(file))
+    assert all(row['public_key'] == ACCOUNT for row in rows)
+    return [int(row['height']) for row in rows]
+
+
+def export(path, format, compression, drop_after=None):
+    with client(drop_after) as atto_client:
+        return atto_client.export_entries(ACCOUNT, path, format=format,
+                                          compression=compression, from_=1,
+                                          to=HEIGHT, batch_size=3, retries=0)
+
+
+FORMATS = pytest.mark.parametrize('format, compression', [
+    ('ndjson', None), ('ndjson', 'gzip'), ('csv', None), ('csv', 'gzip')])
+
+
+@FORMATS
+def test_resume_after_dropped_connection(tmp_path, format, compression):
+    path = tmp_path / f'entries.{format}'
+    with pytest.raises(httpx.ReadError):
+        export(path, format, compression, drop_after=7)
+    assert read_heights(path, format, compression) == list(range(1, 8))
+
+    assert export(path, format, compression) == HEIGHT - 7
+    assert read_heights(path, format, compression) == list(
+            range(1, HEIGHT + 1))
+
+
+@FORMATS
+def test_resume_drops_rows_after_progress(tmp_path, format, compression):
+    path = tmp_path / f'entries.{format}'
+    with pytest.raises(httpx.ReadError):
+        export(path, format, compression, drop_after=7)
+    # A chunk that was written without saving its progress
+    with open(path, 'ab') as file:
+        file.write(b'partial row')
+
+    export(path, format, compression)
+    assert read_heights(path, format, compression) == list(
+            range(1, HEIGHT + 1))
+
+
+@FORMATS
+@pytest.mark.parametrize('damage', ['delete', 'truncate'])
+def test_resume_starts_over_without_data(tmp_path, format, compression,
+                                         damage):
+    path = tmp_path / f'entries.{format}'
+    with pytest.raises(httpx.ReadError):
+        export(path, format, compression, drop_after=7)
+    if damage == 'delete':
+        path.unlink()
+    else:
+        with open(path, 'r+b') as file:
+            file.truncate(5)
+
+    assert export(path, format, compression) == HEIGHT
+    assert read_heights(path, format, compression) == list(
+            range(1, HEIGHT + 1))
+
+
+def test_restarts_still_reconnect(tmp_path, monkeypatch):
+    monkeypatch.setattr(client_module.time, 'sleep', lambda seconds: None)
+    path = tmp_path / 'entries.ndjson'
+    with pytest.raises(httpx.ReadError):
+        export(path, 'ndjson', None, drop_after=7)
+    with client(drop_after=5) as atto_client:
+        # resume=False only overwrites the saved progress
+        assert atto_client.export_entries(ACCOUNT, path, from_=1, to=HEIGHT,
+                                          batch_size=3, resume=False,
+                                          retries=1) == HEIGHT
+    assert read_heights(path, 'ndjson', None) == list(range(1, HEIGHT + 1))
@@ -0,0 +1,39 @@
+import httpx
+import pytest
+
+from attopy import AttoClient, FanOutTransport
+
+__author__ = "Waldo Lemmer"
+__copyright__ = "Waldo Lemmer"
+__license__ = "GPL-3.0-only"
+
+HEIGHT = 1000
+
+
+def key(number):
+    return format(number, '064X')
+
+
+@pytest.fixture
+def client(http2_node):
+    url = http2_node(height=HEIGHT)
+    transport = FanOutTransport(connections=1, http1=False)
+    with AttoClient(url, transport=transport, raw_numbers=True,
+                    timeout=httpx.Timeout(10.0)) as client:
+        yield client
+
+
+def test_closing_one_stream_leaves_its_siblings_running(client):
+    streams = [client.entries(key(account), from_=1, to=HEIGHT, prefetch=4)
+               for account in range(3)]
+    heights = [[next(stream).height] for stream in streams]
+    transport = client._client._transport
+    assert sum(transport._open) == 3
+
+    streams[0].close()
+    for stream, received in zip(streams[1:], heights[1:]):
+        received.extend(entry.height for entry in stream)
+
+    assert heights[0] == [1]
+    assert heights[1] == heights[2] == list(range(1, HEIGHT + 1))
+    assert sum(transport._open) == 0
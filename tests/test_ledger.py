@@ -0,0 +1,163 @@
+import json
+import sqlite3
+
+import httpx
+import pytest
+
+from attopy import AttoClient, Ledger
+
+__author__ = "Waldo Lemmer"
+__copyright__ = "Waldo Lemmer"
+__license__ = "GPL-3.0-only"
+
+ACCOUNT = 'AB' * 32
+START = 1_700_000_000_000
+
+
+def entry(height):
+    return {'hash': f'{height:064X}', 'algorithm': 'V1',
+            'publicKey': ACCOUNT, 'height': height,
+            'blockType': 'OPEN' if height == 1 else 'RECEIVE',
+            'subjectAlgorithm': 'V1', 'subjectPublicKey': 'CD' * 32,
+            'previousBalance': height - 1, 'balance': height,
+            'timestamp': START + 1000 * height}
+
+
+def transaction(height):
+    block = {'publicKey': ACCOUNT, 'version': 0, 'algorithm': 'V1',
+             'network': 'LIVE', 'type': 'RECEIVE', 'balance': 5,
+             'timestamp': START, 'previous': 'CD' * 32}
+    if height is not None:
+        block['height'] = height
+    return {'block': block, 'signature': 'AB' * 64, 'work': 'CD' * 8}
+
+
+def line(record):
+    # Not the formatting of any JSON encoder that the ledger could use
+    return json.dumps(record, indent=None, separators=(' ,', ': ')).encode()
+
+
+class Node:
+    """A node whose account has height heights, and which records the
+    heights that were streamed"""
+    def __init__(self, height):
+        self.height = height
+        self.streamed = []
+
+    def handle(self, request):
+        path = request.url.path
+        if path == f'/accounts/{ACCOUNT}':
+            return httpx.Response(200, json={'publicKey': ACCOUNT,
+                                             'height': self.height})
+
+        params = request.url.params
+        heights = range(int(params['fromHeight']),
+                        int(params['toHeight']) + 1)
+        self.streamed.extend(heights)
+        record = entry if path.endswith('/entries/stream') else transaction
+        return httpx.Response(200, content=b'\n'.join(
+                line(record(height)) for height in heights) + b'\n')
+
+    def client(self, ledger):
+        return AttoClient('http://node', lazy=True, raw_numbers=True,
+                          ledger=ledger,
+                          transport=httpx.MockTransport(self.handle))
+
+
+@pytest.fixture
+def ledger(tmp_path):
+    with Ledger(tmp_path / 'ledger.db', batch_size=7) as ledger:
+        yield ledger
+
+
+def test_sync_only_fetches_new_heights(ledger, tmp_path):
+    node = Node(height=20)
+    with node.client(ledger) as client:
+        client.sync(ACCOUNT, transactions=True)
+        assert node.streamed == list(range(1, 21)) * 2
+        assert ledger.height(ACCOUNT) == 20
+        assert ledger.height(ACCOUNT, 'transactions') == 20
+
+        node.streamed.clear()
+        client.sync(ACCOUNT)
+        assert node.streamed == []
+
+        node.height = 25
+        client.sync(ACCOUNT, transactions=True)
+        assert node.streamed == list(range(21, 26)) * 2
+
+    # After a restart, the stored heights are read from the database
+    with Ledger(tmp_path / 'ledger.db') as reopened:
+        node.streamed.clear()
+        node.height = 30
+        with node.client(reopened) as client:
+            client.sync(ACCOUNT)
+        assert node.streamed == list(range(26, 31))
+        assert [e.height for e in reopened.entries(ACCOUNT)] == list(
+                range(1, 31))
+
+
+def test_sync_requires_a_ledger():
+    with Node(height=1).client(None) as client:
+        with pytest.raises(ValueError):
+            client.sync(ACCOUNT)
+
+
+def test_replayed_records_are_stored_once(ledger):
+    for _ in range(3):
+        for height in range(1, 11):
+            ledger.record(entry(height), line(entry(height)))
+    ledger.record({'publicKey': ACCOUNT, 'height': 3}, b'an account')
+
+    assert [e.height for e in ledger.entries(ACCOUNT)] == list(range(1, 11))
+    assert list(ledger.transactions(ACCOUNT)) == []
+
+
+def test_lines_are_stored_as_received(ledger):
+    node = Node(height=3)
+    with node.client(ledger) as client:
+        list(client.entries(ACCOUNT, from_=1, to=3))
+    rows = ledger._db.execute(
+            'SELECT line FROM entries ORDER BY height').fetchall()
+    assert rows == [(line(entry(height)),) for height in (1, 2, 3)]
+
+
+def test_blocks_without_height_are_skipped(ledger):
+    def handle(request):
+        return httpx.Response(200, content=b'\n'.join(
+                line(transaction(h)) for h in (1, None, 2)))
+
+    with AttoClient('http://node', ledger=ledger, raw_numbers=True,
+                    transport=httpx.MockTransport(handle)) as client:
+        transactions = list(client.transactions(ACCOUNT, from_=1, to=2))
+    assert [t.block.height for t in transactions] == [1, None, 2]
+    assert [t.block.height for t in ledger.transactions(ACCOUNT)] == [1, 2]
+
+
+def test_queries_by_height_and_time(ledger):
+    for height in range(1, 31):
+        ledger.record(entry(height), line(entry(height)))
+
+    def heights(**kwargs):
+        return [e.height for e in ledger.entries(ACCOUNT, **kwargs)]
+
+    # Pages of batch_size rows are joined
+    assert heights() == list(range(1, 31))
+    assert heights(from_=5, to=9) == [5, 6, 7, 8, 9]
+    assert heights(since=START + 28_000) == [28, 29, 30]
+    assert heights(until=entry(2)['timestamp']) == [1, 2]
+    assert list(ledger.entries('CD' * 32)) == []
+
+
+def test_database_is_readable_while_written(ledger):
+    assert ledger._db.execute('PRAGMA journal_mode').fetchone() == ('wal',)
+    for height in range(1, 8):
+        # The seventh row fills the batch and is written
+        ledger.record(entry(height), line(entry(height)))
+
+    reader = sqlite3.connect(ledger.path)
+    try:
+        (count,) = reader.execute('SELECT COUNT(*) FROM entries').fetchone()
+    finally:
+        reader.close()
+    assert count == 7
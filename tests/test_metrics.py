@@ -0,0 +1,159 @@
+import json
+import sys
+
+import httpx
+import pytest
+
+from attopy import AttoClient, Metrics
+from attopy.monitoring import opentelemetry_callback, prometheus_callback
+
+__author__ = "Waldo Lemmer"
+__copyright__ = "Waldo Lemmer"
+__license__ = "GPL-3.0-only"
+
+# The module, which the class of the same name shadows in attopy
+client_module = sys.modules['attopy.AttoClient']
+
+ACCOUNT = 'AB' * 32
+OTHER = 'CD' * 32
+LOOKUP = 'accounts/{key}'
+STREAM = 'accounts/{key}/entries/stream'
+
+
+def entry(height):
+    return {'hash': f'{height:064X}', 'publicKey': ACCOUNT, 'height': height}
+
+
+def handle(request):
+    """Answer lookups, with a 404 for OTHER, and streams of heights up to
+    10 that drop the connection after height 5 when starting at 1"""
+    if not request.url.path.endswith('/stream'):
+        if OTHER in request.url.path:
+            return httpx.Response(404)
+        return httpx.Response(200, json={'publicKey': ACCOUNT, 'height': 10})
+
+    start = int(request.url.params['fromHeight'])
+
+    def lines():
+        for height in range(start, 11):
+            if start == 1 and height == 6:
+                raise httpx.ReadError('connection reset')
+            yield json.dumps(entry(height)).encode() + b'\n'
+    return httpx.Response(200, content=lines())
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(client_module.time, 'sleep', lambda seconds: None)
+
+
+def run(callbacks=()):
+    """Make two lookups, a failed lookup and a resumed stream, and return
+    the metrics and samples"""
+    samples = []
+    metrics = Metrics([samples.append, *callbacks])
+    with AttoClient('http://node', lazy=True, metrics=metrics,
+                    transport=httpx.MockTransport(handle)) as client:
+        client.account(ACCOUNT)
+        client.account(ACCOUNT)
+        with pytest.raises(httpx.HTTPStatusError):
+            client.account(OTHER)
+        assert [e.height for e in client.entries(ACCOUNT, from_=1, to=10,
+                                                 resume=True)] == list(
+                range(1, 11))
+    return metrics, samples
+
+
+def test_samples_are_totalled_per_endpoint():
+    metrics, samples = run()
+    assert set(metrics.endpoints) == {LOOKUP, STREAM}
+
+    lookups = metrics.endpoints[LOOKUP]
+    assert (lookups.requests, lookups.streams, lookups.errors) == (3, 0, 1)
+    assert lookups.lines == 2
+    assert lookups.bytes == sum(sample.bytes for sample in samples
+                                if sample.endpoint == LOOKUP)
+
+    streams = metrics.endpoints[STREAM]
+    assert (streams.requests, streams.streams, streams.reconnects,
+            streams.errors) == (2, 2, 1, 1)
+    assert streams.lines == 10
+    assert streams.lines_per_second > 0
+    assert streams.seconds >= streams.ttfb_seconds > 0
+
+
+def test_samples_describe_each_request():
+    _, samples = run()
+    assert [(sample.endpoint, sample.kind) for sample in samples] == [
+            (LOOKUP, 'lookup'), (LOOKUP, 'lookup'), (LOOKUP, 'lookup'),
+            (STREAM, 'stream'), (STREAM, 'reconnect'), (STREAM, 'stream')]
+
+    failed_lookup, dropped, reconnect, resumed = samples[2:]
+    assert isinstance(failed_lookup.error, httpx.HTTPStatusError)
+    assert isinstance(dropped.error, httpx.ReadError)
+    assert (dropped.lines, resumed.lines) == (5, 5)
+    assert dropped.record_type == resumed.record_type == 'Entry'
+    assert reconnect.error is dropped.error
+    assert all(sample.connect_seconds is None for sample in samples)
+
+
+def test_clear():
+    metrics, _ = run()
+    metrics.clear()
+    assert metrics.endpoints == {}
+
+
+def test_request_arguments_are_copied():
+    kwargs = {'timeout': 5, 'extensions': {'sni_hostname': 'node'}}
+    with AttoClient('http://node', metrics=Metrics()) as client:
+        with client._measure('accounts/x', 'lookup', None,
+                             kwargs) as (sample, request_kwargs):
+            pass
+    assert kwargs == {'timeout': 5, 'extensions': {'sni_hostname': 'node'}}
+    assert request_kwargs['extensions'] == {'sni_hostname': 'node',
+                                            'trace': sample._trace}
+
+
+def test_prometheus_callback():
+    prometheus_client = pytest.importorskip('prometheus_client')
+    registry = prometheus_client.CollectorRegistry()
+    run([prometheus_callback(registry, prefix='test')])
+
+    def value(name, endpoint, kind):
+        return registry.get_sample_value(
+                f'test_{name}', {'endpoint': endpoint, 'kind': kind})
+
+    assert value('requests_total', LOOKUP, 'lookup') == 3
+    assert value('errors_total', LOOKUP, 'lookup') == 1
+    assert value('requests_total', STREAM, 'stream') == 2
+    assert value('reconnects_total', STREAM, 'reconnect') == 1
+    assert value('lines_total', STREAM, 'stream') == 10
+    assert value('request_seconds_count', STREAM, 'stream') == 2
+    # Connections weren't timed
+    assert value('connect_seconds_count', LOOKUP, 'lookup') is None
+
+
+def test_opentelemetry_callback():
+    pytest.importorskip('opentelemetry.sdk')
+    from opentelemetry.sdk.metrics import MeterProvider
+    from opentelemetry.sdk.metrics.export import InMemoryMetricReader
+
+    reader = InMemoryMetricReader()
+    meter = MeterProvider(metric_readers=[reader]).get_meter('test')
+    run([opentelemetry_callback(meter)])
+
+    values = {}
+    for resource_metrics in reader.get_metrics_data().resource_metrics:
+        for scope_metrics in resource_metrics.scope_metrics:
+            for metric in scope_metrics.metrics:
+                for point in metric.data.data_points:
+                    key = (metric.name, point.attributes['endpoint'],
+                           point.attributes['kind'])
+                    values[key] = getattr(point, 'value', None) \
+                        or getattr(point, 'count', None)
+
+    assert values[('attopy.requests', LOOKUP, 'lookup')] == 3
+    assert values[('attopy.errors', LOOKUP, 'lookup')] == 1
+    assert values[('attopy.reconnects', STREAM, 'reconnect')] == 1
+    assert values[('attopy.lines', STREAM, 'stream')] == 10
+    assert values[('attopy.request_seconds', STREAM, 'stream')] == 2
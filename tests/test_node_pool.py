@@ -0,0 +1,187 @@
+import json
+import os
+import signal
+import time
+
+import httpx
+import pytest
+
+from attopy import AttoClient, NodePool
+
+__author__ = "Waldo Lemmer"
+__copyright__ = "Waldo Lemmer"
+__license__ = "GPL-3.0-only"
+
+ACCOUNT = 'AB' * 32
+URLS = ['http://a', 'http://b']
+
+
+def entry(height):
+    return {'hash': f'{height:064X}', 'publicKey': ACCOUNT, 'height': height}
+
+
+def pool(handlers, requests, **kwargs):
+    """Return a NodePool of nodes a and b, whose requests are answered by
+    handlers[host](request)"""
+    def handle(request):
+        requests.append(request.url.host)
+        return handlers[request.url.host](request)
+
+    kwargs.setdefault('health_interval', None)
+    return NodePool(URLS, transport=httpx.MockTransport(handle), **kwargs)
+
+
+def ok(request):
+    return httpx.Response(200, json={})
+
+
+def unavailable(request):
+    return httpx.Response(503)
+
+
+def refuse(request):
+    raise httpx.ConnectError('connection refused', request=request)
+
+
+@pytest.mark.parametrize('failure', [
+    lambda request: httpx.Response(503),
+    lambda request: httpx.Response(429),
+    refuse,
+])
+def test_failed_requests_go_to_the_next_node(failure):
+    requests = []
+    with pool({'a': failure, 'b': ok}, requests) as nodes:
+        assert nodes.get('accounts/x').status_code == 200
+        assert requests == ['a', 'b']
+        assert not nodes.nodes[0].up
+        assert nodes.nodes[0].failures == 1
+
+        # The failed node isn't tried again until retry_after has passed
+        requests.clear()
+        nodes.get('accounts/x')
+        assert requests == ['b']
+
+
+def test_last_node_failure_is_returned_or_raised():
+    requests = []
+    with pool({'a': refuse, 'b': lambda r: httpx.Response(503)},
+              requests) as nodes:
+        assert nodes.get('accounts/x').status_code == 503
+    with pool({'a': refuse, 'b': refuse}, requests) as nodes:
+        with pytest.raises(httpx.ConnectError):
+            nodes.get('accounts/x')
+
+
+def test_failure_of_the_last_node_marks_it_down():
+    requests = []
+    with pool({'a': unavailable, 'b': unavailable}, requests) as nodes:
+        nodes.nodes[0].latency = nodes.nodes[1].latency = 0.5
+        for failures in (1, 2):
+            assert nodes.get('accounts/x').status_code == 503
+            assert [node.failures for node in nodes.nodes] == [failures] * 2
+            assert not any(node.up for node in nodes.nodes)
+            # The failed responses don't count as latencies
+            assert [node.latency for node in nodes.nodes] == [0.5, 0.5]
+
+        with nodes.stream('GET', 'accounts/x/stream') as response:
+            assert response.status_code == 503
+        assert [node.failures for node in nodes.nodes] == [3, 3]
+
+
+def test_down_nodes_are_used_after_retry_after():
+    requests = []
+    with pool({'a': lambda r: httpx.Response(503), 'b': ok}, requests,
+              retry_after=0.05) as nodes:
+        nodes.get('accounts/x')
+        time.sleep(0.1)
+        assert nodes.nodes[0].up
+
+
+def test_lookups_go_to_the_fastest_node():
+    requests = []
+    with pool({'a': ok, 'b': ok}, requests) as nodes:
+        nodes.nodes[0].latency = 0.5
+        nodes.nodes[1].latency = 0.01
+        nodes.get('accounts/x')
+        assert requests == ['b']
+        # The latency is a moving average of the measured ones
+        assert 0 < nodes.nodes[1].latency < 0.01
+
+        nodes.nodes[1].latency = 1.0
+        nodes.get('accounts/x')
+        assert requests == ['b', 'a']
+
+
+def test_streams_go_to_the_node_with_fewest_streams():
+    requests = []
+    with pool({'a': ok, 'b': ok}, requests) as nodes:
+        nodes.nodes[0].latency = 0.01
+        nodes.nodes[1].latency = 0.5
+        with nodes.stream('GET', 'accounts/x/stream'):
+            assert [node.streams for node in nodes.nodes] == [1, 0]
+            with nodes.stream('GET', 'accounts/y/stream'):
+                assert [node.streams for node in nodes.nodes] == [1, 1]
+        assert requests == ['a', 'b']
+        assert [node.streams for node in nodes.nodes] == [0, 0]
+
+
+def test_health_checks_mark_nodes_down():
+    requests = []
+    with pool({'a': lambda r: httpx.Response(500), 'b': ok}, requests,
+              health_interval=0.05) as nodes:
+        deadline = time.monotonic() + 5
+        while nodes.nodes[0].up or nodes.nodes[1].latency is None:
+            assert time.monotonic() < deadline
+            time.sleep(0.01)
+        assert nodes.nodes[1].up
+        assert set(requests) == {'a', 'b'}
+
+
+def test_dropped_stream_resumes_on_the_other_node(monkeypatch):
+    requests = []
+
+    def dropped(request):
+        def lines():
+            for height in range(1, 6):
+                yield json.dumps(entry(height)).encode() + b'\n'
+            raise httpx.ReadError('connection reset')
+        return httpx.Response(200, content=lines())
+
+    def rest(request):
+        start = int(request.url.params['fromHeight'])
+        return httpx.Response(200, content=(
+                json.dumps(entry(height)).encode() + b'\n'
+                for height in range(start, 11)))
+
+    monkeypatch.setattr('random.uniform', lambda low, high: 0)
+    with pool({'a': dropped, 'b': rest}, requests) as nodes:
+        nodes.nodes[1].latency = 0.5
+        with AttoClient(nodes, lazy=True) as client:
+            heights = [e.height for e in client.entries(ACCOUNT, from_=1,
+                                                        to=10, resume=True)]
+    assert heights == list(range(1, 11))
+    assert requests == ['a', 'b']
+
+
+def test_streams_of_a_hung_node_move_to_another(http2_node):
+    # Each node sends 50 records per second for 4 seconds
+    urls = [http2_node(height=200, rate=50, chunk_size=1) for _ in range(2)]
+    timeout = httpx.Timeout(10.0)
+    with AttoClient(urls, raw_numbers=True, lazy=True, timeout=timeout,
+                    health_interval=0.2) as client:
+        stream = client.entries(ACCOUNT, from_=1, to=200, resume=True)
+        heights = [next(stream).height]
+        hung = next(i for i, node in enumerate(client.nodes.nodes)
+                    if node.streams)
+
+        # The node stops answering without closing its connections
+        process = http2_node.processes[urls[hung]]
+        os.kill(process.pid, signal.SIGSTOP)
+        start = time.monotonic()
+        heights.extend(entry.height for entry in stream)
+        elapsed = time.monotonic() - start
+
+        assert heights == list(range(1, 201))
+        assert not client.nodes.nodes[hung].up
+        # Interrupted by the health check, not by the read timeout
+        assert elapsed < timeout.read
@@ -0,0 +1,171 @@
+import concurrent.futures
+import json
+import random
+import threading
+import time
+
+import httpx
+import pytest
+
+from attopy import AttoClient, _concurrency
+
+__author__ = "Waldo Lemmer"
+__copyright__ = "Waldo Lemmer"
+__license__ = "GPL-3.0-only"
+
+ACCOUNT = 'AB' * 32
+HEIGHT = 25
+
+
+def entry(height):
+    return {'hash': f'{height:064X}', 'algorithm': 'V1', 'publicKey': ACCOUNT,
+            'height': height, 'blockType': 'RECEIVE',
+            'subjectAlgorithm': 'V1', 'subjectPublicKey': 'EF' * 32,
+            'previousBalance': height - 1, 'balance': height,
+            'timestamp': height}
+
+
+def transaction(height):
+    return {'block': {'publicKey': ACCOUNT, 'version': 0, 'algorithm': 'V1',
+                      'network': 'LIVE', 'type': 'RECEIVE', 'balance': 1,
+                      'timestamp': 1, 'height': height,
+                      'previous': f'{height - 1:064X}'},
+            'signature': 'AB' * 64, 'work': 'CD' * 8}
+
+
+class Node:
+    """A node with an account of HEIGHT entries and transactions that
+    answers each stream after a random delay, and records the height ranges
+    it was asked for"""
+    def __init__(self):
+        self.ranges = []
+        self._lock = threading.Lock()
+        self._random = random.Random(1)
+
+    def handle(self, request):
+        if not request.url.path.endswith('/stream'):
+            return httpx.Response(200, json={'publicKey': ACCOUNT,
+                                             'height': HEIGHT})
+
+        first = int(request.url.params['fromHeight'])
+        last = int(request.url.params['toHeight'])
+        with self._lock:
+            self.ranges.append((first, last))
+            delay = self._random.uniform(0, 0.02)
+        time.sleep(delay)
+        record = (transaction if 'transactions' in request.url.path
+                  else entry)
+        return httpx.Response(200, content=b''.join(
+                json.dumps(record(height)).encode() + b'\n'
+                for height in range(first, min(last, HEIGHT) + 1)))
+
+    def client(self):
+        return AttoClient('http://node', lazy=True,
+                          transport=httpx.MockTransport(self.handle))
+
+
+def test_height_chunks():
+    assert list(_concurrency.height_chunks(1, 10, 4)) == [
+            (1, 4), (5, 8), (9, 10)]
+    assert list(_concurrency.height_chunks(3, 3, 4)) == [(3, 3)]
+    assert list(_concurrency.height_chunks(5, 8, 4)) == [(5, 8)]
+    assert list(_concurrency.height_chunks(5, 4, 4)) == []
+
+
+def test_ordered_map_keeps_the_order():
+    def slow(i):
+        time.sleep(0.01 * (i % 3))
+        return i * 2
+
+    with concurrent.futures.ThreadPoolExecutor(4) as executor:
+        assert list(_concurrency.ordered_map(executor, slow, range(20),
+                                             window=5)) == list(
+                range(0, 40, 2))
+
+
+def test_ordered_map_limits_work_to_the_window():
+    started = []
+
+    def fn(i):
+        started.append(i)
+        return i
+
+    with concurrent.futures.ThreadPoolExecutor(1) as executor:
+        results = _concurrency.ordered_map(executor, fn, range(100),
+                                           window=3)
+        assert next(results) == 0
+        assert next(results) == 1
+        results.close()
+    # Closing cancels the work that hadn't started
+    assert len(started) <= 4
+
+
+def test_ordered_map_raises_errors_in_order():
+    def fn(i):
+        if i == 3:
+            raise KeyError(i)
+        return i
+
+    results = []
+    with concurrent.futures.ThreadPoolExecutor(4) as executor:
+        with pytest.raises(KeyError):
+            for result in _concurrency.ordered_map(executor, fn, range(10),
+                                                   window=4):
+                results.append(result)
+    assert results == [0, 1, 2]
+
+
+def test_parallel_entries_are_in_height_order():
+    node = Node()
+    with node.client() as client:
+        heights = [entry.height for entry in
+                   client.entries(ACCOUNT, parallel=3, chunk_size=4)]
+    assert heights == list(range(1, HEIGHT + 1))
+    # The default to was lowered to the account's height
+    assert sorted(node.ranges) == list(_concurrency.height_chunks(
+            1, HEIGHT, 4))
+
+
+def test_parallel_entries_in_a_range():
+    node = Node()
+    with node.client() as client:
+        heights = [entry.height for entry in
+                   client.entries(ACCOUNT, from_=5, to=100, parallel=2,
+                                  chunk_size=7, resume=True)]
+    assert heights == list(range(5, HEIGHT + 1))
+    assert sorted(node.ranges) == [(5, 11), (12, 18), (19, 25)]
+
+
+def test_parallel_transactions_are_in_height_order():
+    with Node().client() as client:
+        heights = [transaction.block.height for transaction in
+                   client.transactions(ACCOUNT, from_=2, to=20, parallel=4,
+                                       chunk_size=3)]
+    assert heights == list(range(2, 21))
+
+
+def test_parallel_columns():
+    pytest.importorskip('numpy')
+    with Node().client() as client:
+        batches = list(client.entries(ACCOUNT, parallel=3, chunk_size=4,
+                                      as_columns=True, batch_size=10))
+    assert [list(batch['height']) for batch in batches] == [
+            list(range(1, 11)), list(range(11, 21)), list(range(21, 26))]
+
+
+def test_closing_early_stops_fetching():
+    node = Node()
+    with node.client() as client:
+        entries = client.entries(ACCOUNT, parallel=2, chunk_size=1)
+        assert next(entries).height == 1
+        entries.close()
+    # At most the window of 2 * parallel chunks was requested
+    assert len(node.ranges) <= 5
+
+
+@pytest.mark.parametrize('method', ['entries', 'transactions'])
+def test_parallel_needs_an_account(method):
+    with Node().client() as client:
+        # Raised when called, not when iterated
+        with pytest.raises(ValueError, match='parallel'):
+            getattr(client, method)(parallel=2)
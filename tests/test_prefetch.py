@@ -0,0 +1,37 @@
+import httpx
+
+from attopy import AttoClient
+
+__author__ = "Waldo Lemmer"
+__copyright__ = "Waldo Lemmer"
+__license__ = "GPL-3.0-only"
+
+HEIGHT = 1000
+
+
+def key(number):
+    return format(number, '064X')
+
+
+def test_closing_prefetched_http2_stream_leaves_others_open(http2_node):
+    url = http2_node(height=HEIGHT)
+    versions = []
+
+    def record_version(response):
+        versions.append(response.http_version)
+
+    with AttoClient(url, http1=False, http2=True, raw_numbers=True,
+                    timeout=httpx.Timeout(10.0),
+                    event_hooks={'response': [record_version]}) as client:
+        abandoned = client.entries(key(1), from_=1, prefetch=4)
+        kept = client.entries(key(2), from_=1, to=HEIGHT)
+        heights = [next(kept).height]
+        assert next(abandoned).height == 1
+        heights.append(next(kept).height)
+
+        # Both streams are multiplexed over one HTTP/2 connection
+        assert versions == ['HTTP/2', 'HTTP/2']
+        abandoned.close()
+
+        heights.extend(entry.height for entry in kept)
+    assert heights == list(range(1, HEIGHT + 1))
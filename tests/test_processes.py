@@ -0,0 +1,58 @@
+import json
+
+import httpx
+import pytest
+
+from attopy import AttoClient
+
+__author__ = "Waldo Lemmer"
+__copyright__ = "Waldo Lemmer"
+__license__ = "GPL-3.0-only"
+
+ACCOUNT = 'AB' * 32
+HEIGHT = 50
+
+
+def loads(line):
+    """A json_loads function that can be sent to worker processes"""
+    return json.loads(line)
+
+
+def client(requests, json_loads):
+    def handle(request):
+        requests.append(request)
+        lines = (json.dumps({'hash': f'{height:064X}', 'publicKey': ACCOUNT,
+                             'height': height}).encode() + b'\n'
+                 for height in range(1, HEIGHT + 1))
+        return httpx.Response(200, content=lines)
+
+    return AttoClient('http://node', lazy=True, raw_numbers=True,
+                      json_loads=json_loads,
+                      transport=httpx.MockTransport(handle))
+
+
+def test_unpicklable_json_loads_is_rejected():
+    requests = []
+    with client(requests, lambda line: json.loads(line)) as atto_client:
+        with pytest.raises(ValueError, match='json_loads'):
+            list(atto_client.entries(ACCOUNT, from_=1, to=HEIGHT,
+                                     processes=1))
+    assert requests == []
+
+
+@pytest.mark.parametrize('json_loads', ['json', loads])
+def test_json_loads_in_processes(json_loads):
+    requests = []
+    with client(requests, json_loads) as atto_client:
+        heights = [entry.height for entry in atto_client.entries(
+                ACCOUNT, from_=1, to=HEIGHT, processes=1)]
+    assert heights == list(range(1, HEIGHT + 1))
+
+
+def test_prefetch_with_processes_is_rejected():
+    requests = []
+    with client(requests, 'json') as atto_client:
+        with pytest.raises(ValueError, match='prefetch'):
+            list(atto_client.entries(ACCOUNT, from_=1, to=HEIGHT,
+                                     processes=1, prefetch=4))
+    assert requests == []
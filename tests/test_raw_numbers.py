@@ -0,0 +1,127 @@
+import datetime
+import decimal
+
+import pytest
+
+from attopy import _format, raw_to_atto, timestamp_to_datetime
+from attopy.Account import Account
+from attopy.Entry import Entry
+from attopy.Receivable import Receivable
+from attopy.Transaction import Transaction
+
+__author__ = "Waldo Lemmer"
+__copyright__ = "Waldo Lemmer"
+__license__ = "GPL-3.0-only"
+
+ACCOUNT = 'AB' * 32
+TIMESTAMP = 1_744_740_180_123
+# More digits than the default context's precision of 28 can hold once
+# divided, if it wasn't exact
+BALANCE = 99_999_999_999_999_999_999
+
+
+def entry():
+    return {'hash': 'CD' * 32, 'algorithm': 'V1', 'publicKey': ACCOUNT,
+            'height': 2, 'blockType': 'RECEIVE', 'subjectAlgorithm': 'V1',
+            'subjectPublicKey': 'EF' * 32, 'previousBalance': 1_500_000_000,
+            'balance': BALANCE, 'timestamp': TIMESTAMP}
+
+
+def transaction():
+    return {'block': {'publicKey': ACCOUNT, 'version': 0, 'algorithm': 'V1',
+                      'network': 'LIVE', 'type': 'RECEIVE', 'balance': BALANCE,
+                      'timestamp': TIMESTAMP, 'height': 2,
+                      'previous': 'CD' * 32},
+            'signature': 'AB' * 64, 'work': 'CD' * 8}
+
+
+def account():
+    return {'publicKey': ACCOUNT, 'network': 'LIVE', 'version': 0,
+            'algorithm': 'V1', 'height': 2, 'balance': BALANCE,
+            'lastTransactionHash': 'CD' * 32,
+            'lastTransactionTimestamp': TIMESTAMP,
+            'representativeAlgorithm': 'V1',
+            'representativePublicKey': 'EF' * 32}
+
+
+def receivable():
+    return {'hash': 'CD' * 32, 'version': 0, 'algorithm': 'V1',
+            'publicKey': 'EF' * 32, 'timestamp': TIMESTAMP,
+            'receiverAlgorithm': 'V1', 'receiverPublicKey': ACCOUNT,
+            'amount': BALANCE}
+
+
+def numbers(entry, transaction, account, receivable):
+    return [entry.balance, entry.previous_balance, entry.amount,
+            entry.timestamp, transaction.block.balance,
+            transaction.block.timestamp, account.balance,
+            account.last_transaction_timestamp, receivable.amount,
+            receivable.timestamp]
+
+
+def records(lazy, raw_numbers):
+    return (Entry(entry(), None, lazy, raw_numbers),
+            Transaction(transaction(), None, lazy, raw_numbers),
+            Account(account(), None, lazy, raw_numbers),
+            Receivable(receivable(), None, lazy, raw_numbers))
+
+
+@pytest.mark.parametrize('lazy', [False, True])
+def test_raw_numbers_are_ints(lazy):
+    assert numbers(*records(lazy, raw_numbers=True)) == [
+            BALANCE, 1_500_000_000, BALANCE - 1_500_000_000, TIMESTAMP,
+            BALANCE, TIMESTAMP, BALANCE, TIMESTAMP, BALANCE, TIMESTAMP]
+    assert all(type(number) is int
+               for number in numbers(*records(lazy, raw_numbers=True)))
+
+
+@pytest.mark.parametrize('lazy', [False, True])
+def test_converted_numbers(lazy):
+    atto = decimal.Decimal('99999999999.999999999')
+    time = datetime.datetime.fromtimestamp(TIMESTAMP / 1000)
+    assert numbers(*records(lazy, raw_numbers=False)) == [
+            atto, decimal.Decimal('1.5'), atto - decimal.Decimal('1.5'),
+            time, atto, time, atto, time, atto, time]
+
+
+def test_raw_numbers_convert_to_the_same_values():
+    raw = numbers(*records(False, raw_numbers=True))
+    converted = numbers(*records(False, raw_numbers=False))
+    for i, (raw_number, number) in enumerate(zip(raw, converted)):
+        if isinstance(number, datetime.datetime):
+            assert timestamp_to_datetime(raw_number) == number
+        else:
+            assert raw_to_atto(raw_number) == number
+
+
+def test_global_decimal_context_is_left_alone():
+    with decimal.localcontext() as context:
+        # A context that would lose digits and trap nothing
+        context.prec = 3
+        context.traps = {signal: False for signal in context.traps}
+        context.clear_flags()
+
+        before = (context.prec, context.rounding, dict(context.traps))
+        assert raw_to_atto(BALANCE) == decimal.Decimal(
+                '99999999999.999999999')
+        numbers(*records(False, raw_numbers=False))
+        str(Entry(entry(), None, raw_numbers=True))
+
+        assert decimal.getcontext() is context
+        assert (context.prec, context.rounding, dict(context.traps)) \
+            == before
+        assert not any(context.flags.values())
+
+
+def test_inexact_conversions_are_trapped():
+    with pytest.raises(decimal.Inexact):
+        raw_to_atto(10**30 + 1)
+
+
+def test_formatting_raw_ints():
+    assert _format.balance(BALANCE) == _format.balance(raw_to_atto(BALANCE))
+    assert _format.timestamp(TIMESTAMP) == _format.timestamp(
+            timestamp_to_datetime(TIMESTAMP))
+    for raw, converted in zip(records(False, raw_numbers=True),
+                              records(False, raw_numbers=False)):
+        assert str(raw) == str(converted)
@@ -0,0 +1,127 @@
+import random
+
+import pytest
+
+from attopy import ReorderBuffer, StreamGap
+
+__author__ = "Waldo Lemmer"
+__copyright__ = "Waldo Lemmer"
+__license__ = "GPL-3.0-only"
+
+A = 'AA' * 32
+B = 'BB' * 32
+
+
+def entry(account, height):
+    return {'hash': f'{account[:2]}{height:062X}', 'publicKey': account,
+            'height': height}
+
+
+def transaction(account, height):
+    return {'block': {'publicKey': account, 'height': height}}
+
+
+def summary(released):
+    """Return (account, height) of records and StreamGaps"""
+    return [(item.account[:2], 'gap', item.first, item.last)
+            if isinstance(item, StreamGap)
+            else (item['publicKey'][:2], item['height'])
+            for item in released]
+
+
+def test_repeats_are_dropped():
+    buffer = ReorderBuffer(window=2)
+    records = [entry(A, 1), entry(A, 1), entry(A, 2), entry(A, 1),
+               entry(A, 2)]
+    assert summary(buffer.feed(records)) == [('AA', 1), ('AA', 2)]
+    assert buffer.duplicates == 3
+    assert buffer.late == 0
+
+
+def test_transactions_are_identified_by_account_and_height():
+    buffer = ReorderBuffer(window=2)
+    records = [transaction(A, 2), transaction(A, 1), transaction(A, 2)]
+    released = list(buffer.feed(records))
+    assert [r['block']['height'] for r in released] == [1, 2]
+    assert buffer.duplicates == 1
+
+
+def test_heights_are_reordered_per_account():
+    expected = {A: list(range(1, 201)), B: list(range(5, 105))}
+    records = ([entry(A, h) for h in expected[A]]
+               + [entry(B, h) for h in expected[B]])
+    # Move every record up to 30 places, and repeat some of them
+    random.seed(1)
+    shuffled = sorted(range(len(records)),
+                      key=lambda i: i + random.uniform(0, 30))
+    stream = [records[i] for i in shuffled] + random.sample(records, 50)
+
+    buffer = ReorderBuffer(window=64)
+    heights = {A: [], B: []}
+    for record in buffer.feed(stream):
+        assert not isinstance(record, StreamGap)
+        heights[record['publicKey']].append(record['height'])
+
+    assert heights == expected
+    assert buffer.duplicates == 50
+    assert len(buffer) == 0
+
+
+def test_missing_heights_are_reported_as_gaps():
+    buffer = ReorderBuffer(window=3, heights={A: 0})
+    records = [entry(A, 2), entry(A, 3), entry(A, 5), entry(B, 1),
+               entry(B, 2), entry(A, 1), entry(A, 4)]
+    assert summary(buffer.feed(records)) == [
+            ('AA', 'gap', 1, 1), ('AA', 2), ('AA', 3),
+            ('AA', 4), ('AA', 5), ('BB', 1), ('BB', 2)]
+    # Height 1 arrived after the window
+    assert buffer.late == 1
+    assert buffer.height(A) == 5
+    assert buffer.height(B) == 2
+
+
+def test_flush_releases_held_records_with_gaps():
+    buffer = ReorderBuffer(window=100, heights={A: 1})
+    assert buffer.push(entry(A, 4)) == []
+    assert buffer.push(entry(A, 2)) == [entry(A, 2)]
+    assert len(buffer) == 1
+    assert summary(buffer.flush()) == [('AA', 'gap', 3, 3), ('AA', 4)]
+    assert len(buffer) == 0
+
+
+def test_window_of_zero_only_drops_repeats():
+    buffer = ReorderBuffer(window=0)
+    records = [entry(A, 2), entry(A, 1), entry(A, 2), entry(A, 5)]
+    assert summary(buffer.feed(records)) == [('AA', 2), ('AA', 1), ('AA', 5)]
+    assert buffer.duplicates == 1
+    assert buffer.late == 0
+
+
+def test_seen_hashes_are_forgotten_least_recently_used_first():
+    buffer = ReorderBuffer(window=0, seen_size=2)
+    buffer.push(entry(A, 1))
+    buffer.push(entry(A, 2))
+    # Seeing 1 again makes 2 the least recently used
+    assert buffer.push(entry(A, 1)) == []
+    buffer.push(entry(A, 3))
+
+    assert buffer.push(entry(A, 1)) == []
+    assert buffer.push(entry(A, 2)) == [entry(A, 2)]
+
+
+def test_forgotten_accounts_start_over():
+    buffer = ReorderBuffer(window=1, accounts=1)
+    list(buffer.feed([entry(A, 1), entry(A, 2)]))
+    assert buffer.height(A) == 2
+
+    list(buffer.feed([entry(B, 1)]))
+    assert buffer.height(A) is None
+    assert buffer.height(B) == 1
+
+    # Without its last height, A's next record doesn't look like a gap
+    assert summary(buffer.feed([entry(A, 7)])) == [('AA', 7)]
+
+
+def test_negative_window_is_rejected():
+    with pytest.raises(ValueError):
+        ReorderBuffer(window=-1)
@@ -0,0 +1,115 @@
+import asyncio
+import json
+import threading
+
+import httpx
+import pytest
+
+from attopy import AsyncAttoClient, AttoClient, Recorder, ReplayTransport
+
+__author__ = "Waldo Lemmer"
+__copyright__ = "Waldo Lemmer"
+__license__ = "GPL-3.0-only"
+
+ACCOUNT = 'AB' * 32
+HEIGHT = 40
+
+
+def entry(height):
+    return {'hash': f'{height:064X}', 'publicKey': ACCOUNT, 'height': height}
+
+
+def handle(request):
+    if request.url.path.endswith('/entries/stream'):
+        return httpx.Response(200, content=(
+                json.dumps(entry(height)).encode() + b'\n'
+                for height in range(1, HEIGHT + 1)))
+    return httpx.Response(200, json={'publicKey': ACCOUNT,
+                                     'height': HEIGHT})
+
+
+@pytest.fixture
+def recording(tmp_path):
+    """Record an account lookup and a stream in small blocks and segments,
+    and return the directory"""
+    directory = tmp_path / 'traffic'
+    with Recorder(directory, segment_size=500, block_size=100) as recorder:
+        with AttoClient('http://node', lazy=True, recorder=recorder,
+                        transport=httpx.MockTransport(handle)) as client:
+            assert client.account(ACCOUNT).height == HEIGHT
+            assert len(list(client.entries(ACCOUNT, from_=1,
+                                           to=HEIGHT))) == HEIGHT
+    assert recorder.bytes_received > 0
+    assert recorder.bytes_written > 0
+    return directory
+
+
+def test_recording_rolls_over_segments(recording):
+    segments = sorted(path.name for path in recording.glob('*.gz'))
+    assert len(segments) > 2
+    assert segments[0] == '000001.gz'
+
+
+def test_sync_replay(recording):
+    # The base URL doesn't have to match the recorded one
+    with AttoClient('http://elsewhere', lazy=True,
+                    transport=ReplayTransport(recording)) as client:
+        assert client.account(ACCOUNT).height == HEIGHT
+        heights = [e.height for e in client.entries(ACCOUNT, from_=1,
+                                                    to=HEIGHT)]
+        assert heights == list(range(1, HEIGHT + 1))
+
+        # Every recording is replayed once
+        with pytest.raises(httpx.HTTPStatusError) as error:
+            client.account(ACCOUNT)
+        assert error.value.response.status_code == 404
+        with pytest.raises(httpx.HTTPStatusError):
+            list(client.entries(ACCOUNT, from_=2, to=HEIGHT))
+
+
+def test_async_replay_reads_in_threads(recording, monkeypatch):
+    threads = set()
+    read = ReplayTransport._read
+
+    def recorded_read(self, *args):
+        threads.add(threading.current_thread())
+        return read(self, *args)
+
+    monkeypatch.setattr(ReplayTransport, '_read', recorded_read)
+
+    async def main():
+        async with AsyncAttoClient(
+                'http://elsewhere', lazy=True,
+                transport=ReplayTransport(recording)) as client:
+            assert (await client.account(ACCOUNT)).height == HEIGHT
+            heights = [e.height async for e in
+                       client.entries(ACCOUNT, from_=1, to=HEIGHT)]
+            with pytest.raises(httpx.HTTPStatusError):
+                await client.instants()
+            return heights
+
+    assert asyncio.run(main()) == list(range(1, HEIGHT + 1))
+    assert threads
+    assert threading.main_thread() not in threads
+
+
+def test_reopened_recordings_are_appended_to(recording):
+    with Recorder(recording) as recorder:
+        with AttoClient('http://node', lazy=True, recorder=recorder,
+                        transport=httpx.MockTransport(handle)) as client:
+            client.account(ACCOUNT)
+
+    with AttoClient('http://node', lazy=True,
+                    transport=ReplayTransport(recording)) as client:
+        # Both lookups are replayed in order
+        assert client.account(ACCOUNT).height == HEIGHT
+        assert client.account(ACCOUNT).height == HEIGHT
+
+
+def test_interrupted_index_is_readable(recording):
+    with open(recording / 'index.ndjson', 'ab') as index:
+        index.write(b'{"id": 3, "segm')
+
+    with AttoClient('http://node', lazy=True,
+                    transport=ReplayTransport(recording)) as client:
+        assert client.account(ACCOUNT).height == HEIGHT
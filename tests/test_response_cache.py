@@ -0,0 +1,186 @@
+import json
+import sys
+import threading
+import time
+
+import httpx
+import pytest
+
+from attopy import AttoClient, ResponseCache
+
+__author__ = "Waldo Lemmer"
+__copyright__ = "Waldo Lemmer"
+__license__ = "GPL-3.0-only"
+
+# The module, which the class of the same name shadows in attopy
+cache_module = sys.modules['attopy.ResponseCache']
+
+ACCOUNT = 'AB' * 32
+
+
+@pytest.fixture
+def now(monkeypatch):
+    """The time, in a list so that tests can move it"""
+    now = [0.0]
+    monkeypatch.setattr(cache_module.time, 'monotonic', lambda: now[0])
+    return now
+
+
+def test_results_expire_after_ttl(now):
+    cache = ResponseCache(ttl=1.0)
+    loads = []
+
+    def load():
+        loads.append(now[0])
+        return len(loads)
+
+    assert cache.get('key', load) == 1
+    now[0] = 0.9
+    assert cache.get('key', load) == 1
+    now[0] = 1.0
+    assert cache.get('key', load) == 2
+    assert loads == [0.0, 1.0]
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_least_recently_used_results_are_evicted(now):
+    cache = ResponseCache(maxsize=2)
+    cache.get('a', lambda: 'a')
+    cache.get('b', lambda: 'b')
+    cache.get('a', lambda: 'new a')
+    cache.get('c', lambda: 'c')
+
+    assert len(cache) == 2
+    assert cache.evictions == 1
+    assert cache.get('a', lambda: 'new a') == 'a'
+    assert cache.get('b', lambda: 'new b') == 'new b'
+
+
+def coalesce(cache, load, threads=5):
+    """Call cache.get() from several threads once the first one is loading,
+    and return the results or exceptions of the threads"""
+    results = [None] * threads
+
+    def get(i):
+        try:
+            results[i] = cache.get('key', load)
+        except Exception as e:
+            results[i] = e
+
+    workers = [threading.Thread(target=get, args=(i,))
+               for i in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return results
+
+
+def test_concurrent_misses_make_one_request():
+    cache = ResponseCache()
+    loads = []
+
+    def load():
+        loads.append(None)
+        # Wait until every other thread waits for this one
+        while cache.coalesced < 4:
+            time.sleep(0.001)
+        return object()
+
+    results = coalesce(cache, load)
+    assert len(loads) == 1
+    assert all(result is results[0] for result in results)
+    assert (cache.misses, cache.coalesced) == (1, 4)
+
+
+def test_errors_are_raised_in_coalesced_lookups():
+    cache = ResponseCache()
+    error = httpx.ConnectError('connection refused')
+
+    def load():
+        while cache.coalesced < 4:
+            time.sleep(0.001)
+        raise error
+
+    assert all(result is error for result in coalesce(cache, load))
+    # Errors aren't cached
+    assert cache.get('key', lambda: 'result') == 'result'
+    assert cache.misses == 2
+
+
+def test_results_put_while_pinned_dont_expire(now):
+    cache = ResponseCache(ttl=1.0)
+    cache.get('key', lambda: 'old')
+    now[0] = 5.0
+
+    # A result from before the pin still expires
+    cache.pin('key')
+    assert cache.get('key', lambda: 'loaded') == 'loaded'
+
+    cache.put('key', 'streamed')
+    now[0] = 50.0
+    assert cache.get('key', lambda: 'loaded') == 'streamed'
+
+    cache.unpin('key')
+    now[0] = 50.9
+    assert cache.get('key', lambda: 'loaded') == 'streamed'
+    now[0] = 51.0
+    assert cache.get('key', lambda: 'loaded') == 'loaded'
+
+
+def test_nested_pins():
+    cache = ResponseCache(ttl=0.0)
+    cache.pin('key')
+    cache.pin('key')
+    cache.put('key', 'streamed')
+    cache.unpin('key')
+    assert cache.get('key', lambda: 'loaded') == 'streamed'
+    cache.unpin('key')
+    assert cache.get('key', lambda: 'loaded') == 'loaded'
+
+
+def test_stale_account_isnt_served_before_the_stream_updates_it(now):
+    lookups = []
+    streamed = threading.Event()
+    first_line = threading.Event()
+    end = threading.Event()
+
+    def handle(request):
+        if request.url.path.endswith('/stream'):
+            def lines():
+                first_line.wait()
+                yield json.dumps({'publicKey': ACCOUNT,
+                                  'height': 10}).encode() + b'\n'
+                end.wait()
+            return httpx.Response(200, content=lines())
+        lookups.append(request)
+        return httpx.Response(200, json={'publicKey': ACCOUNT,
+                                         'height': len(lookups)})
+
+    cache = ResponseCache(ttl=1.0)
+    with AttoClient('http://node', lazy=True, cache=cache,
+                    transport=httpx.MockTransport(handle)) as client:
+        assert client.account(ACCOUNT).height == 1
+        now[0] = 2.0
+
+        def follow():
+            for account in client.account(ACCOUNT, stream=True):
+                streamed.set()
+
+        follower = threading.Thread(target=follow)
+        follower.start()
+        try:
+            # The stream is open, but hasn't sent anything yet
+            while not cache._pinned:
+                time.sleep(0.001)
+            assert client.account(ACCOUNT).height == 2
+
+            first_line.set()
+            streamed.wait()
+            now[0] = 100.0
+            assert client.account(ACCOUNT).height == 10
+        finally:
+            first_line.set()
+            end.set()
+            follower.join()
+        assert len(lookups) == 2
@@ -0,0 +1,170 @@
+import json
+import sys
+
+import httpx
+import pytest
+
+from attopy import AttoClient
+
+__author__ = "Waldo Lemmer"
+__copyright__ = "Waldo Lemmer"
+__license__ = "GPL-3.0-only"
+
+# The module, which the class of the same name shadows in attopy
+client_module = sys.modules['attopy.AttoClient']
+
+ACCOUNT = 'AB' * 32
+
+
+def entry(height, account=ACCOUNT):
+    return {'hash': f'{height:064X}', 'publicKey': account, 'height': height}
+
+
+def body(records, error=None):
+    """Stream records as NDJSON, then raise error if it's given"""
+    def chunks():
+        for record in records:
+            yield json.dumps(record).encode() + b'\n'
+        if error is not None:
+            raise error
+    return chunks()
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    """Record the backoff delays instead of sleeping, always taking the
+    longest delay"""
+    delays = []
+    monkeypatch.setattr(client_module.time, 'sleep', delays.append)
+    monkeypatch.setattr(client_module.random, 'uniform',
+                        lambda low, high: high)
+    return delays
+
+
+def client_for(responses, requests):
+    """Return an AttoClient whose node answers with the next function of
+    responses, called with the request"""
+    responses = iter(responses)
+
+    def handle(request):
+        requests.append(request)
+        return next(responses)(request)
+
+    return AttoClient('http://node', lazy=True, raw_numbers=True,
+                      transport=httpx.MockTransport(handle))
+
+
+def from_height(request):
+    return int(request.url.params['fromHeight'])
+
+
+def test_account_stream_continues_after_last_height(sleeps):
+    requests = []
+
+    def dropped(request):
+        start = from_height(request)
+        return httpx.Response(200, content=body(
+                [entry(h) for h in range(start, start + 5)],
+                httpx.ReadError('connection reset')))
+
+    def overlapping(request):
+        # A node that sends a few heights before fromHeight again
+        start = from_height(request) - 3
+        return httpx.Response(200, content=body(
+                [entry(h) for h in range(start, 11)]))
+
+    with client_for([dropped, overlapping], requests) as client:
+        heights = [e.height for e in client.entries(ACCOUNT, from_=1, to=10,
+                                                    resume=True)]
+
+    assert heights == list(range(1, 11))
+    assert [from_height(request) for request in requests] == [1, 6]
+    assert sleeps == [1.0]
+
+
+def test_global_stream_drops_repeats_after_reconnect(sleeps):
+    requests = []
+    responses = [
+        lambda request: httpx.Response(200, content=body(
+                [entry(1), entry(2), entry(3)],
+                httpx.RemoteProtocolError('peer closed connection'))),
+        lambda request: httpx.Response(200, content=body(
+                [entry(2), entry(3), entry(4), entry(5)])),
+        lambda request: httpx.Response(503),
+    ]
+
+    heights = []
+    with client_for(responses, requests) as client:
+        with pytest.raises(httpx.HTTPStatusError):
+            for e in client.entries(resume=True, retries=1):
+                heights.append(e.height)
+
+    assert heights == [1, 2, 3, 4, 5]
+    assert 'fromHeight' not in requests[1].url.params
+    assert len(requests) == 3
+
+
+def test_backoff_grows_until_retries_run_out(sleeps):
+    requests = []
+    responses = [lambda request: httpx.Response(500)] * 4
+
+    with client_for(responses, requests) as client:
+        with pytest.raises(httpx.HTTPStatusError):
+            list(client.entries(ACCOUNT, from_=1, to=10, resume=True,
+                                retries=3))
+
+    assert sleeps == [1.0, 2.0, 4.0]
+    assert len(requests) == 4
+
+
+def test_records_reset_the_backoff(sleeps):
+    requests = []
+
+    def failing(request):
+        return httpx.Response(500)
+
+    def dropped(request):
+        start = from_height(request)
+        return httpx.Response(200, content=body(
+                [entry(start)], httpx.ReadError('connection reset')))
+
+    def rest(request):
+        return httpx.Response(200, content=body(
+                [entry(h) for h in range(from_height(request), 4)]))
+
+    with client_for([failing, failing, dropped, failing, rest],
+                    requests) as client:
+        heights = [e.height for e in client.entries(ACCOUNT, from_=1, to=3,
+                                                    resume=True)]
+
+    assert heights == [1, 2, 3]
+    assert [from_height(request) for request in requests] == [1, 1, 1, 2, 2]
+    assert sleeps == [1.0, 2.0, 1.0, 2.0]
+
+
+def test_read_timeout_after_records_reconnects_at_once(sleeps):
+    requests = []
+
+    def idle(request):
+        return httpx.Response(200, content=body(
+                [entry(from_height(request))], httpx.ReadTimeout('idle')))
+
+    def rest(request):
+        return httpx.Response(200, content=body(
+                [entry(h) for h in range(from_height(request), 4)]))
+
+    with client_for([idle, idle, rest], requests) as client:
+        heights = [e.height for e in client.entries(ACCOUNT, from_=1, to=3,
+                                                    resume=True, retries=0)]
+
+    assert heights == [1, 2, 3]
+    assert sleeps == []
+
+
+def test_errors_that_are_not_retryable_are_raised(sleeps):
+    requests = []
+    with client_for([lambda request: httpx.Response(404)],
+                    requests) as client:
+        with pytest.raises(httpx.HTTPStatusError):
+            list(client.entries(ACCOUNT, from_=1, to=3, resume=True))
+    assert sleeps == []
@@ -0,0 +1,128 @@
+import asyncio
+import collections
+import json
+import re
+
+import httpx
+
+from attopy import AsyncAttoClient, Subscriptions
+
+__author__ = "Waldo Lemmer"
+__copyright__ = "Waldo Lemmer"
+__license__ = "GPL-3.0-only"
+
+A = 'AA' * 32
+B = 'BB' * 32
+# Ends a stream when it's the last of its heights
+END = object()
+
+
+def node(streams):
+    """Return a transport whose account streams are given by streams, a
+    dict of public keys to a list of (status, heights) per request. Streams
+    stay open after their heights were sent, unless the last one is END."""
+    requests = collections.Counter()
+
+    async def handle(request):
+        public_key = re.search(r'accounts/(\w{64})/stream$',
+                               request.url.path)[1]
+        status, heights = streams[public_key][requests[public_key]]
+        requests[public_key] += 1
+
+        async def lines():
+            for height in heights:
+                if height is END:
+                    return
+                yield json.dumps({'publicKey': public_key,
+                                  'height': height}).encode() + b'\n'
+            await asyncio.Event().wait()
+
+        return httpx.Response(status, content=lines())
+
+    return httpx.MockTransport(handle)
+
+
+async def take(subscriptions, count):
+    return [await anext(subscriptions) for _ in range(count)]
+
+
+def run(streams, test):
+    async def main():
+        client = AsyncAttoClient('http://node', lazy=True, raw_numbers=True,
+                                 transport=node(streams))
+        async with client, Subscriptions(client,
+                                         receivables=False) as subscriptions:
+            await asyncio.wait_for(test(subscriptions), 5)
+        return subscriptions
+
+    return asyncio.run(main())
+
+
+def test_events_of_a_removed_subscription_are_dropped():
+    async def test(subscriptions):
+        subscriptions.add(A)
+        # Let the first subscription queue its events
+        for _ in range(10):
+            await asyncio.sleep(0)
+        subscriptions.remove(A)
+        subscriptions.add(A)
+
+        events = await take(subscriptions, 2)
+        assert [event.record.height for event in events] == [10, 11]
+
+    run({A: [(200, [1, 2, 3]), (200, [10, 11])]}, test)
+
+
+def test_failed_stream_is_reported_for_its_account():
+    async def test(subscriptions):
+        subscriptions.add(A)
+        subscriptions.add(B)
+
+        events = await take(subscriptions, 3)
+        errors = [event for event in events if event.kind == 'error']
+        assert [(event.account, type(event.record)) for event in errors] \
+            == [(B, httpx.HTTPStatusError)]
+        assert sorted(event.record.height for event in events
+                      if event.kind == 'account') == [1, 2]
+        assert subscriptions.accounts == {A, B}
+
+        # Retrying the account
+        subscriptions.remove(B)
+        subscriptions.add(B)
+        event = await anext(subscriptions)
+        assert (event.account, event.record.height) == (B, 5)
+
+    run({A: [(200, [1, 2])], B: [(503, []), (200, [5])]}, test)
+
+
+def test_closed_stream_is_reported_for_its_account():
+    async def test(subscriptions):
+        subscriptions.add(A)
+        subscriptions.add(B)
+
+        events = await take(subscriptions, 3)
+        assert sorted((event.account, event.kind) for event in events) == [
+                (A, 'account'), (B, 'account'), (B, 'end')]
+        assert [event.record for event in events
+                if event.kind == 'end'] == [None]
+
+        subscriptions.remove(B)
+        subscriptions.add(B)
+        event = await anext(subscriptions)
+        assert (event.account, event.record.height) == (B, 2)
+
+    run({A: [(200, [1])], B: [(200, [1, END]), (200, [2])]}, test)
+
+
+def test_close_awaits_removed_streams():
+    removed = []
+
+    async def test(subscriptions):
+        subscriptions.add(A)
+        await anext(subscriptions)
+        removed.extend(subscriptions._tasks[A])
+        subscriptions.remove(A)
+
+    subscriptions = run({A: [(200, [1])]}, test)
+    assert removed and all(task.done() for task in removed)
+    assert not subscriptions._removed